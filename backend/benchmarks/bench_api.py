@@ -0,0 +1,171 @@
+"""Load test of the main API routes against offline feeds, LLM and database
+
+Usage: python -m benchmarks.bench_api [--concurrency 32] [--requests 500]
+                                      [--feed-latency 0.05] [--llm-delay 0.2]
+                                      [--baseline results/api-latest.json]
+
+Every source in RSS_SOURCES is served by a local fixture server, the LLM is a
+delayed echo and MongoDB is mongomock. Requests go through the ASGI app in
+process, so numbers reflect the app's own cost rather than network overhead.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("THUMBNAIL_PREFETCH", "0")  # fixture image URLs don't resolve
+
+import httpx  # noqa: E402
+
+import server  # noqa: E402
+from benchmarks.harness import (  # noqa: E402
+    FeedFixtureServer, compare_results, install_fake_llm, percentile, save_results, use_mock_database,
+)
+
+USERS = 20
+PASSWORD = "benchmark-password"
+FAVORITES_PER_USER = 25
+
+
+async def ingest(fixtures: FeedFixtureServer) -> float:
+    """Point the server at the fixture feeds and refresh every source once"""
+    server.RSS_SOURCES[:] = fixtures.sources(server.RSS_SOURCES)
+    started = time.perf_counter()
+    await asyncio.gather(*(server.refresh_source(source) for source in server.RSS_SOURCES))
+    return time.perf_counter() - started
+
+
+async def create_users(client: httpx.AsyncClient) -> list:
+    """Register users with favorites; returns their bearer tokens"""
+    tokens = []
+    article_ids = [a["id"] for a in server.rss_cache["articles"]]
+    for i in range(USERS):
+        response = await client.post("/api/auth/register", json={
+            "email": f"user{i}@bench.invalid", "password": PASSWORD, "name": f"User {i}",
+        })
+        response.raise_for_status()
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for article_id in article_ids[i:i + FAVORITES_PER_USER]:
+            await client.post("/api/favorites/add", json={"article_id": article_id}, headers=headers)
+        tokens.append(token)
+    return tokens
+
+
+def scenarios(tokens: list) -> dict:
+    """Request factories per scenario; each takes the request number"""
+    def auth(n):
+        return {"Authorization": f"Bearer {tokens[n % len(tokens)]}"}
+
+    def news(n):
+        category = categories[n % len(categories)]
+        return "GET", "/api/news", {"params": {"category": category} if category else {}}
+
+    categories = [None, "SE", "عاجل", "سياسة", "رياضة"]
+    queries = ["السويد", "الحكومة", "regeringen", "election", "مباراة", "ستوكهولم"]
+    return {
+        "news": news,
+        "search": lambda n: ("GET", f"/api/news/search/{queries[n % len(queries)]}", {}),
+        "breaking_news": lambda n: ("GET", "/api/breaking-news", {}),
+        "auth_login": lambda n: ("POST", "/api/auth/login", {"json": {"email": f"user{n % USERS}@bench.invalid", "password": PASSWORD}}),
+        "favorites": lambda n: ("GET", "/api/favorites", {"headers": auth(n)}),
+    }
+
+
+async def drive(client: httpx.AsyncClient, make_request, total: int, concurrency: int) -> dict:
+    """Run `total` requests with `concurrency` in flight; report throughput and latency"""
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            method, url, kwargs = make_request(n)
+            started = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": total,
+        "errors": errors,
+        "requests_per_second": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+
+async def main(args):
+    llm_stats = install_fake_llm(args.llm_delay)
+    use_mock_database(server)
+    fixtures = FeedFixtureServer(server.RSS_SOURCES, latency=args.feed_latency, items=args.items)
+    await fixtures.start()
+    server.snapshot_sync["leader"] = True  # this process ingests and enriches, like the leader
+    workers = [asyncio.create_task(server.enrichment_worker()) for _ in range(server.ENRICHMENT_WORKERS)]
+    transport = httpx.ASGITransport(app=server.app)
+    results = {}
+    try:
+        results["ingest"] = {"sources": len(server.RSS_SOURCES), "wall_ms": round(await ingest(fixtures) * 1000, 1)}
+        print(f"ingested {len(server.rss_cache['articles'])} stories from {len(server.RSS_SOURCES)} sources "
+              f"in {results['ingest']['wall_ms']:.0f} ms")
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            tokens = await create_users(client)
+            print(f"{'scenario':16s} {'req/s':>10s} {'p50 ms':>10s} {'p99 ms':>10s} {'errors':>8s}")
+            for name, make_request in scenarios(tokens).items():
+                if args.only and name not in args.only:
+                    continue
+                total = args.requests if name != "auth_login" else min(args.requests, args.login_requests)
+                result = await drive(client, make_request, total, args.concurrency)
+                results[name] = result
+                print(f"{name:16s} {result['requests_per_second']:10.1f} {result['p50_ms']:10.2f} "
+                      f"{result['p99_ms']:10.2f} {result['errors']:8d}")
+            if not args.only or "news_during_logins" in args.only:
+                # News latency while a burst of logins is being verified
+                requests = scenarios(tokens)
+                login_burst = asyncio.create_task(drive(client, requests["auth_login"], args.concurrency, args.concurrency))
+                result = await drive(client, requests["news"], args.requests, args.concurrency)
+                await login_burst
+                results["news_during_logins"] = result
+                print(f"{'news+logins':16s} {result['requests_per_second']:10.1f} {result['p50_ms']:10.2f} "
+                      f"{result['p99_ms']:10.2f} {result['errors']:8d}")
+        results["llm"] = {"calls": llm_stats["calls"]}
+    finally:
+        for task in workers:
+            task.cancel()
+        await fixtures.stop()
+        if server.http_session is not None:
+            await server.http_session.close()
+        if server.parse_executor is not None:
+            server.parse_executor.shutdown(wait=False, cancel_futures=True)
+
+    config = {k: v for k, v in vars(args).items() if k not in ("baseline", "output")}
+    # Compare before saving: saving replaces the "-latest" file a baseline may point at
+    regressions = compare_results(results, args.baseline) if args.baseline else 0
+    path = save_results("api", results, config, args.output)
+    print(f"results written to {path}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=100, help="cap for the bcrypt-bound login scenario")
+    parser.add_argument("--items", type=int, default=30, help="entries per fixture feed")
+    parser.add_argument("--feed-latency", type=float, default=0.05, help="seconds per fixture feed response")
+    parser.add_argument("--llm-delay", type=float, default=0.2, help="seconds per fake LLM call")
+    parser.add_argument("--only", nargs="*", help="run only these scenarios")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path, help="earlier result file to compare against")
+    args = parser.parse_args()
+    sys.exit(1 if asyncio.run(main(args)) else 0)
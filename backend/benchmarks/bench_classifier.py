@@ -0,0 +1,77 @@
+"""Throughput of classify_article against the previous nested keyword scan
+
+Usage: python -m benchmarks.bench_classifier [--items 5000] [--table-scale 1]
+
+--table-scale N adds synthetic keywords so the table is N times its current size,
+showing how both approaches behave as the keyword table grows.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+import feed_parser  # noqa: E402
+from benchmarks.fixtures import make_sentence  # noqa: E402
+
+
+def legacy_classify(table: dict, title: str, description: str) -> str:
+    """The original per-category, per-keyword substring scan"""
+    text = f"{title} {description}".lower()
+    scores = {}
+    for category, keywords in table.items():
+        score = sum(1 for keyword in keywords if keyword.lower() in text)
+        if score > 0:
+            scores[category] = score
+    if scores:
+        return max(scores, key=scores.get)
+    return "عام"
+
+
+def scaled_table(scale: int) -> dict:
+    """CATEGORY_KEYWORDS plus (scale - 1) synthetic variants of every keyword"""
+    table = {category: list(keywords) for category, keywords in feed_parser.CATEGORY_KEYWORDS.items()}
+    for category, keywords in feed_parser.CATEGORY_KEYWORDS.items():
+        for i in range(1, scale):
+            table[category].extend(f"{keyword}{chr(0x62f + i % 20) if keyword[0] >= chr(0x600) else chr(97 + i % 26)}{i}"
+                                   for keyword in keywords)
+    return table
+
+
+def run(name: str, classify, items) -> float:
+    started = time.perf_counter()
+    for title, description in items:
+        classify(title, description)
+    elapsed = time.perf_counter() - started
+    print(f"{name:10s} {len(items) / elapsed:10.0f} items/s   {elapsed / len(items) * 1e6:7.1f} us/item")
+    return elapsed
+
+
+def main(count: int, table_scale: int):
+    rng = random.Random(0)
+    languages = ["ar", "ar", "sv", "en"]
+    items = []
+    for _ in range(count):
+        language = rng.choice(languages)
+        items.append((make_sentence(rng, language, 10), make_sentence(rng, language, 60)))
+
+    table = scaled_table(table_scale)
+    print(f"{sum(len(k) for k in table.values())} keywords, {count} items")
+    started = time.perf_counter()
+    classifier = feed_parser.KeywordClassifier(table)
+    print(f"compile    {(time.perf_counter() - started) * 1000:10.2f} ms")
+
+    run("legacy", lambda title, description: legacy_classify(table, title, description), items)
+    run("compiled", lambda title, description: classifier.classify(f"{title} {description}"), items)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--table-scale", type=int, default=1)
+    args = parser.parse_args()
+    main(args.items, args.table_scale)
@@ -0,0 +1,63 @@
+"""Refresh wall time and event-loop stall: parsing inline vs in the parse executor
+
+Usage: python -m benchmarks.bench_feed_parsing [--items 30] [--rounds 3]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+import feed_parser  # noqa: E402
+import server  # noqa: E402
+from benchmarks.fixtures import make_rss  # noqa: E402
+
+
+async def measure_loop_lag(stop: asyncio.Event, samples: list):
+    """Record how late a 1ms sleep wakes up while the refresh runs"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        samples.append(time.perf_counter() - started - 0.001)
+
+
+async def refresh(payloads, offload: bool) -> float:
+    started = time.perf_counter()
+    if offload:
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(server.get_parse_executor(), feed_parser.parse_feed, content, source)
+            for source, content in payloads
+        ))
+    else:
+        for source, content in payloads:
+            feed_parser.parse_feed(content, source)
+            await asyncio.sleep(0)
+    return time.perf_counter() - started
+
+
+async def main(items: int, rounds: int):
+    payloads = [(source, make_rss(source, items)) for source in server.RSS_SOURCES]
+    for mode, offload in (("inline", False), (f"executor[{server.FEED_PARSE_EXECUTOR}]", True)):
+        walls, lags = [], []
+        for _ in range(rounds):
+            stop = asyncio.Event()
+            samples = []
+            probe = asyncio.create_task(measure_loop_lag(stop, samples))
+            walls.append(await refresh(payloads, offload))
+            stop.set()
+            await probe
+            lags.append(max(samples, default=0.0))
+        print(f"{mode:20s} refresh wall {min(walls) * 1000:8.1f} ms   max loop lag {max(lags) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=30, help="entries per feed")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.rounds))
@@ -0,0 +1,92 @@
+"""Micro-benchmarks of the per-article hot paths: classification, image extraction, parsing
+
+Usage: python -m benchmarks.bench_micro [--repeat 5] [--baseline results/micro-latest.json]
+
+Each case reports the best of --repeat runs, in microseconds per call.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+import feedparser  # noqa: E402
+
+import feed_parser  # noqa: E402
+from benchmarks.fixtures import make_atom, make_rss, make_sentence  # noqa: E402
+from benchmarks.harness import compare_results, save_results  # noqa: E402
+
+
+def best_of(repeat: int, calls: int, run) -> float:
+    """Best wall time per call over `repeat` runs, in microseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best / calls * 1e6
+
+
+def cases() -> dict:
+    """Case name -> (calls per run, callable)"""
+    rng = random.Random(0)
+    texts = []
+    for language in ("ar", "ar", "sv", "en") * 250:
+        texts.append((make_sentence(rng, language, 10), make_sentence(rng, language, 60)))
+
+    source = {"name": "micro", "url": "https://example.invalid/feed", "language": "ar", "category": "عام"}
+    rss = make_rss(source, 30)
+    atom = make_atom(source, 30)
+    rss_entries = feedparser.parse(rss).entries
+    atom_entries = feedparser.parse(atom).entries
+    bare_entries = [feedparser.FeedParserDict(title=entry.title, links=[]) for entry in rss_entries]
+
+    def classify():
+        for title, description in texts:
+            feed_parser.classify_article(title, description)
+
+    def extract(entries):
+        def run():
+            for entry in entries:
+                feed_parser.extract_image(entry)
+        return run
+
+    return {
+        "classify_article": (len(texts), classify),
+        "extract_image_media": (len(rss_entries), extract(rss_entries)),
+        "extract_image_enclosure": (len(atom_entries), extract(atom_entries)),
+        "extract_image_none": (len(bare_entries), extract(bare_entries)),
+        "parse_feed_rss_30": (1, lambda: feed_parser.parse_feed(rss, source, 30)),
+        "parse_feed_atom_30": (1, lambda: feed_parser.parse_feed(atom, source, 30)),
+    }
+
+
+def main(args) -> int:
+    results = {}
+    for name, (calls, run) in cases().items():
+        if args.only and name not in args.only:
+            continue
+        run()  # warm up caches and lazy compilation
+        per_call = best_of(args.repeat, calls, run)
+        results[name] = {"per_call_us": round(per_call, 2), "calls_per_second": round(1e6 / per_call, 1)}
+        print(f"{name:28s} {per_call:12.2f} us/call")
+
+    # Compare before saving: saving replaces the "-latest" file a baseline may point at
+    regressions = compare_results(results, args.baseline) if args.baseline else 0
+    path = save_results("micro", results, {"repeat": args.repeat}, args.output)
+    print(f"results written to {path}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="run only these cases")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path, help="earlier result file to compare against")
+    args = parser.parse_args()
+    sys.exit(1 if main(args) else 0)
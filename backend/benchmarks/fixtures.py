@@ -0,0 +1,89 @@
+"""Synthetic RSS payloads shaped like the feeds in RSS_SOURCES"""
+import random
+import zlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+WORDS = {
+    "ar": ["الحكومة", "السويد", "وزير", "الاقتصاد", "مباراة", "الصحة", "مستشفى", "الذكاء", "الاصطناعي",
+           "انتخابات", "البرلمان", "النفط", "الدولار", "ثقافة", "فيلم", "كتاب", "عاجل", "غزة", "ستوكهولم"],
+    "sv": ["regeringen", "Sverige", "ministern", "ekonomi", "fotboll", "sjukhus", "hälsa", "val",
+           "riksdagen", "handel", "kultur", "konst", "Stockholm", "polisen", "skola"],
+    "en": ["government", "president", "minister", "election", "economy", "bank", "oil", "football",
+           "match", "hospital", "virus", "technology", "AI", "music", "cinema", "said", "world"],
+}
+
+# Function words make up most of real headlines and descriptions
+FILLER = {
+    "ar": ["في", "من", "على", "قال", "اليوم", "بعد", "عن", "مع", "التي", "الذي", "خلال", "أن", "إلى",
+           "هذا", "كما", "وقد", "حيث", "أمس", "مدينة", "الناس", "العام", "الجديد"],
+    "sv": ["och", "att", "det", "som", "på", "är", "för", "med", "har", "inte", "till", "efter",
+           "under", "mot", "enligt", "nya", "året", "staden"],
+    "en": ["the", "of", "and", "to", "in", "that", "for", "on", "with", "was", "after", "new",
+           "year", "people", "city", "from", "by", "over"],
+}
+
+
+def make_sentence(rng: random.Random, language: str, words: int, keyword_share: float = 0.2) -> str:
+    """Random text in a source language, roughly keyword_share topical words"""
+    topical = WORDS.get(language, WORDS["en"])
+    filler = FILLER.get(language, FILLER["en"])
+    return " ".join(rng.choice(topical if rng.random() < keyword_share else filler) for _ in range(words))
+
+
+def make_rss(source: dict, items: int = 30, seed: int = 0, now: datetime = None) -> bytes:
+    """Build an RSS 2.0 document with `items` entries, newest first"""
+    rng = random.Random(f"{source['name']}-{seed}")
+    now = now or datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/"><channel>',
+        f"<title>{escape(source['name'])}</title><link>{escape(source['url'])}</link>",
+    ]
+    for i in range(items):
+        link = f"https://example.invalid/{zlib.crc32(source['name'].encode('utf-8'))}/{seed}/{i}"
+        published = format_datetime(now - timedelta(minutes=7 * i), usegmt=True)
+        description = f"<p>{escape(make_sentence(rng, source['language'], 40))}</p><img src=\"{link}.jpg\"/>"
+        parts.append(
+            "<item>"
+            f"<title>{escape(make_sentence(rng, source['language'], 10))}</title>"
+            f"<link>{link}</link><guid>{link}</guid>"
+            f"<description>{escape(description)}</description>"
+            f"<pubDate>{published}</pubDate>"
+            f'<media:content url="{link}.jpg" medium="image"/>'
+            "</item>"
+        )
+    parts.append("</channel></rss>")
+    return "".join(parts).encode("utf-8")
+
+
+def make_atom(source: dict, items: int = 30, seed: int = 0, now: datetime = None) -> bytes:
+    """Build an Atom 1.0 document with `items` entries, newest first"""
+    rng = random.Random(f"{source['name']}-{seed}")
+    now = now or datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"<title>{escape(source['name'])}</title><id>{escape(source['url'])}</id>",
+        f"<updated>{now.isoformat()}</updated>",
+    ]
+    for i in range(items):
+        link = f"https://example.invalid/{zlib.crc32(source['name'].encode('utf-8'))}/{seed}/a{i}"
+        published = (now - timedelta(minutes=7 * i)).isoformat()
+        parts.append(
+            "<entry>"
+            f"<title>{escape(make_sentence(rng, source['language'], 10))}</title>"
+            f'<link rel="alternate" href="{link}"/><link rel="enclosure" type="image/jpeg" href="{link}.jpg"/>'
+            f"<id>{link}</id><published>{published}</published><updated>{published}</updated>"
+            f"<summary>{escape(make_sentence(rng, source['language'], 40))}</summary>"
+            "</entry>"
+        )
+    parts.append("</feed>")
+    return "".join(parts).encode("utf-8")
+
+
+def feed_payload(source: dict, items: int = 30, seed: int = 0, now: datetime = None) -> bytes:
+    """RSS for most sources, Atom for every third so both parser paths are exercised"""
+    build = make_atom if zlib.crc32(source['name'].encode('utf-8')) % 3 == 0 else make_rss
+    return build(source, items, seed, now)
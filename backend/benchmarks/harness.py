@@ -0,0 +1,193 @@
+"""Offline stand-ins for the backend's external services
+
+- FeedFixtureServer: local HTTP server answering for every RSS_SOURCES feed
+- install_fake_llm: replaces emergentintegrations' LlmChat with a delayed echo
+- use_mock_database: points the server at an in-memory mongomock database
+- save_results / compare_results: JSON result files for spotting regressions
+"""
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import types
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+from aiohttp import web
+
+from benchmarks.fixtures import feed_payload
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+class FeedFixtureServer:
+    """Serves a recorded or synthetic payload per source with a fixed response latency
+
+    Recorded payloads are read from `recordings/<crc32 of the feed URL>.xml`; sources
+    without a recording get a synthetic feed. ETags are honoured so conditional
+    polling behaves like the real feeds.
+    """
+
+    def __init__(self, sources: list, latency: float = 0.05, items: int = 30, recordings: Path = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.payloads = {}
+        for index, source in enumerate(sources):
+            recorded = recordings / f"{zlib.crc32(source['url'].encode('utf-8'))}.xml" if recordings else None
+            body = recorded.read_bytes() if recorded and recorded.exists() else feed_payload(source, items)
+            self.payloads[str(index)] = (body, f'"{zlib.crc32(body):08x}"')
+        self.runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        payload = self.payloads.get(request.match_info["index"])
+        if payload is None:
+            return web.Response(status=404)
+        await asyncio.sleep(self.latency)
+        body, etag = payload
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body, headers={"ETag": etag, "Content-Type": "application/xml"})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/feeds/{index}", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def sources(self, sources: list) -> list:
+        """Copies of `sources` whose URLs point at this server"""
+        return [dict(source, url=f"http://{self.host}:{self.port}/feeds/{index}") for index, source in enumerate(sources)]
+
+
+def install_fake_llm(delay: float = 0.2) -> dict:
+    """Register a fake `emergentintegrations.llm.chat` module; returns its call stats
+
+    Single prompts are echoed with an "[ar]" prefix; batched JSON-array prompts get
+    one answer object per item.
+    """
+    stats = {"calls": 0}
+
+    class UserMessage:
+        def __init__(self, text: str):
+            self.text = text
+
+    class LlmChat:
+        def __init__(self, api_key: str, session_id: str, system_message: str):
+            self.system_message = system_message
+
+        def with_model(self, provider: str, model: str):
+            return self
+
+        async def send_message(self, message: UserMessage) -> str:
+            stats["calls"] += 1
+            await asyncio.sleep(delay)
+            if "JSON" in self.system_message and message.text.startswith("["):
+                # Batched prompts are a JSON array of items; answer each with the requested fields
+                fields = ("summary",) if '"summary"' in self.system_message else ("title", "description")
+                items = json.loads(message.text)
+                return json.dumps([{"i": item["i"], **{field: f"[ar] {item.get(field, item.get('text', ''))}" for field in fields}}
+                                   for item in items], ensure_ascii=False)
+            if "JSON" in self.system_message:
+                # Structured prompts end with the JSON payload; echo it back "translated"
+                try:
+                    data = json.loads(message.text[message.text.index("{"):])
+                    return json.dumps({key: f"[ar] {value}" for key, value in data.items()}, ensure_ascii=False)
+                except ValueError:
+                    pass
+            return f"[ar] {message.text[-200:]}"
+
+    chat = types.ModuleType("emergentintegrations.llm.chat")
+    chat.LlmChat = LlmChat
+    chat.UserMessage = UserMessage
+    sys.modules.setdefault("emergentintegrations", types.ModuleType("emergentintegrations"))
+    sys.modules.setdefault("emergentintegrations.llm", types.ModuleType("emergentintegrations.llm"))
+    sys.modules["emergentintegrations.llm.chat"] = chat
+    os.environ["EMERGENT_LLM_KEY"] = "benchmark"
+    return stats
+
+
+def use_mock_database(server):
+    """Swap the server's MongoDB database for an in-memory mongomock one"""
+    from mongomock_motor import AsyncMongoMockClient
+
+    server.client = AsyncMongoMockClient()
+    server.db = server.client[os.environ.get("DB_NAME", "arabismart_db")]
+    return server.db
+
+
+def environment() -> dict:
+    """Where and on what a result was measured"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def save_results(name: str, results: dict, config: dict, output: Path = None) -> Path:
+    """Write results to `output`, or else to `results/<name>-<timestamp>.json` and
+    `results/<name>-latest.json` (an explicit output leaves the -latest baseline alone)"""
+    document = {"benchmark": name, "environment": environment(), "config": config, "results": results}
+    text = json.dumps(document, indent=2, ensure_ascii=False)
+    if output is not None:
+        output.write_text(text)
+        return output
+    RESULTS_DIR.mkdir(exist_ok=True)
+    path = RESULTS_DIR / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    path.write_text(text)
+    (RESULTS_DIR / f"{name}-latest.json").write_text(text)
+    return path
+
+
+def compare_results(results: dict, baseline_path: Path, threshold: float = 0.1) -> int:
+    """Print changes against a baseline file; returns the number of regressions
+
+    Metrics are compared by name: keys ending in `_ms` or `_us` are better when lower,
+    `per_second` keys when higher.
+    """
+    baseline = json.loads(baseline_path.read_text())["results"]
+    regressions = 0
+    for case, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(case, {}).get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            if metric.endswith(("_ms", "_us")):
+                worse = change > threshold
+            elif metric.endswith("per_second"):
+                worse = change < -threshold
+            else:
+                continue
+            regressions += worse
+            flag = "REGRESSION" if worse else ""
+            print(f"{case:28s} {metric:18s} {old:12.2f} -> {value:12.2f} {change:+8.1%} {flag}")
+    return regressions
+
+
+def percentile(samples: list, fraction: float) -> float:
+    """Nearest-rank percentile of unsorted samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
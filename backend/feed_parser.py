@@ -0,0 +1,282 @@
+"""Feed parsing: RSS/Atom bodies to article dicts, with keyword categories.
+
+Kept free of import side effects (no database client, sessions or background
+threads) so the feed parse process pool loads only this module.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import feedparser
+
+logger = logging.getLogger(__name__)
+
+FEED_MAX_ENTRIES = 15  # newest entries read per poll
+THUMBNAIL_DEFAULT_VARIANT = "card.webp"
+
+# ============== Text Normalization ==============
+ARABIC_DIACRITICS = re.compile('[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]')  # tashkeel + tatweel
+# Letter variants folded together (str.replace chains are much faster than str.translate here)
+ARABIC_LETTER_VARIANTS = (
+    ('أ', 'ا'), ('إ', 'ا'), ('آ', 'ا'), ('ٱ', 'ا'),
+    ('ة', 'ه'), ('ى', 'ي'), ('ؤ', 'و'), ('ئ', 'ي'),
+)
+
+def normalize_text(text: str) -> str:
+    """Normalize Arabic/Swedish/English text for matching"""
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    text = ARABIC_DIACRITICS.sub('', text)
+    for variant, letter in ARABIC_LETTER_VARIANTS:
+        text = text.replace(variant, letter)
+    return text
+
+# ============== Category Keywords ==============
+CATEGORY_KEYWORDS = {
+    "سياسة": ["حكومة", "رئيس", "وزير", "برلمان", "انتخاب", "سياس", "حزب", "government", "president", "minister", "election", "parliament", "politik", "regering"],
+    "اقتصاد": ["اقتصاد", "بنك", "أسهم", "بورصة", "نفط", "دولار", "يورو", "تجار", "economy", "bank", "stock", "oil", "dollar", "trade", "ekonomi", "handel"],
+    "رياضة": ["رياض", "كرة", "ميسي", "رونالدو", "دوري", "بطولة", "منتخب", "football", "soccer", "champion", "match", "sport", "fotboll", "match"],
+    "تكنولوجيا": ["تقن", "تكنولوج", "ذكاء اصطناعي", "هاتف", "آيفون", "أندرويد", "جوجل", "أبل", "tech", "AI", "phone", "apple", "google", "teknik", "mobil"],
+    "صحة": ["صح", "طب", "مرض", "فيروس", "علاج", "مستشفى", "طبيب", "health", "medical", "doctor", "hospital", "virus", "hälsa", "sjukhus"],
+    "ثقافة": ["ثقاف", "فن", "سينما", "مسرح", "موسيق", "كتاب", "رواي", "culture", "art", "cinema", "music", "book", "kultur", "konst"],
+}
+
+# Optional JSON file ({category: [keywords]}) replacing the table above; reloaded when it changes
+CATEGORY_KEYWORDS_FILE = os.environ.get('CATEGORY_KEYWORDS_FILE')
+CATEGORY_KEYWORDS_CHECK_INTERVAL = 5  # seconds between checks of the file's mtime
+
+# ============== Classification ==============
+class KeywordClassifier:
+    """Scores every category in a single regex pass over the normalized text.
+    
+    All keywords are compiled into one trie-shaped pattern, so each word start
+    costs a walk down the trie instead of a scan per keyword. Arabic keywords are
+    stems: they match at the start of a word, optionally after clitics
+    (و ف ب ك ل + ال/لل), with any ending. Stems of one or two letters only take
+    short inflectional endings so "صح" matches الصحة but not صحيفة. Latin keywords
+    match at the start of a word; keywords of three letters or less must be the
+    whole word ("AI" no longer matches inside "said").
+    """
+    
+    ARABIC_CLITICS = "(?:[وفبكل]?(?:ال|لل)?)"
+    WORD_END = r"(?!\w)"
+    SHORT_STEM_ENDINGS = "(?=(?:يه|ون|ين|ات|ان|ي|ه)?" + WORD_END + ")"
+    
+    def __init__(self, table: Dict[str, List[str]]):
+        self.categories = list(table)
+        self.keyword_categories: Dict[str, List[str]] = {}
+        for category, keywords in table.items():
+            for keyword in keywords:
+                keyword = ' '.join(normalize_text(keyword).split())
+                if not keyword:
+                    continue
+                categories = self.keyword_categories.setdefault(keyword, [])
+                if category not in categories:
+                    categories.append(category)
+        
+        arabic = [k for k in self.keyword_categories if k[0] >= '\u0600']
+        latin = [k for k in self.keyword_categories if k[0] < '\u0600']
+        alternatives = []
+        if latin:
+            trie = self._trie_pattern(latin, lambda k: self.WORD_END if len(k) <= 3 else '')
+            alternatives.append(f"(?P<lat>{trie})")
+        if arabic:
+            trie = self._trie_pattern(arabic, lambda k: self.SHORT_STEM_ENDINGS if len(k) <= 2 else '')
+            alternatives.append(f"{self.ARABIC_CLITICS}(?P<ar>{trie})")
+        self.pattern = re.compile(rf"(?<!\w)(?:{'|'.join(alternatives)})") if alternatives else None
+        
+        # Multi-word keywords may match with clitics between words; map those back explicitly
+        self.phrases = [
+            (re.compile(self._word_separator().join(re.escape(w) for w in k.split())), k)
+            for k in self.keyword_categories if ' ' in k
+        ]
+    
+    @classmethod
+    def _word_separator(cls) -> str:
+        return r"\s+" + cls.ARABIC_CLITICS
+    
+    @classmethod
+    def _trie_pattern(cls, keywords: List[str], terminal) -> str:
+        """Regex alternation factored by common prefixes; terminal(keyword) adds end conditions"""
+        root: Dict[str, Any] = {}
+        for keyword in keywords:
+            node = root
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = keyword
+        
+        def emit(node: dict) -> str:
+            # Longer keywords first, so the longest match wins
+            branches = []
+            for char in sorted(c for c in node if c):
+                prefix = cls._word_separator() if char == ' ' else re.escape(char)
+                branches.append(prefix + emit(node[char]))
+            if '' in node:
+                branches.append(terminal(node['']))
+            return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        
+        return emit(root)
+    
+    def keyword_for(self, match) -> Optional[str]:
+        """Map a match back to its table keyword"""
+        text = match.group('lat') if 'lat' in self.pattern.groupindex and match.group('lat') else match.group('ar')
+        if text in self.keyword_categories:
+            return text
+        for phrase, keyword in self.phrases:
+            if phrase.fullmatch(text):
+                return keyword
+        return None
+    
+    def classify(self, text: str) -> str:
+        if self.pattern is None:
+            return "عام"
+        scores = dict.fromkeys(self.categories, 0)
+        for keyword in {self.keyword_for(m) for m in self.pattern.finditer(normalize_text(text))}:
+            for category in self.keyword_categories.get(keyword, ()):
+                scores[category] += 1
+        best = max(self.categories, key=scores.get, default=None)
+        return best if best is not None and scores[best] > 0 else "عام"
+
+classifier_state = {"classifier": None, "mtime": None, "checked": 0.0}
+
+def load_category_keywords() -> Dict[str, List[str]]:
+    """Read the keyword table from CATEGORY_KEYWORDS_FILE, falling back to CATEGORY_KEYWORDS"""
+    if CATEGORY_KEYWORDS_FILE:
+        try:
+            with open(CATEGORY_KEYWORDS_FILE, encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading category keywords: {str(e)}")
+    return CATEGORY_KEYWORDS
+
+def get_classifier() -> KeywordClassifier:
+    """Get the compiled classifier, recompiling it when the keyword file changes"""
+    now = time.monotonic()
+    if classifier_state["classifier"] is not None and (
+        not CATEGORY_KEYWORDS_FILE or now - classifier_state["checked"] < CATEGORY_KEYWORDS_CHECK_INTERVAL
+    ):
+        return classifier_state["classifier"]
+    classifier_state["checked"] = now
+    
+    mtime = None
+    if CATEGORY_KEYWORDS_FILE:
+        try:
+            mtime = os.stat(CATEGORY_KEYWORDS_FILE).st_mtime
+        except OSError:
+            pass
+    if classifier_state["classifier"] is None or mtime != classifier_state["mtime"]:
+        classifier_state["classifier"] = KeywordClassifier(load_category_keywords())
+        classifier_state["mtime"] = mtime
+    return classifier_state["classifier"]
+
+def classify_article(title: str, description: str) -> str:
+    """Classify article based on keywords"""
+    return get_classifier().classify(f"{title} {description}")
+
+# ============== Parsing ==============
+def make_article_id(source_name: str, guid: str) -> str:
+    """Derive a stable article ID from its source and feed guid/link"""
+    return hashlib.sha1(f"{source_name}\n{guid}".encode('utf-8')).hexdigest()[:24]
+
+def entry_guid(entry) -> Optional[str]:
+    """Identity of a feed entry: its id, link or title, else a hash of its text and date
+    (None if the entry has nothing to identify it by)"""
+    guid = entry.get('id') or entry.get('link') or entry.get('title')
+    if guid:
+        return guid
+    content = "\n".join(str(entry.get(key) or '') for key in ('summary', 'description', 'published', 'updated'))
+    if not content.strip():
+        return None
+    return "content:" + hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+def extract_image(entry) -> Optional[str]:
+    """Extract image URL from RSS entry"""
+    # Check media:content
+    if hasattr(entry, 'media_content') and entry.media_content:
+        for media in entry.media_content:
+            if 'url' in media:
+                return media['url']
+    # Check media:thumbnail
+    if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
+        for thumb in entry.media_thumbnail:
+            if 'url' in thumb:
+                return thumb['url']
+    # Check enclosures
+    if hasattr(entry, 'enclosures') and entry.enclosures:
+        for enclosure in entry.enclosures:
+            if enclosure.get('type', '').startswith('image'):
+                return enclosure.get('url')
+    # Check links
+    if hasattr(entry, 'links'):
+        for link in entry.links:
+            if link.get('type', '').startswith('image'):
+                return link.get('href')
+    return None
+
+# Thumbnail URLs depend only on the article and its image, so parsing fills them in
+def thumbnail_key(image_url: str) -> str:
+    """Cache key of a source image; articles sharing an image share its thumbnails"""
+    return hashlib.sha1(image_url.encode('utf-8')).hexdigest()[:24]
+
+def thumbnail_version(image_url: str) -> str:
+    """Short tag of the source image in thumbnail URLs, so a changed image gets a new URL"""
+    return thumbnail_key(image_url)[:12]
+
+def thumbnail_path(article_id: str, image_url: str, variant: str = THUMBNAIL_DEFAULT_VARIANT) -> str:
+    """API path of an article's thumbnail"""
+    return f"/api/thumbnails/{article_id}/{variant}?v={thumbnail_version(image_url)}"
+
+HTML_TAG_PATTERN = re.compile('<[^<]+?>')
+
+def parse_feed(content: bytes, source: dict, max_entries: int = FEED_MAX_ENTRIES, encoding: Optional[str] = None) -> List[dict]:
+    """Parse a feed body into article dicts (CPU-bound; runs in the parse executor)
+    
+    `content` may be a prefix of the feed cut off mid-document; feedparser still
+    returns the entries read so far, the last one possibly partial, so callers pass
+    the number of complete entries as `max_entries`.
+    """
+    headers = {"content-type": f"application/xml; charset={encoding}"} if encoding else None
+    feed = feedparser.parse(content, response_headers=headers)
+    articles = []
+    for entry in feed.entries[:max_entries]:
+        guid = entry_guid(entry)
+        if guid is None:
+            logger.warning(f"{source['name']}: skipping an entry with no id, link, title, text or date")
+            continue
+        published = None
+        if hasattr(entry, 'published_parsed') and entry.published_parsed:
+            try:
+                published = datetime(*entry.published_parsed[:6])
+            except Exception as e:
+                logger.warning(f"{source['name']}: unusable publish date {entry.get('published')!r} ({e}), using the current time")
+                published = datetime.utcnow()
+        
+        title = entry.get('title', '')
+        description = entry.get('summary', entry.get('description', ''))
+        
+        # Remove HTML tags from description
+        description = HTML_TAG_PATTERN.sub('', description)[:500]
+        
+        article_id = make_article_id(source['name'], guid)
+        image = extract_image(entry)
+        articles.append({
+            "id": article_id,
+            "title": title,
+            "description": description,
+            "link": entry.get('link', ''),
+            "source": source['name'],
+            "source_language": source['language'],
+            "category": classify_article(title, description) if source['category'] == 'عام' else source['category'],
+            "image": image,
+            "thumbnail": thumbnail_path(article_id, image) if image else None,
+            "published_date": published,
+            "guid": guid,
+            "is_translated": False,
+            "is_summarized": False
+        })
+    return articles
@@ -1,4 +1,6 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -9,20 +11,208 @@ from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime, timedelta
+import json
+import hashlib
+import re
+import math
+import heapq
+import bisect
+import gzip
+import io
+import ipaddress
+import socket
+import struct
+import multiprocessing
+import sys
+import threading
+import traceback
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from urllib.parse import urlsplit
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
 import asyncio
+import codecs
+import xml.etree.ElementTree as ET
 import aiohttp
-import feedparser
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+from yarl import URL
+from feed_parser import FEED_MAX_ENTRIES, THUMBNAIL_DEFAULT_VARIANT, normalize_text, parse_feed, thumbnail_key, thumbnail_version
 from passlib.context import CryptContext
 from jose import jwt, JWTError
+from PIL import Image, ImageOps
+from pymongo import UpdateOne, monitoring
+from pymongo.errors import DuplicateKeyError
 import time
 
+try:
+    import brotli
+except ImportError:  # optional: responses fall back to gzip
+    brotli = None
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# ============== Metrics ==============
+# Prometheus text exposition, kept in-process so no extra service or dependency is needed.
+# Metric updates can come from driver threads (MongoDB command events), hence the lock
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+metrics_lock = threading.Lock()
+metrics_registry: list = []
+
+def format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    """Render a Prometheus label set"""
+    parts = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    """Monotonic counter, optionally labelled"""
+    kind = "counter"
+    
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values: Dict[tuple, float] = {}
+        metrics_registry.append(self)
+    
+    def inc(self, *label_values, amount: float = 1):
+        with metrics_lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+    
+    def samples(self):
+        for label_values, value in self.values.items():
+            yield f"{self.name}{format_labels(self.labels, label_values)} {value}"
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally labelled"""
+    kind = "histogram"
+    
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.values: Dict[tuple, list] = {}  # label values -> [bucket counts..., sum, count]
+        metrics_registry.append(self)
+    
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with metrics_lock:
+            series = self.values.get(label_values)
+            if series is None:
+                series = self.values[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+    
+    def samples(self):
+        for label_values, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = format_labels(self.labels, label_values, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.labels, label_values, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {series[-1]}"
+            yield f"{self.name}_sum{format_labels(self.labels, label_values)} {series[-2]}"
+            yield f"{self.name}_count{format_labels(self.labels, label_values)} {series[-1]}"
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+    kind = "gauge"
+    
+    def __init__(self, name: str, help_text: str, read):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+        metrics_registry.append(self)
+    
+    def samples(self):
+        yield f"{self.name} {self.read()}"
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text format"""
+    lines = []
+    with metrics_lock:
+        for metric in metrics_registry:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+HTTP_REQUEST_SECONDS = Histogram("arabismart_http_request_seconds", "HTTP request latency by route", ("method", "route", "status"))
+FEED_REFRESH_SECONDS = Histogram("arabismart_feed_refresh_seconds", "Full refresh of a source: fetch, parse, snapshot rebuild and store", ("source",))
+FEED_FETCH_SECONDS = Histogram("arabismart_feed_fetch_seconds", "Feed download time", ("source",))
+FEED_PARSE_SECONDS = Histogram("arabismart_feed_parse_seconds", "Feed parse time", ("source",))
+FEED_POLLS = Counter("arabismart_feed_polls_total", "Feed polls by outcome", ("source", "outcome"))
+FEED_BYTES = Counter("arabismart_feed_bytes_total", "Feed bytes downloaded", ("source",))
+SNAPSHOT_REBUILD_SECONDS = Histogram("arabismart_snapshot_rebuild_seconds", "Time to rebuild the article snapshot")
+LLM_CALL_SECONDS = Histogram("arabismart_llm_call_seconds", "LLM call latency", ("kind", "outcome"))
+LLM_TOKENS = Counter("arabismart_llm_estimated_tokens_total", "LLM tokens, estimated at 4 characters per token", ("kind", "direction"))
+AI_CACHE_LOOKUPS = Counter("arabismart_ai_cache_lookups_total", "AI cache lookups by tier that answered", ("kind", "result"))
+MONGO_COMMAND_SECONDS = Histogram("arabismart_mongo_command_seconds", "MongoDB command latency", ("command", "outcome"))
+EVENT_LOOP_LAG_SECONDS = Histogram("arabismart_event_loop_lag_seconds", "Delay of the event loop waking up a timer", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+EVENT_LOOP_LAG_INTERVAL = 0.5
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count; the LLM client doesn't report usage"""
+    return (len(text) + 3) // 4
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Record MongoDB command latency from driver events"""
+    
+    def started(self, event):
+        pass
+    
+    def succeeded(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name, "ok")
+    
+    def failed(self, event):
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name, "error")
+
+async def monitor_event_loop_lag():
+    """Measure how late the loop wakes a periodic timer; blocking work shows up as lag"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(EVENT_LOOP_LAG_INTERVAL)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - started - EVENT_LOOP_LAG_INTERVAL))
+
+# Opt-in sampling profiler: folded stacks ("frame;frame;frame count"), ready for
+# flamegraph.pl or speedscope. Disabled unless PROFILER_ENABLED is set
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '').lower() in ('1', 'true', 'yes')
+PROFILER_MAX_SECONDS = 60
+profiler_lock = threading.Lock()
+
+def sample_stacks(seconds: float, interval: float) -> Dict[str, int]:
+    """Sample every thread's stack (except the sampler's own) for a while"""
+    own = threading.get_ident()
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    stacks: Dict[str, int] = {}
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            frames = [f"{f.name} ({Path(f.filename).name}:{f.lineno})" for f in traceback.extract_stack(frame)]
+            stack = ";".join([names.get(ident, str(ident))] + frames)
+            stacks[stack] = stacks.get(stack, 0) + 1
+        time.sleep(interval)
+    return stacks
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics()])
 db = client[os.environ.get('DB_NAME', 'arabismart_db')]
 
 # JWT Configuration
@@ -30,8 +220,26 @@ SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'arabismart_secret_key')
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 7
 
-# Password hashing
+# Password hashing. bcrypt is deliberately slow (~100-300ms per call), so it runs in
+# its own small thread pool (bcrypt releases the GIL) behind a concurrency limit
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_semaphore = asyncio.Semaphore(PASSWORD_HASH_WORKERS)
+
+# Authenticated users by token subject (email)
+USER_CACHE_TTL = 60
+USER_CACHE_SIZE = 10000
+user_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+# Largest page the news, search and breaking-news endpoints return
+NEWS_PAGE_LIMIT = 100
+SEARCH_PAGE_LIMIT = 100
+BREAKING_NEWS_LIMIT = 50
+
+# Favorites live in their own collection, one document per saved article
+FAVORITES_PAGE_LIMIT = 100
+FAVORITE_IDS_IN_PROFILE = 200  # IDs returned with the user profile
 
 # Security
 security = HTTPBearer(auto_error=False)
@@ -51,11 +259,54 @@ logger = logging.getLogger(__name__)
 
 # ============== RSS Cache System ==============
 rss_cache = {
-    "articles": [],
+    "articles": (),
+    "by_id": {},
+    "canonical_of": {},
+    "categories_of": {},
+    "cluster_members": {},  # canonical ID -> member IDs, canonical first
+    "by_category": {},
+    "by_source": {},
+    "version": 0,
     "last_update": 0,
-    "cache_duration": 600  # 10 minutes
+    "cache_duration": 600  # default refresh interval per source (10 minutes)
 }
 
+# Per-source refresh state, keyed by source name
+feed_state: Dict[str, dict] = {}
+refresh_tasks: set = set()  # running refresh_source tasks, cancelled when ingestion stops
+FEED_SCHEDULER_TICK = 5  # seconds between scheduler checks
+
+# Adaptive polling: each source is polled about twice per expected new item
+FEED_MIN_INTERVAL = 120
+FEED_MAX_INTERVAL = 2 * 3600
+FEED_NOT_MODIFIED_GROWTH = 1.25  # back off a little on every 304
+
+# Circuit breaker: after repeated failures a source is skipped with exponential backoff
+FEED_FAILURE_THRESHOLD = 3
+FEED_BACKOFF_BASE = 300
+FEED_BACKOFF_MAX = 6 * 3600
+FEED_OUTCOME_WINDOW = 20  # recent polls used for the error rate
+
+# Strong references to running background tasks
+background_tasks: set = set()
+
+# Shared, connection-pooled HTTP session for feed polling
+http_session: Optional[aiohttp.ClientSession] = None
+image_session: Optional[aiohttp.ClientSession] = None
+FEED_CONNECTION_LIMIT = 20
+FEED_USER_AGENT = "ArabiSmart/1.1 (+https://github.com/redioarab1/ArabiSmart)"
+
+# Feed parsing runs in a worker pool so it never stalls requests. feedparser is pure
+# Python, so a process pool also keeps it from competing with the event loop for the GIL
+FEED_PARSE_EXECUTOR = os.environ.get('FEED_PARSE_EXECUTOR', 'process')  # "process" or "thread"
+FEED_PARSE_WORKERS = int(os.environ.get('FEED_PARSE_WORKERS', '4'))
+parse_executor: Optional[Executor] = None
+
+# Feed bodies are streamed and read only as far as needed: up to the newest
+# FEED_MAX_ENTRIES entries or the entry that was newest on the last poll
+FEED_MAX_BYTES = int(os.environ.get('FEED_MAX_BYTES', str(4 * 1024 * 1024)))  # hard cap per download
+FEED_CHUNK_SIZE = 64 * 1024
+
 # ============== RSS Sources ==============
 RSS_SOURCES = [
     # ========== مصادر عربية في السويد (SE) ==========
@@ -89,16 +340,6 @@ RSS_SOURCES = [
     {"name": "CNN International", "url": "http://rss.cnn.com/rss/edition.rss", "language": "en", "category": "دولي"},
 ]
 
-# ============== Category Keywords ==============
-CATEGORY_KEYWORDS = {
-    "سياسة": ["حكومة", "رئيس", "وزير", "برلمان", "انتخاب", "سياس", "حزب", "government", "president", "minister", "election", "parliament", "politik", "regering"],
-    "اقتصاد": ["اقتصاد", "بنك", "أسهم", "بورصة", "نفط", "دولار", "يورو", "تجار", "economy", "bank", "stock", "oil", "dollar", "trade", "ekonomi", "handel"],
-    "رياضة": ["رياض", "كرة", "ميسي", "رونالدو", "دوري", "بطولة", "منتخب", "football", "soccer", "champion", "match", "sport", "fotboll", "match"],
-    "تكنولوجيا": ["تقن", "تكنولوج", "ذكاء اصطناعي", "هاتف", "آيفون", "أندرويد", "جوجل", "أبل", "tech", "AI", "phone", "apple", "google", "teknik", "mobil"],
-    "صحة": ["صح", "طب", "مرض", "فيروس", "علاج", "مستشفى", "طبيب", "health", "medical", "doctor", "hospital", "virus", "hälsa", "sjukhus"],
-    "ثقافة": ["ثقاف", "فن", "سينما", "مسرح", "موسيق", "كتاب", "رواي", "culture", "art", "cinema", "music", "book", "kultur", "konst"],
-}
-
 # ============== Pydantic Models ==============
 class UserCreate(BaseModel):
     email: str
@@ -113,7 +354,8 @@ class UserResponse(BaseModel):
     id: str
     email: str
     name: str
-    favorites: List[str] = []
+    favorites: List[str] = []  # most recent FAVORITE_IDS_IN_PROFILE IDs
+    favorites_count: int = 0
     created_at: datetime
 
 class TokenResponse(BaseModel):
@@ -142,11 +384,15 @@ class FavoriteAdd(BaseModel):
     article_id: str
 
 # ============== Helper Functions ==============
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    async with password_semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, pwd_context.hash, password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    async with password_semaphore:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, pwd_context.verify, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -163,10 +409,19 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         email = payload.get("sub")
         if email is None:
             return None
-        user = await db.users.find_one({"email": email})
-        return user
     except JWTError:
         return None
+    
+    cached = user_cache.get(email)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    user = await db.users.find_one({"email": email}, {"password_hash": 0})
+    if user is not None:
+        user_cache[email] = (time.monotonic() + USER_CACHE_TTL, user)
+        user_cache.move_to_end(email)
+        while len(user_cache) > USER_CACHE_SIZE:
+            user_cache.popitem(last=False)
+    return user
 
 async def get_required_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     user = await get_current_user(credentials)
@@ -174,184 +429,2301 @@ async def get_required_user(credentials: HTTPAuthorizationCredentials = Depends(
         raise HTTPException(status_code=401, detail="غير مصرح")
     return user
 
-def classify_article(title: str, description: str) -> str:
-    """Classify article based on keywords"""
-    text = f"{title} {description}".lower()
-    scores = {}
-    for category, keywords in CATEGORY_KEYWORDS.items():
-        score = sum(1 for keyword in keywords if keyword.lower() in text)
-        if score > 0:
-            scores[category] = score
-    if scores:
-        return max(scores, key=scores.get)
-    return "عام"
-
-def extract_image(entry) -> Optional[str]:
-    """Extract image URL from RSS entry"""
-    # Check media:content
-    if hasattr(entry, 'media_content') and entry.media_content:
-        for media in entry.media_content:
-            if 'url' in media:
-                return media['url']
-    # Check media:thumbnail
-    if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-        for thumb in entry.media_thumbnail:
-            if 'url' in thumb:
-                return thumb['url']
-    # Check enclosures
-    if hasattr(entry, 'enclosures') and entry.enclosures:
-        for enclosure in entry.enclosures:
-            if enclosure.get('type', '').startswith('image'):
-                return enclosure.get('url')
-    # Check links
-    if hasattr(entry, 'links'):
-        for link in entry.links:
-            if link.get('type', '').startswith('image'):
-                return link.get('href')
-    return None
+async def build_user_response(user: dict) -> "UserResponse":
+    """Profile with the most recently saved favorite IDs and the total count"""
+    saved = await db.favorites.find(
+        {"user_id": user["id"]}, {"_id": 0, "article_id": 1}
+    ).sort([("saved_at", -1), ("article_id", -1)]).limit(FAVORITE_IDS_IN_PROFILE).to_list(FAVORITE_IDS_IN_PROFILE)
+    count = len(saved)
+    if count == FAVORITE_IDS_IN_PROFILE:
+        count = await db.favorites.count_documents({"user_id": user["id"]})
+    return UserResponse(
+        id=user["id"],
+        email=user["email"],
+        name=user["name"],
+        favorites=[f["article_id"] for f in saved],
+        favorites_count=count,
+        created_at=user["created_at"]
+    )
+
+async def hydrate_articles(article_ids: List[str], saved_copies: Optional[Dict[str, dict]] = None) -> List[dict]:
+    """Load articles in the given order: live ones from the snapshot, the rest in one batch query,
+    falling back to the copies kept on favorites for articles the archive has expired"""
+    by_id = rss_cache["by_id"]
+    missing = [article_id for article_id in article_ids if article_id not in by_id]
+    archived = {}
+    if missing:
+        async for article in db.articles.find({"id": {"$in": missing}}, ARCHIVE_PROJECTION):
+            archived[article["id"]] = article
+    if saved_copies:
+        for article_id in missing:
+            if article_id not in archived and saved_copies.get(article_id):
+                archived[article_id] = saved_copies[article_id]
+    return [
+        by_id.get(article_id) or archived[article_id]
+        for article_id in article_ids
+        if article_id in by_id or article_id in archived
+    ]
+
+def saved_article_copy(article: dict) -> dict:
+    """Copy of an article kept on its favorites, so it outlives the archive's expiry"""
+    return {k: v for k, v in article.items() if k not in CLUSTER_FIELDS}
+
+async def backfill_saved_articles(batch_size: int = 500):
+    """Copy articles onto favorites saved before copies were kept; already expired ones get None"""
+    while True:
+        saved = await db.favorites.find(
+            {"article": {"$exists": False}}, {"_id": 1, "article_id": 1}
+        ).limit(batch_size).to_list(batch_size)
+        if not saved:
+            return
+        found = {a["id"]: a for a in await hydrate_articles(list({f["article_id"] for f in saved}))}
+        await db.favorites.bulk_write([
+            UpdateOne({"_id": f["_id"]}, {"$set": {"article": (
+                saved_article_copy(found[f["article_id"]]) if f["article_id"] in found else None
+            )}})
+            for f in saved
+        ], ordered=False)
+
+async def migrate_embedded_favorites():
+    """Move favorites stored as an array on user documents into the favorites collection"""
+    migrated = 0
+    async for user in db.users.find({"favorites.0": {"$exists": True}}, {"id": 1, "favorites": 1}):
+        # The array is in insertion order; keep that order in saved_at
+        now = datetime.utcnow()
+        count = len(user["favorites"])
+        operations = [
+            UpdateOne(
+                {"user_id": user["id"], "article_id": article_id},
+                {"$setOnInsert": {"saved_at": now - timedelta(milliseconds=count - i)}},
+                upsert=True,
+            )
+            for i, article_id in enumerate(user["favorites"])
+        ]
+        await db.favorites.bulk_write(operations, ordered=False)
+        await db.users.update_one({"_id": user["_id"]}, {"$unset": {"favorites": ""}})
+        migrated += 1
+    if migrated:
+        logger.info(f"Migrated favorites of {migrated} users")
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Get the shared HTTP session, creating it on first use"""
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=FEED_CONNECTION_LIMIT, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=10),
+            headers={"User-Agent": FEED_USER_AGENT},
+        )
+    return http_session
+
+def get_parse_executor() -> Executor:
+    """Get the executor that parses feeds off the event loop, creating it on first use"""
+    global parse_executor
+    if parse_executor is None:
+        if FEED_PARSE_EXECUTOR == 'process':
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            parse_executor = ProcessPoolExecutor(max_workers=FEED_PARSE_WORKERS, mp_context=multiprocessing.get_context(start_method))
+        else:
+            parse_executor = ThreadPoolExecutor(max_workers=FEED_PARSE_WORKERS, thread_name_prefix="feed-parse")
+    return parse_executor
 
-async def fetch_rss_feed(source: dict) -> List[dict]:
-    """Fetch RSS feed from a single source"""
-    articles = []
+async def run_parse(content: bytes, source: dict, max_entries: int = FEED_MAX_ENTRIES, encoding: Optional[str] = None) -> List[dict]:
+    """Parse a feed body in the parse executor, replacing the pool if a worker died"""
+    global parse_executor
+    loop = asyncio.get_running_loop()
     try:
-        timeout = aiohttp.ClientTimeout(total=10)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(source['url']) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    feed = feedparser.parse(content)
+        return await loop.run_in_executor(get_parse_executor(), parse_feed, content, source, max_entries, encoding)
+    except BrokenExecutor:
+        parse_executor = None
+        raise
+
+XML_ENCODING_PATTERN = re.compile(rb'^\s*<\?xml[^>]*?encoding\s*=\s*["\']([A-Za-z0-9._:-]+)["\']')
+
+def detect_feed_encoding(head: bytes, charset: Optional[str]) -> str:
+    """Encoding of a feed body: byte order mark, then XML declaration, then HTTP charset"""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    match = XML_ENCODING_PATTERN.match(head)
+    for candidate in (match.group(1).decode('ascii') if match else None, charset):
+        if not candidate:
+            continue
+        try:
+            return codecs.lookup(candidate).name
+        except LookupError:
+            continue
+    return "utf-8"
+
+def local_name(tag: str) -> str:
+    """Element name without its XML namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+def entry_key(element: ET.Element) -> Optional[str]:
+    """Identity of a feed entry, preferring the same fields as its article ID: guid/id, link, title"""
+    fields = {}
+    for child in element:
+        name = local_name(child.tag)
+        if name not in fields:
+            fields[name] = (child.text or child.get('href') or '').strip()
+    return fields.get('guid') or fields.get('id') or fields.get('link') or fields.get('title') or None
+
+class FeedScanner:
+    """Watches a feed body while it downloads and says when enough of it has been read
+    
+    Chunks go through a pull parser that only looks at entry boundaries; the full
+    parse is still feedparser's, on the prefix read so far. Bodies that are not
+    well-formed XML stop the scan and are read whole (up to FEED_MAX_BYTES).
+    """
+    
+    def __init__(self, max_entries: int, known_key: Optional[str], charset: Optional[str]):
+        self.max_entries = max_entries
+        self.known_key = known_key
+        self.charset = charset
+        self.parser = ET.XMLPullParser(events=("end",))
+        self.encoding: Optional[str] = None
+        self.decoder = None
+        self.head = b""  # start of the body, until the encoding is known
+        self.entries = 0  # complete entries before the known one
+        self.first_key: Optional[str] = None
+        self.reached_known = False
+        self.failed = False
+    
+    def feed(self, chunk: bytes) -> bool:
+        """Scan the next chunk; True once the newest entries have all been read"""
+        if self.failed:
+            return False
+        try:
+            if self.decoder is None:
+                # Decode ourselves and feed text, so an HTTP-only charset is honoured too.
+                # Chunks can be tiny: wait for the whole XML declaration first
+                self.head += chunk
+                if len(self.head) < 256 and b"?>" not in self.head:
+                    return False
+                chunk, self.head = self.head, b""
+                self.encoding = detect_feed_encoding(chunk[:256], self.charset)
+                self.decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+            self.parser.feed(self.decoder.decode(chunk))
+            for _, element in self.parser.read_events():
+                if local_name(element.tag) not in ("item", "entry"):
+                    continue
+                key = entry_key(element)
+                element.clear()
+                if self.first_key is None:
+                    self.first_key = key
+                if key is not None and key == self.known_key:
+                    self.reached_known = True
+                    return True
+                self.entries += 1
+                if self.entries >= self.max_entries:
+                    return True
+        except (ET.ParseError, UnicodeError, LookupError):
+            self.failed = True
+        return False
+
+async def fetch_rss_feed(source: dict) -> Optional[List[dict]]:
+    """Fetch RSS feed from a single source (None if unchanged or the fetch failed)
+
+    The outcome ("ok", "not_modified" or "error") is recorded in the source state.
+    """
+    state = get_feed_state(source)
+    state["last_outcome"] = "error"
+    started = time.perf_counter()
+    try:
+        # Conditional GET: let the server answer 304 when the feed hasn't changed
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        
+        session = get_http_session()
+        async with session.get(source['url'], headers=headers) as response:
+            if response.status == 304:
+                state["fetch_seconds"] = time.perf_counter() - started
+                state["last_bytes"] = 0
+                state["last_outcome"] = "not_modified"
+                return None
+            if response.status != 200:
+                raise ValueError(f"unexpected status {response.status}")
+            
+            # Stream the body, stopping as soon as the new entries have been read
+            scanner = FeedScanner(FEED_MAX_ENTRIES, state["newest_key"], response.charset)
+            chunks = []
+            size = 0
+            done = False
+            async for chunk in response.content.iter_chunked(FEED_CHUNK_SIZE):
+                chunk = chunk[:FEED_MAX_BYTES - size]
+                chunks.append(chunk)
+                size += len(chunk)
+                done = scanner.feed(chunk)
+                if done or size >= FEED_MAX_BYTES:
+                    break
+            content = b"".join(chunks)
+            fetched = time.perf_counter()
+            if not done and size >= FEED_MAX_BYTES:
+                logger.warning(f"{source['name']}: feed cut off at {FEED_MAX_BYTES} bytes")
+            
+            # Parsing, HTML cleanup and classification are CPU-bound: keep them off the event loop
+            if scanner.reached_known:
+                # Only the entries above the one seen last time are new; keep the rest
+                articles = await run_parse(content, source, scanner.entries, scanner.encoding) if scanner.entries else []
+                fresh = {a['id'] for a in articles}
+                articles += [a for a in state["articles"] if a['id'] not in fresh]
+                articles = articles[:FEED_MAX_ENTRIES]
+            else:
+                # A body cut at the byte cap ends in a partial entry: keep the complete ones
+                cut = not done and size >= FEED_MAX_BYTES and not scanner.failed
+                articles = await run_parse(content, source, scanner.entries if cut else FEED_MAX_ENTRIES, scanner.encoding)
+            if scanner.first_key is not None or scanner.failed:
+                state["newest_key"] = scanner.first_key
+            
+            state["fetch_seconds"] = fetched - started
+            state["parse_seconds"] = time.perf_counter() - fetched
+            state["last_bytes"] = len(content)
+            state["total_bytes"] += len(content)
+            FEED_FETCH_SECONDS.observe(state["fetch_seconds"], source['name'])
+            FEED_PARSE_SECONDS.observe(state["parse_seconds"], source['name'])
+            FEED_BYTES.inc(source['name'], amount=len(content))
+            
+            # Remember validators only once the body was parsed successfully
+            state["etag"] = response.headers.get("ETag")
+            state["last_modified"] = response.headers.get("Last-Modified")
                     
-                    for entry in feed.entries[:15]:  # Limit to 15 per source
-                        published = None
-                        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                            try:
-                                published = datetime(*entry.published_parsed[:6])
-                            except:
-                                published = datetime.utcnow()
-                        
-                        title = entry.get('title', '')
-                        description = entry.get('summary', entry.get('description', ''))
-                        
-                        # Remove HTML tags from description
-                        import re
-                        description = re.sub('<[^<]+?>', '', description)[:500]
-                        
-                        article = {
-                            "id": str(uuid.uuid4()),
-                            "title": title,
-                            "description": description,
-                            "link": entry.get('link', ''),
-                            "source": source['name'],
-                            "source_language": source['language'],
-                            "category": classify_article(title, description) if source['category'] == 'عام' else source['category'],
-                            "image": extract_image(entry),
-                            "published_date": published,
-                            "guid": entry.get('id', entry.get('link', str(uuid.uuid4()))),
-                            "is_translated": False,
-                            "is_summarized": False
-                        }
-                        articles.append(article)
-                        
     except Exception as e:
-        logger.error(f"Error fetching {source['name']}: {str(e)}")
+        state["fetch_seconds"] = time.perf_counter() - started
+        state["last_error"] = str(e) or type(e).__name__
+        logger.error(f"Error fetching {source['name']}: {state['last_error']}")
+        return None
     
+    state["last_outcome"] = "ok"
+    logger.debug(f"Fetched {source['name']}: {len(articles)} articles, fetch {state['fetch_seconds']:.3f}s, parse {state['parse_seconds']:.3f}s")
     return articles
 
-async def fetch_all_news() -> List[dict]:
-    """Fetch news from all sources"""
-    current_time = time.time()
+def spawn_background(coro) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference until it finishes"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+def get_feed_state(source: dict) -> dict:
+    """Get (or create) the refresh state of a source"""
+    state = feed_state.get(source['name'])
+    if state is None:
+        state = {
+            "articles": [],
+            "refreshing": False,
+            "next_refresh": 0,
+            "last_success": None,
+            "etag": None,
+            "last_modified": None,
+            "newest_key": None,  # identity of the feed's first entry on the last poll
+            "fetch_seconds": None,
+            "parse_seconds": None,
+            # Scheduling and circuit breaker
+            "interval": source.get('refresh_interval', rss_cache["cache_duration"]),
+            "consecutive_failures": 0,
+            "circuit_open_until": 0,
+            # Health statistics
+            "last_outcome": None,
+            "last_error": None,
+            "last_bytes": 0,
+            "total_bytes": 0,
+            "last_items": 0,
+            "last_new_items": 0,
+            "polls": 0,
+            "errors": 0,
+            "outcomes": deque(maxlen=FEED_OUTCOME_WINDOW),
+        }
+        feed_state[source['name']] = state
+    return state
+
+def article_sort_key(article: dict) -> tuple:
+    """Snapshot ordering key: published date, then ID"""
+    return (article.get('published_date') or datetime.min, article['id'])
+
+def encode_cursor(article: dict) -> str:
+    """Cursor pointing just past an article in snapshot order"""
+    published = article.get('published_date')
+    return f"{published.isoformat() if published else ''},{article['id']}"
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Naive UTC datetime, the way dates are stored and compared"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def decode_cursor(cursor: str) -> tuple:
+    """Parse a `<published_date>,<id>` cursor into a sort key"""
+    published, separator, article_id = cursor.rpartition(',')
+    if not separator or not article_id:
+        raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+    try:
+        return (to_naive_utc(datetime.fromisoformat(published)) if published else datetime.min, article_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+
+def parse_date_param(value: Optional[str]) -> Optional[datetime]:
+    """Parse an ISO date/datetime query parameter as naive UTC (dates are stored that way)"""
+    if not value:
+        return None
+    try:
+        return to_naive_utc(datetime.fromisoformat(value))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="تاريخ غير صالح")
+
+def page_before(view: tuple, cursor_key: tuple) -> int:
+    """Index of the first article in a newest-first view that sorts strictly after the cursor"""
+    low, high = 0, len(view)
+    while low < high:
+        mid = (low + high) // 2
+        if article_sort_key(view[mid]) >= cursor_key:
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+def merge_view(view: tuple, drop: set, add: list) -> tuple:
+    """A newest-first view without the `drop` IDs and with `add` merged in, in one pass"""
+    kept = [a for a in view if a['id'] not in drop] if drop else view
+    if not add:
+        return tuple(kept)
+    add = sorted(add, key=article_sort_key, reverse=True)
+    return tuple(heapq.merge(kept, add, key=article_sort_key, reverse=True))
+
+def rebuild_snapshot():
+    """Merge the latest articles of every source into the snapshot served by the API
     
-    # Check cache
-    if rss_cache["articles"] and (current_time - rss_cache["last_update"]) < rss_cache["cache_duration"]:
-        return rss_cache["articles"]
+    Only what changed since the last snapshot is reworked: clusters touching new,
+    replaced or evicted records are recomputed and merged into the sorted views.
+    """
+    started = time.perf_counter()
+    # Every source's latest fetch joins the hot window and is kept there while current
+    pinned = set()
+    for source in RSS_SOURCES:
+        state = feed_state.get(source['name'])
+        if state:
+            for article in state["articles"]:
+                hot_window.put(article)
+                pinned.add(article['id'])
+    hot_window.enforce(pinned)
+    new_articles = {a['id']: a for a in apply_window_changes()}
+    # Cluster fields grow the records they are written to; evict again if that put the
+    # window over its caps (each pass evicts something, so this ends)
+    while hot_window.enforce(pinned):
+        new_articles.update((a['id'], a) for a in apply_window_changes())
+    SNAPSHOT_REBUILD_SECONDS.observe(time.perf_counter() - started)
     
-    # Fetch from all sources in parallel
-    tasks = [fetch_rss_feed(source) for source in RSS_SOURCES]
-    results = await asyncio.gather(*tasks)
+    # Push stories that are new to this snapshot to streaming clients
+    canonical_of = rss_cache["canonical_of"]
+    new_articles = [a for a in new_articles.values() if canonical_of.get(a['id']) == a['id']]
+    if new_articles:
+        news_hub.publish(sorted(new_articles, key=article_sort_key, reverse=True))
+
+def apply_window_changes() -> List[dict]:
+    """Bring the snapshot's clusters, views and search index in step with the hot window;
+    return the canonical articles of stories that are new to the snapshot"""
+    records = hot_window.records
     
-    # Flatten and sort by date
-    all_articles = []
-    for articles in results:
-        all_articles.extend(articles)
+    by_id = rss_cache["by_id"]
+    canonical_of = rss_cache["canonical_of"]
+    categories_of = rss_cache["categories_of"]
+    cluster_members = rss_cache["cluster_members"]
+    removed = {article_id for article_id in by_id if article_id not in records}
+    added = [record for article_id, record in records.items() if by_id.get(article_id) is not record]
+    replaced = {record['id'] for record in added if record['id'] in by_id}
     
-    # Sort by published date (newest first)
-    all_articles.sort(key=lambda x: x.get('published_date') or datetime.min, reverse=True)
+    # Clusters that lose, gain or change a member are dissolved and formed again
+    dissolved = {canonical_of[article_id] for article_id in removed | replaced}
+    for article_id in removed | replaced:
+        story_index.remove(article_id)
+    for record in added:
+        story_index.add(record)
+        dissolved.update(canonical_of[i] for i in story_index.edges[record['id']] if i in canonical_of)
+    old_canonicals = {canonical_id: by_id[canonical_id] for canonical_id in dissolved}
+    touched_categories = set()
+    seeds = set()
+    for canonical_id in dissolved:
+        touched_categories.update(categories_of.pop(canonical_id))
+        seeds.update(cluster_members.pop(canonical_id))
+    removed_sources = {by_id[article_id].get('source') for article_id in removed}
+    for article_id in removed:
+        del by_id[article_id]
+        del canonical_of[article_id]
+    for record in added:
+        by_id[record['id']] = record
+        seeds.add(record['id'])
+    seeds -= removed
     
-    # Update cache
-    rss_cache["articles"] = all_articles
-    rss_cache["last_update"] = current_time
+    # Collapse copies of the same story into clusters; only canonical articles are listed
+    new_canonicals = []
+    for members in cluster_articles([by_id[i] for i in seeds], by_id):
+        canonical = members[0]
+        new_canonicals.append(canonical)
+        # An earlier-published copy that arrives later takes over; it keeps the story's enrichment
+        for member in members[1:]:
+            if member['id'] in old_canonicals:
+                inherit_enrichment(canonical, member)
+        categories = []
+        for member in members:
+            canonical_of[member['id']] = canonical['id']
+            member['cluster_id'] = canonical['id']
+            member.pop('cluster_size', None)
+            member.pop('related', None)
+            if member.get('category') not in categories:
+                categories.append(member.get('category'))
+        canonical['cluster_size'] = len(members)
+        canonical['related'] = [
+            {"id": m['id'], "source": m['source'], "link": m.get('link', '')} for m in members[1:]
+        ]
+        for member in members:
+            hot_window.resize(member['id'])
+        cluster_members[canonical['id']] = tuple(m['id'] for m in members)
+        categories_of[canonical['id']] = categories
+        touched_categories.update(categories)
     
-    return all_articles
+    # Merge the changes into the views, each newest first with ties broken by ID so
+    # cursors are stable. A story is listed under every category its copies carry;
+    # source views keep each source's own copy
+    drop = dissolved | removed
+    by_category = dict(rss_cache["by_category"])
+    for category in touched_categories:
+        view = merge_view(
+            by_category.get(category, ()), drop,
+            [c for c in new_canonicals if category in categories_of[c['id']]],
+        )
+        if view:
+            by_category[category] = view
+        else:
+            by_category.pop(category, None)
+    by_source = dict(rss_cache["by_source"])
+    for source_name in removed_sources | {a.get('source') for a in added}:
+        view = merge_view(
+            by_source.get(source_name, ()), removed | replaced,
+            [a for a in added if a.get('source') == source_name],
+        )
+        if view:
+            by_source[source_name] = view
+        else:
+            by_source.pop(source_name, None)
+    
+    # Keep the search index in step with the snapshot (canonical articles only); a story
+    # whose canonical record is unchanged stays indexed as it is
+    still_canonical = {a['id'] for a in new_canonicals if old_canonicals.get(a['id']) is a}
+    for article_id in drop - still_canonical:
+        search_index.remove(article_id)
+    for article in new_canonicals:
+        if article['id'] not in still_canonical:
+            search_index.add(article)
+    
+    # Swap in the new views (readers keep the tuples they already hold)
+    rss_cache["articles"] = merge_view(rss_cache["articles"], drop, new_canonicals)
+    rss_cache["by_category"] = by_category
+    rss_cache["by_source"] = by_source
+    rss_cache["version"] += 1
+    rss_cache["last_update"] = time.time()
+    return [a for a in new_canonicals if a['id'] not in old_canonicals]
 
-# ============== AI Functions ==============
-async def translate_text(text: str, source_lang: str = "en") -> str:
-    """Translate text to Arabic using AI"""
+# Fields owned by AI processing; feed refreshes must not overwrite them
+AI_FIELDS = ("is_translated", "is_summarized", "summary", "translated_title", "translated_description")
+
+def inherit_enrichment(canonical: dict, previous: dict):
+    """Give a new canonical article the summary and translation its cluster's previous canonical had"""
+    if not canonical.get('is_summarized') and previous.get('is_summarized'):
+        canonical['summary'] = previous.get('summary')
+        canonical['is_summarized'] = True
+    if canonical.get('source_language') != 'ar' and not canonical.get('is_translated') and previous.get('is_translated'):
+        canonical['translated_title'] = previous.get('translated_title')
+        canonical['translated_description'] = previous.get('translated_description')
+        canonical['is_translated'] = True
+# Fields describing the current snapshot's clustering; not persisted
+CLUSTER_FIELDS = ("cluster_id", "cluster_size", "related")
+
+async def store_articles(articles: List[dict]):
+    """Upsert fetched articles into the persistent articles collection"""
+    if not articles:
+        return
+    now = datetime.utcnow()
+    operations = []
+    for article in articles:
+        fields = {k: v for k, v in article.items() if k not in AI_FIELDS and k not in CLUSTER_FIELDS}
+        fields.update(archive_fields(article))
+        fields["updated_at"] = now
+        # Enrichment already on the record (e.g. inherited from a previous canonical copy) is kept
+        fields.update((k, article[k]) for k in AI_FIELDS if article.get(k))
+        defaults = {"first_seen": now}
+        defaults.update((k, False) for k in ("is_translated", "is_summarized") if k not in fields)
+        operations.append(UpdateOne({"id": article['id']}, {"$set": fields, "$setOnInsert": defaults}, upsert=True))
     try:
-        from emergentintegrations.llm.chat import LlmChat, UserMessage
+        await db.articles.bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.error(f"Error storing articles: {str(e)}")
+
+def estimate_poll_interval(state: dict, articles: List[dict], new_items: int) -> float:
+    """Pick the next poll interval from the feed's observed publish rate"""
+    dates = sorted((a['published_date'] for a in articles if a.get('published_date')), reverse=True)
+    if len(dates) >= 2:
+        # Average gap between items; a feed that has gone quiet is treated as slower
+        gap = (dates[0] - dates[-1]).total_seconds() / (len(dates) - 1)
+        gap = max(gap, (datetime.utcnow() - dates[0]).total_seconds())
+        target = gap / 2
+    elif new_items:
+        target = state["interval"] / 2
+    else:
+        target = state["interval"] * 1.5
+    # Smooth so a single burst doesn't swing the schedule
+    interval = (state["interval"] + target) / 2
+    return min(max(interval, FEED_MIN_INTERVAL), FEED_MAX_INTERVAL)
+
+def record_poll(state: dict, source: dict, articles: Optional[List[dict]], new_items: int) -> float:
+    """Update health statistics and the circuit breaker; return the delay until the next poll"""
+    outcome = state["last_outcome"]
+    state["polls"] += 1
+    FEED_POLLS.inc(source['name'], outcome)
+    state["outcomes"].append(outcome == "error")
+    
+    if outcome == "error":
+        state["errors"] += 1
+        state["consecutive_failures"] += 1
+        failures = state["consecutive_failures"]
+        if failures >= FEED_FAILURE_THRESHOLD:
+            # Open the circuit: skip the source, doubling the pause on each further failure
+            delay = min(FEED_BACKOFF_BASE * 2 ** (failures - FEED_FAILURE_THRESHOLD), FEED_BACKOFF_MAX)
+            state["circuit_open_until"] = time.time() + delay
+            logger.warning(f"Circuit open for {source['name']} after {failures} failures, retrying in {delay:.0f}s")
+            return delay
+        return state["interval"]
+    
+    if state["consecutive_failures"] >= FEED_FAILURE_THRESHOLD:
+        logger.info(f"Circuit closed for {source['name']}")
+    state["consecutive_failures"] = 0
+    state["circuit_open_until"] = 0
+    
+    if outcome != "not_modified":
+        state["last_items"] = len(articles)
+        state["last_new_items"] = new_items
+    if 'refresh_interval' in source:
+        return source['refresh_interval']
+    if outcome == "not_modified":
+        state["interval"] = min(state["interval"] * FEED_NOT_MODIFIED_GROWTH, FEED_MAX_INTERVAL)
+    else:
+        state["interval"] = estimate_poll_interval(state, articles, new_items)
+    return state["interval"]
+
+async def refresh_source(source: dict):
+    """Refresh a single source; at most one refresh per source runs at a time"""
+    state = get_feed_state(source)
+    if state["refreshing"]:
+        return
+    state["refreshing"] = True
+    started = time.perf_counter()
+    articles = None
+    new_items = 0
+    try:
+        articles = await fetch_rss_feed(source)
+        # On failure keep serving the articles from the last successful fetch
+        if articles is not None:
+            # Keep unchanged articles (and their AI enrichment) as they are; queue the rest
+            previous = {a['id'] for a in state["articles"]}
+            articles = [current_record(article) for article in articles]
+            new_items = sum(1 for article in articles if article['id'] not in previous)
+            state["articles"] = articles
+            state["last_success"] = time.time()
+            rebuild_snapshot()
+            await store_articles(articles)
+            for article in articles:
+                if rss_cache["canonical_of"].get(article['id']) == article['id']:
+                    enqueue_enrichment(article)
+            if THUMBNAIL_PREFETCH:
+                images = [
+                    a['image'] for a in articles
+                    if a['id'] not in previous and a.get('image') and rss_cache["canonical_of"].get(a['id']) == a['id']
+                ]
+                if images:
+                    spawn_background(prefetch_thumbnails(images))
+    except asyncio.CancelledError:
+        # Ingestion stopped mid-refresh; that is not a poll of the source
+        state["refreshing"] = False
+        raise
+    finally:
+        if state["refreshing"]:
+            state["refreshing"] = False
+            state["next_refresh"] = time.time() + record_poll(state, source, articles, new_items)
+            FEED_REFRESH_SECONDS.observe(time.perf_counter() - started, source['name'])
+
+def source_health(source: dict) -> dict:
+    """Polling statistics of a single source"""
+    state = get_feed_state(source)
+    now = time.time()
+    outcomes = state["outcomes"]
+    if state["circuit_open_until"] > now:
+        status_name = "open"
+    elif state["consecutive_failures"]:
+        status_name = "degraded"
+    elif state["polls"]:
+        status_name = "ok"
+    else:
+        status_name = "pending"
+    return {
+        "name": source['name'],
+        "url": source['url'],
+        "status": status_name,
+        "poll_interval": round(state["interval"]),
+        "next_poll_in": max(0, round(state["next_refresh"] - now)),
+        "consecutive_failures": state["consecutive_failures"],
+        "polls": state["polls"],
+        "errors": state["errors"],
+        "error_rate": round(sum(outcomes) / len(outcomes), 3) if outcomes else None,
+        "last_outcome": state["last_outcome"],
+        "last_error": state["last_error"],
+        "latency_seconds": round(state["fetch_seconds"], 3) if state["fetch_seconds"] is not None else None,
+        "parse_seconds": round(state["parse_seconds"], 3) if state["parse_seconds"] is not None else None,
+        "last_bytes": state["last_bytes"],
+        "total_bytes": state["total_bytes"],
+        "items": state["last_items"],
+        "new_items": state["last_new_items"],
+        "last_success_age": round(now - state["last_success"]) if state["last_success"] else None,
+    }
+
+async def feed_scheduler():
+    """Background loop that refreshes each source when its interval elapses"""
+    while True:
+        try:
+            now = time.time()
+            for source in RSS_SOURCES:
+                state = get_feed_state(source)
+                if not state["refreshing"] and now >= state["next_refresh"]:
+                    task = spawn_background(refresh_source(source))
+                    refresh_tasks.add(task)
+                    task.add_done_callback(refresh_tasks.discard)
+        except Exception as e:
+            logger.error(f"Feed scheduler error: {str(e)}")
+        await asyncio.sleep(FEED_SCHEDULER_TICK)
+
+# ============== Search Index ==============
+TOKEN_PATTERN = re.compile(r'\w+')
+
+# Light stemming rules, applied identically to documents and queries. Latin words lose an
+# inflection (plural/definite/possessive), then a verb ending, so that stacked forms such as
+# "regeringen"/"regeringarna" or "runs"/"running" end at the same stem
+ARABIC_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+ARABIC_SUFFIXES = ("ها", "ان", "ات", "ون", "ين", "يه", "ه", "ي")
+LATIN_INFLECTIONS = (
+    ("ernas", ""), ("arnas", ""), ("ornas", ""), ("arna", ""), ("erna", ""), ("orna", ""),
+    ("ies", "y"), ("ens", ""), ("ets", ""), ("es", ""), ("en", ""), ("et", ""),
+    ("ar", ""), ("er", ""), ("or", ""), ("s", ""),
+)  # longest first
+LATIN_VERB_ENDINGS = (("ied", "y"), ("ing", ""), ("ed", ""), ("e", ""))
+MIN_STEM_LENGTH = 3
+SEARCH_TERMS_VERSION = 2  # bump when tokenize changes, so archived search terms are recomputed
+
+def strip_suffix(token: str, rules: tuple) -> tuple:
+    """Apply the first (longest) matching suffix rule; (token, whether one matched)"""
+    for suffix, replacement in rules:
+        if token.endswith(suffix) and len(token) - len(suffix) + len(replacement) >= MIN_STEM_LENGTH:
+            return token[:len(token) - len(suffix)] + replacement, True
+    return token, False
+
+def strip_arabic_prefix(token: str) -> str:
+    """Remove a leading article/preposition clitic such as ال or وال"""
+    for prefix in ARABIC_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            return token[len(prefix):]
+    return token
+
+@lru_cache(maxsize=65536)
+def stem_token(token: str) -> str:
+    """Strip common Arabic clitics/suffixes and Latin inflections"""
+    if token[0] < '\u0600':
+        token, _ = strip_suffix(token, LATIN_INFLECTIONS)
+        token, stripped = strip_suffix(token, LATIN_VERB_ENDINGS)
+        # "running" -> "runn" -> "run", like "runs" -> "run"
+        if stripped and len(token) > MIN_STEM_LENGTH and token[-1] == token[-2] and token[-1] not in "aeiouyåäö":
+            token = token[:-1]
+        return token
+    token, _ = strip_suffix(strip_arabic_prefix(token), tuple((suffix, "") for suffix in ARABIC_SUFFIXES))
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized, stemmed search terms"""
+    return [stem_token(t) for t in TOKEN_PATTERN.findall(normalize_text(text))]
+
+class SearchIndex:
+    """Incrementally built inverted index over article titles and descriptions, ranked with BM25"""
+    
+    TITLE_WEIGHT = 2
+    K1 = 1.2
+    B = 0.75
+    
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_dates: Dict[str, float] = {}
+        self.total_length = 0
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+    
+    def __len__(self) -> int:
+        return len(self.doc_terms)
+    
+    def add(self, article: dict):
+        doc_id = article['id']
+        if doc_id in self.doc_terms:
+            self.remove(doc_id)
+        terms: Dict[str, int] = {}
+        for term in tokenize(article.get('title', '')):
+            terms[term] = terms.get(term, 0) + self.TITLE_WEIGHT
+        for term in tokenize(article.get('description', '')):
+            terms[term] = terms.get(term, 0) + 1
+        for term, tf in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._vocabulary_dirty = True
+            postings[doc_id] = tf
+        length = sum(terms.values())
+        self.doc_terms[doc_id] = terms
+        self.doc_lengths[doc_id] = length
+        published = article.get('published_date')
+        self.doc_dates[doc_id] = published.timestamp() if published else 0.0
+        self.total_length += length
+    
+    def remove(self, doc_id: str):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+                    self._vocabulary_dirty = True
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        self.doc_dates.pop(doc_id, None)
+    
+    def _expand_prefix(self, term: str) -> List[str]:
+        """Terms starting with a (partially typed) query term"""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self.postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, term)
+        matches = []
+        for candidate in self._vocabulary[start:start + 20]:
+            if not candidate.startswith(term):
+                break
+            matches.append(candidate)
+        return matches
+    
+    def search(self, query: str, limit: int = 30, offset: int = 0,
+               since: Optional[datetime] = None, until: Optional[datetime] = None) -> tuple:
+        """Return (ranked article IDs for the requested page, total matches); all query terms must match.
         
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not api_key:
-            return text
+        since/until restrict matches to articles published in [since, until).
+        """
+        raw_terms = TOKEN_PATTERN.findall(normalize_text(query))
+        if not raw_terms or not self.doc_terms:
+            return [], 0
         
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=f"translate_{uuid.uuid4()}",
-            system_message="أنت مترجم محترف. ترجم النص التالي إلى اللغة العربية الفصحى. لا تضف أي تعليقات أو شروحات، فقط الترجمة."
-        ).with_model("openai", "gpt-5.2")
+        # Each query term becomes a group of index terms; an unknown last term
+        # is treated as partially typed and expanded by prefix
+        groups = []
+        for i, raw in enumerate(raw_terms):
+            term = stem_token(raw)
+            if term in self.postings:
+                group = [term]
+            elif i == len(raw_terms) - 1:
+                # Expand on the form tokenize indexes: no ال prefix, and the stem if it has one
+                partial = strip_arabic_prefix(raw) if raw[0] >= '\u0600' else raw
+                group = self._expand_prefix(partial)
+                if term != partial:
+                    group = sorted(set(group) | set(self._expand_prefix(term)))
+                if not group:
+                    # Typed past a stem ("regeri" of "regering" -> "reger"): use that stem
+                    for end in range(len(partial) - 1, max(MIN_STEM_LENGTH, len(partial) - 3) - 1, -1):
+                        if partial[:end] in self.postings:
+                            group = [partial[:end]]
+                            break
+            else:
+                group = []
+            if not group:
+                return [], 0
+            groups.append(group)
         
-        lang_name = "الإنجليزية" if source_lang == "en" else "السويدية"
-        message = UserMessage(text=f"ترجم من {lang_name} إلى العربية:\n{text}")
-        response = await chat.send_message(message)
-        return response.strip()
-    except Exception as e:
-        logger.error(f"Translation error: {str(e)}")
-        return text
+        # Intersect candidates, starting from the rarest group
+        group_postings = [[self.postings[t] for t in group] for group in groups]
+        group_postings.sort(key=lambda g: sum(len(p) for p in g))
+        candidates = set()
+        for postings in group_postings[0]:
+            candidates.update(postings)
+        for group in group_postings[1:]:
+            candidates = {d for d in candidates if any(d in p for p in group)}
+            if not candidates:
+                return [], 0
+        if since or until:
+            low = since.timestamp() if since else float('-inf')
+            high = until.timestamp() if until else float('inf')
+            candidates = {d for d in candidates if low <= self.doc_dates[d] < high}
+        
+        # BM25 scoring of the surviving candidates
+        n_docs = len(self.doc_terms)
+        avg_length = self.total_length / n_docs if n_docs else 1.0
+        weights = []
+        for group in group_postings:
+            weights.append([(p, math.log(1 + (n_docs - len(p) + 0.5) / (len(p) + 0.5))) for p in group])
+        
+        def score(doc_id: str) -> tuple:
+            norm = self.K1 * (1 - self.B + self.B * self.doc_lengths[doc_id] / avg_length)
+            total = 0.0
+            for group in weights:
+                for postings, idf in group:
+                    tf = postings.get(doc_id)
+                    if tf:
+                        total += idf * tf * (self.K1 + 1) / (tf + norm)
+            return (total, self.doc_dates.get(doc_id, 0.0))
+        
+        ranked = heapq.nlargest(offset + limit, candidates, key=score)
+        return ranked[offset:offset + limit], len(candidates)
 
-async def summarize_text(text: str) -> str:
-    """Summarize text using AI"""
-    try:
-        from emergentintegrations.llm.chat import LlmChat, UserMessage
+search_index = SearchIndex()
+
+# ============== Story Clustering ==============
+# Exact duplicates share a canonical link or guid. Near-duplicates are found by MinHash
+# LSH over normalized title terms and confirmed by the exact Jaccard similarity
+MINHASH_PERMUTATIONS = 32
+MINHASH_BANDS = 16  # 2 rows per band: pairs above ~0.5 similarity almost always collide
+NEAR_DUPLICATE_JACCARD = 0.6
+NEAR_DUPLICATE_MIN_TERMS = 4  # shorter titles are too ambiguous for near-duplicate matching
+# Each salt yields one 64-byte blake2b digest, i.e. eight independent 64-bit hash functions
+MINHASH_SALTS = [f"minhash-{i}".encode() for i in range(MINHASH_PERMUTATIONS // 8)]
+TRACKING_PARAMS = ("utm_", "at_", "ref", "cmp", "ns_")
+
+def canonical_link(url: str) -> str:
+    """Normalize a link so trivially different URLs of one story compare equal"""
+    parts = urlsplit((url or '').strip())
+    if not parts.netloc:
+        return (url or '').strip()
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = '&'.join(q for q in parts.query.split('&') if q and not q.lower().startswith(TRACKING_PARAMS))
+    return f"{host}{parts.path.rstrip('/')}{'?' + query if query else ''}"
+
+def story_keys(article: dict) -> tuple:
+    """Exact-duplicate keys of an article: its canonical link, and its guid when that is a URL
+    (other guids, such as numeric IDs, are only unique within their own feed)"""
+    keys = set()
+    for url in (article.get('link'), article.get('guid')):
+        if url and urlsplit(url).netloc:
+            keys.add(canonical_link(url))
+    return tuple(keys)
+
+def title_fingerprint(title: str) -> Optional[tuple]:
+    """Normalized title terms and their MinHash signature (None for very short titles)"""
+    terms = frozenset(tokenize(title))
+    if len(terms) < NEAR_DUPLICATE_MIN_TERMS:
+        return None
+    signature = tuple(map(min, zip(*(term_hashes(term) for term in terms))))
+    return terms, signature
+
+def term_hashes(term: str) -> tuple:
+    """MINHASH_PERMUTATIONS independent 64-bit hashes of a term"""
+    data = term.encode('utf-8')
+    values = ()
+    for salt in MINHASH_SALTS:
+        values += struct.unpack('<8Q', hashlib.blake2b(data, digest_size=64, salt=salt).digest())
+    return values
+
+class StoryIndex:
+    """Duplicate links between articles, maintained incrementally.
+    
+    An article is compared with earlier ones once, when it is added: exact keys
+    (canonical link, guid) and MinHash bands give candidates, and Jaccard-confirmed
+    matches become edges. Rebuilding the clusters is then a walk over the edges.
+    """
+    
+    def __init__(self):
+        self.keys: Dict[str, tuple] = {}
+        self.fingerprints: Dict[str, Optional[tuple]] = {}
+        self.key_members: Dict[str, set] = {}
+        self.band_members: Dict[tuple, set] = {}
+        self.edges: Dict[str, set] = {}
+    
+    def __contains__(self, article_id: str) -> bool:
+        return article_id in self.edges
+    
+    def _bands(self, signature: tuple):
+        rows = MINHASH_PERMUTATIONS // MINHASH_BANDS
+        for band in range(MINHASH_BANDS):
+            yield (band, signature[band * rows:(band + 1) * rows])
+    
+    def add(self, article: dict):
+        article_id = article['id']
+        if article_id in self.edges:
+            return
+        neighbours = set()
         
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        if not api_key:
-            return text[:200] + "..."
+        # Exact duplicates: same canonical link or guid
+        keys = story_keys(article)
+        self.keys[article_id] = keys
+        for key in keys:
+            members = self.key_members.setdefault(key, set())
+            neighbours.update(members)
+            members.add(article_id)
         
-        chat = LlmChat(
-            api_key=api_key,
-            session_id=f"summarize_{uuid.uuid4()}",
-            system_message="أنت ملخص أخبار محترف. لخص الخبر التالي في 2-3 جمل قصيرة بالعربية. ركز على المعلومات الأساسية فقط."
-        ).with_model("openai", "gpt-5.2")
+        # Near duplicates: any shared band is a candidate, confirmed by Jaccard similarity
+        fingerprint = title_fingerprint(article.get('title', ''))
+        self.fingerprints[article_id] = fingerprint
+        if fingerprint is not None:
+            terms, signature = fingerprint
+            candidates = set()
+            for band in self._bands(signature):
+                members = self.band_members.setdefault(band, set())
+                candidates.update(members)
+                members.add(article_id)
+            for other_id in candidates - neighbours:
+                other = self.fingerprints[other_id][0]
+                if len(terms & other) >= NEAR_DUPLICATE_JACCARD * len(terms | other):
+                    neighbours.add(other_id)
         
-        message = UserMessage(text=f"لخص هذا الخبر:\n{text}")
-        response = await chat.send_message(message)
-        return response.strip()
+        self.edges[article_id] = neighbours
+        for other_id in neighbours:
+            self.edges[other_id].add(article_id)
+    
+    def remove(self, article_id: str):
+        neighbours = self.edges.pop(article_id, None)
+        if neighbours is None:
+            return
+        for other_id in neighbours:
+            self.edges[other_id].discard(article_id)
+        for key in self.keys.pop(article_id):
+            members = self.key_members[key]
+            members.discard(article_id)
+            if not members:
+                del self.key_members[key]
+        fingerprint = self.fingerprints.pop(article_id)
+        if fingerprint is not None:
+            for band in self._bands(fingerprint[1]):
+                members = self.band_members[band]
+                members.discard(article_id)
+                if not members:
+                    del self.band_members[band]
+
+story_index = StoryIndex()
+
+def cluster_articles(articles: List[dict], by_id: Dict[str, dict]) -> List[List[dict]]:
+    """Clusters of the given articles and every copy linked to them (looked up in `by_id`);
+    each lists its canonical (earliest) article first. Articles must be in story_index.
+    """
+    # Canonical: first published; ties go to the source listed first in RSS_SOURCES
+    source_rank = {source['name']: rank for rank, source in enumerate(RSS_SOURCES)}
+    
+    def canonical_order(article: dict) -> tuple:
+        return (article.get('published_date') or datetime.max, source_rank.get(article.get('source'), len(source_rank)), article['id'])
+    
+    clusters = []
+    visited = set()
+    for article in articles:
+        if article['id'] in visited:
+            continue
+        # Connected component of the duplicate graph
+        visited.add(article['id'])
+        component = [article['id']]
+        for article_id in component:
+            for other_id in story_index.edges[article_id]:
+                if other_id not in visited:
+                    visited.add(other_id)
+                    component.append(other_id)
+        members = [by_id[i] for i in component]
+        members.sort(key=canonical_order)
+        clusters.append(members)
+    return clusters
+
+# ============== Article Retention ==============
+# The snapshot is served from a hot window of recent articles held as compact slot
+# records; everything is also archived in MongoDB, partitioned by month, until it expires
+HOT_WINDOW_MAX_ARTICLES = int(os.environ.get('HOT_WINDOW_MAX_ARTICLES', '5000'))
+HOT_WINDOW_MAX_BYTES = int(os.environ.get('HOT_WINDOW_MAX_MB', '48')) * 1024 * 1024
+HOT_WINDOW_EVICT_TO = 0.9  # evict down to this share of the caps, so eviction runs rarely
+HOT_WINDOW_WARM_BATCH = 250  # archived articles added per snapshot rebuild at startup
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', '180'))
+ARCHIVE_MAX_PARTITIONS = 36  # wider ranges scan without a partition filter
+ARCHIVE_PROJECTION = {"_id": 0, "search_terms": 0, "search_version": 0, "partition": 0, "expires_at": 0}
+
+ARTICLE_FIELDS = (
+    "id", "title", "description", "link", "source", "source_language", "category", "image",
+    "thumbnail", "published_date", "guid", "is_translated", "is_summarized", "summary",
+    "translated_title", "translated_description", "cluster_id", "cluster_size", "related",
+)
+
+class ArticleRecord(MutableMapping):
+    """An article in fixed slots rather than a per-article dict.
+    
+    Reads and writes like a dict of the fields that are set, so parsing,
+    clustering, enrichment and JSON encoding work on it unchanged. Keys
+    outside ARTICLE_FIELDS are rejected.
+    """
+    
+    __slots__ = ARTICLE_FIELDS
+    
+    def __init__(self, fields: dict = ()):
+        for key, value in dict(fields).items():
+            if key in ARTICLE_FIELDS:
+                setattr(self, key, value)
+    
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+    
+    def __setitem__(self, key: str, value):
+        if key not in ARTICLE_FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+    
+    def __delitem__(self, key: str):
+        try:
+            delattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+    
+    def __iter__(self):
+        for key in ARTICLE_FIELDS:
+            if hasattr(self, key):
+                yield key
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def get(self, key: str, default=None):
+        return getattr(self, key, default) if key in ARTICLE_FIELDS else default
+    
+    def copy(self) -> dict:
+        return dict(self.items())
+    
+    def __repr__(self) -> str:
+        return f"ArticleRecord({self.copy()!r})"
+    
+    def footprint(self) -> int:
+        """Approximate bytes held by this record and the values it references"""
+        return sys.getsizeof(self) + sum(value_footprint(getattr(self, key, None)) for key in ARTICLE_FIELDS)
+
+def value_footprint(value) -> int:
+    """Approximate bytes of a field value, including nested lists and dicts (e.g. `related`)"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(value_footprint(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(value_footprint(v) for v in value)
+    if isinstance(value, (str, datetime, float)):
+        return sys.getsizeof(value)
+    return 0  # None, booleans and small ints are shared
+
+class HotWindow:
+    """Most recent articles across all sources, capped by count and by measured size.
+    
+    Articles in a source's latest fetch are never evicted; older ones go oldest
+    first and stay available from the archive. `complete_since` is the newest
+    publish date known to be missing, so ranges after it can be served from memory.
+    """
+    
+    def __init__(self, max_articles: int, max_bytes: int):
+        self.max_articles = max_articles
+        self.max_bytes = max_bytes
+        self.records: Dict[str, ArticleRecord] = {}
+        self.sizes: Dict[str, int] = {}
+        self.bytes = 0
+        self.evicted = 0
+        self.complete_since: Optional[datetime] = None
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def put(self, record: ArticleRecord):
+        article_id = record['id']
+        if self.records.get(article_id) is record:
+            return
+        self.records[article_id] = record
+        self.resize(article_id)
+    
+    def resize(self, article_id: str):
+        """Measure a record again after it was changed in place (enrichment, clustering)"""
+        record = self.records.get(article_id)
+        if record is None:
+            return
+        size = record.footprint()
+        self.bytes += size - self.sizes.get(article_id, 0)
+        self.sizes[article_id] = size
+    
+    def over_caps(self) -> bool:
+        return len(self.records) > self.max_articles or self.bytes > self.max_bytes
+    
+    def get(self, article_id: str) -> Optional[ArticleRecord]:
+        return self.records.get(article_id)
+    
+    def mark_incomplete(self, published: Optional[datetime]):
+        """Articles published up to `published` may be missing from the window"""
+        published = published or datetime.min
+        if self.complete_since is None or published > self.complete_since:
+            self.complete_since = published
+    
+    def covers(self, since: Optional[datetime]) -> bool:
+        """Whether every article published after `since` is in the window"""
+        if self.complete_since is None:
+            return True
+        return since is not None and since > self.complete_since
+    
+    def enforce(self, pinned: set) -> int:
+        """Evict the oldest unpinned records while over either cap; return how many went"""
+        if not self.over_caps():
+            return 0
+        evicted = self.evicted
+        target_count = int(self.max_articles * HOT_WINDOW_EVICT_TO)
+        target_bytes = int(self.max_bytes * HOT_WINDOW_EVICT_TO)
+        for record in sorted(self.records.values(), key=article_sort_key):
+            if len(self.records) <= target_count and self.bytes <= target_bytes:
+                break
+            article_id = record['id']
+            if article_id in pinned:
+                continue
+            del self.records[article_id]
+            self.bytes -= self.sizes.pop(article_id)
+            self.evicted += 1
+            self.mark_incomplete(record.get('published_date'))
+        return self.evicted - evicted
+
+hot_window = HotWindow(HOT_WINDOW_MAX_ARTICLES, HOT_WINDOW_MAX_BYTES)
+
+def current_record(article: dict, enriched: bool = False) -> ArticleRecord:
+    """The hot window's record of a fetched article if it is unchanged, else a new record
+    
+    Reusing records lets rebuild_snapshot skip everything a poll did not change. AI
+    fields are kept from the earlier record unless `enriched` (a leader's snapshot,
+    whose AI fields are the latest).
+    """
+    old = hot_window.get(article['id'])
+    if old is not None and all(old.get(k) == v for k, v in article.items() if k not in AI_FIELDS and k not in CLUSTER_FIELDS):
+        if enriched:
+            old.update({k: article[k] for k in AI_FIELDS if k in article})
+            hot_window.resize(old['id'])
+        return old
+    record = ArticleRecord({k: v for k, v in article.items() if k not in CLUSTER_FIELDS})
+    if old is not None and not enriched:
+        record.update({k: old[k] for k in AI_FIELDS if k in old})
+    return record
+
+def archive_partition(published: Optional[datetime]) -> str:
+    """Monthly archive partition of an article"""
+    return (published or datetime.utcnow()).strftime("%Y-%m")
+
+def month_partitions(since: datetime, until: datetime) -> Optional[List[str]]:
+    """Partitions overlapping [since, until), or None when the range is too wide to list"""
+    partitions = []
+    year, month = since.year, since.month
+    while (year, month) <= (until.year, until.month):
+        partitions.append(f"{year:04d}-{month:02d}")
+        if len(partitions) > ARCHIVE_MAX_PARTITIONS:
+            return None
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return partitions
+
+def archive_fields(article: dict) -> dict:
+    """Archive-only fields: partition, expiry and the terms used for archived search"""
+    published = article.get('published_date')
+    terms = set(tokenize(article.get('title', '')))
+    terms.update(tokenize(article.get('description', '')))
+    return {
+        "partition": archive_partition(published),
+        "expires_at": (published or datetime.utcnow()) + timedelta(days=ARCHIVE_RETENTION_DAYS),
+        "search_terms": sorted(terms),
+        "search_version": SEARCH_TERMS_VERSION,
+    }
+
+def archive_date_query(since: Optional[datetime], until: Optional[datetime]) -> dict:
+    """Date-range filter on the archive, narrowed to its partitions when possible"""
+    query: Dict[str, Any] = {}
+    if since or until:
+        query["published_date"] = {}
+        if since:
+            query["published_date"]["$gte"] = since
+        if until:
+            query["published_date"]["$lt"] = until
+    if since:
+        partitions = month_partitions(since, until or datetime.utcnow())
+        if partitions is not None:
+            query["partition"] = {"$in": partitions}
+    return query
+
+async def browse_archive(category: Optional[str], source: Optional[str], limit: int,
+                         cursor_key: Optional[tuple], since: Optional[datetime], until: Optional[datetime]) -> dict:
+    """A page of archived articles in a date range, newest first (duplicates are not collapsed)"""
+    query = archive_date_query(since, until)
+    if category and category != "الكل":
+        query["category"] = category
+    if source:
+        query["source"] = source
+    total = await db.articles.count_documents(query)
+    if cursor_key:
+        published, article_id = cursor_key
+        query["$or"] = [
+            {"published_date": {"$lt": published}},
+            {"published_date": published, "id": {"$lt": article_id}},
+        ]
+    docs = await db.articles.find(query, ARCHIVE_PROJECTION).sort(
+        [("published_date", -1), ("id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return {"articles": docs[:limit], "total": total, "next_cursor": next_cursor}
+
+async def search_archive(query: str, limit: int, offset: int,
+                         since: Optional[datetime], until: Optional[datetime]) -> dict:
+    """Archived articles containing every query term in a date range, newest first"""
+    terms = tokenize(query)
+    if not terms:
+        return {"articles": [], "total": 0, "query": query, "offset": offset}
+    mongo_query = archive_date_query(since, until)
+    mongo_query["search_terms"] = {"$all": terms}
+    total = await db.articles.count_documents(mongo_query)
+    docs = await db.articles.find(mongo_query, ARCHIVE_PROJECTION).sort(
+        [("published_date", -1), ("id", -1)]
+    ).skip(offset).limit(limit).to_list(limit)
+    return {"articles": docs, "total": total, "query": query, "offset": offset}
+
+async def warm_hot_window():
+    """Fill the hot window from the archive, so history survives restarts"""
+    projection = {key: 1 for key in ARTICLE_FIELDS if key not in CLUSTER_FIELDS}
+    projection["_id"] = 0
+    docs = await db.articles.find({}, projection).sort(
+        [("published_date", -1), ("id", -1)]
+    ).limit(HOT_WINDOW_MAX_ARTICLES).to_list(HOT_WINDOW_MAX_ARTICLES)
+    if len(docs) == HOT_WINDOW_MAX_ARTICLES:
+        hot_window.mark_incomplete(docs[-1].get('published_date'))
+    # Cluster and index in batches, newest first, so requests are served in between
+    for start in range(0, len(docs), HOT_WINDOW_WARM_BATCH):
+        for doc in docs[start:start + HOT_WINDOW_WARM_BATCH]:
+            if hot_window.get(doc['id']) is None:
+                hot_window.put(ArticleRecord(doc))
+        rebuild_snapshot()
+        await asyncio.sleep(0)
+    logger.info(f"Hot window warmed with {len(docs)} archived articles")
+
+async def backfill_archive_fields(batch_size: int = 500):
+    """Add partition, expiry and search terms to articles archived before they existed,
+    or whose search terms came from an older tokenizer"""
+    while True:
+        docs = await db.articles.find(
+            {"search_version": {"$ne": SEARCH_TERMS_VERSION}}, {"_id": 1, "title": 1, "description": 1, "published_date": 1}
+        ).limit(batch_size).to_list(batch_size)
+        if not docs:
+            return
+        await db.articles.bulk_write(
+            [UpdateOne({"_id": doc["_id"]}, {"$set": archive_fields(doc)}) for doc in docs], ordered=False
+        )
+
+# ============== Thumbnails ==============
+# Article images are fetched once, resized to fixed card sizes in WebP and JPEG, and
+# served from a size-capped disk cache so clients never download publishers' originals
+THUMBNAIL_DIR = Path(os.environ.get('THUMBNAIL_DIR', ROOT_DIR / 'thumbnail_cache'))
+THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get('THUMBNAIL_CACHE_MAX_MB', '512')) * 1024 * 1024
+THUMBNAIL_PREFETCH = os.environ.get('THUMBNAIL_PREFETCH', '1') == '1'
+THUMBNAIL_SIZES = {"card": (800, 450), "small": (320, 180)}  # cropped to this aspect, never upscaled
+THUMBNAIL_FORMATS = {
+    # extension -> (Pillow format, media type, save options)
+    "webp": ("WEBP", "image/webp", {"quality": 75, "method": 4}),
+    "jpg": ("JPEG", "image/jpeg", {"quality": 80, "optimize": True, "progressive": True}),
+}
+THUMBNAIL_VARIANTS = {f"{size}.{ext}": ext for size in THUMBNAIL_SIZES for ext in THUMBNAIL_FORMATS}
+THUMBNAIL_MAX_SOURCE_BYTES = 8 * 1024 * 1024
+THUMBNAIL_MAX_PIXELS = 40_000_000  # refuse to decode anything larger (decompression bombs)
+THUMBNAIL_FAILURE_TTL = 3600  # seconds before a failed image is tried again
+THUMBNAIL_CACHE_CONTROL = "public, max-age=31536000, immutable"  # only for URLs tagged with the current image
+THUMBNAIL_MAX_REDIRECTS = 3
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_PREFETCH_CONCURRENCY = 4
+
+THUMBNAILS = Counter("arabismart_thumbnails_total", "Thumbnail lookups by result", ("result",))
+
+thumbnail_executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS, thread_name_prefix="thumbnail")
+thumbnail_inflight: Dict[str, asyncio.Task] = {}  # image key -> running generation
+thumbnail_failures: OrderedDict = OrderedDict()  # image key -> retry time
+thumbnail_prefetch_semaphore = asyncio.Semaphore(THUMBNAIL_PREFETCH_CONCURRENCY)
+
+class ThumbnailCache:
+    """Thumbnail files in one directory, shared by every worker process.
+    
+    The directory itself is the index: lookups read the file, and eviction scans
+    the directory and deletes the least recently used files (by mtime, refreshed
+    on hits) until it is under the size cap. Methods block; call them off the loop.
+    """
+    
+    EVICT_TO = 0.9  # evict down to this share of the cap, so scans run rarely
+    SCAN_INTERVAL = 60  # seconds; picks up files written by other processes
+    TOUCH_INTERVAL = 3600  # hits refresh a file's mtime at most this often
+    STALE_TEMPORARY = 600  # seconds before a leftover .tmp file is removed
+    
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.bytes = 0  # size at the last scan plus this process's writes since
+        self.scanned_at: Optional[float] = None
+        self.lock = threading.Lock()
+    
+    def get(self, name: str) -> Optional[bytes]:
+        """A cached file's contents, or None if missing (possibly evicted by another process)"""
+        path = self.directory / name
+        try:
+            data = path.read_bytes()
+            if time.time() - path.stat().st_mtime > self.TOUCH_INTERVAL:
+                os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+    
+    def put(self, name: str, data: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so a file being read is never seen half-written
+        temporary = self.directory / f"{name}.{uuid.uuid4().hex[:8]}.tmp"
+        temporary.write_bytes(data)
+        os.replace(temporary, self.directory / name)
+        with self.lock:
+            self.bytes += len(data)
+            due = (self.scanned_at is None or self.bytes > self.max_bytes
+                   or time.monotonic() - self.scanned_at > self.SCAN_INTERVAL)
+        if due:
+            self.evict()
+    
+    def evict(self):
+        """Measure the directory and delete least recently used files over the cap"""
+        with self.lock:
+            now = time.time()
+            files = []
+            for entry in os.scandir(self.directory):
+                try:
+                    stat_result = entry.stat()
+                    if entry.name.endswith(".tmp"):
+                        # Another process may still be writing a recent one
+                        if now - stat_result.st_mtime > self.STALE_TEMPORARY:
+                            os.unlink(entry.path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                files.append((stat_result.st_mtime, entry.name, stat_result.st_size))
+            total = sum(size for _, _, size in files)
+            if total > self.max_bytes:
+                target = self.max_bytes * self.EVICT_TO
+                for _, name, size in sorted(files):
+                    if total <= target:
+                        break
+                    (self.directory / name).unlink(missing_ok=True)
+                    total -= size
+            self.bytes = total
+            self.scanned_at = time.monotonic()
+
+thumbnail_cache = ThumbnailCache(THUMBNAIL_DIR, THUMBNAIL_CACHE_MAX_BYTES)
+
+def is_public_address(address: "ipaddress._BaseAddress") -> bool:
+    """Whether an address is globally routable (not private, loopback, link-local, reserved...)"""
+    if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    return address.is_global and not address.is_multicast
+
+class PublicResolver(AbstractResolver):
+    """DNS resolver that drops non-public addresses, so feed-supplied image URLs
+    can't reach services on the server's own network"""
+    
+    def __init__(self):
+        self.resolver = DefaultResolver()
+    
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET):
+        hosts = await self.resolver.resolve(host, port, family)
+        public = [h for h in hosts if is_public_address(ipaddress.ip_address(h["host"]))]
+        if not public:
+            raise OSError(f"{host} has no public address")
+        return public
+    
+    async def close(self):
+        await self.resolver.close()
+
+def check_image_url(image_url: str):
+    """Reject image URLs that aren't http(s) or name a non-public IP literal
+    (host names are checked by PublicResolver when connecting)"""
+    parts = urlsplit(image_url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("unsupported image URL")
+    try:
+        address = ipaddress.ip_address(parts.hostname)
+    except ValueError:
+        return
+    if not is_public_address(address):
+        raise ValueError(f"non-public image address {address}")
+
+def get_image_session() -> aiohttp.ClientSession:
+    """Get the session for source images, which only connects to public addresses"""
+    global image_session
+    if image_session is None or image_session.closed:
+        image_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=THUMBNAIL_PREFETCH_CONCURRENCY * 2, ttl_dns_cache=300,
+                                           resolver=PublicResolver()),
+            timeout=aiohttp.ClientTimeout(total=10),
+            headers={"User-Agent": FEED_USER_AGENT},
+        )
+    return image_session
+
+def render_thumbnails(data: bytes) -> Dict[str, bytes]:
+    """Every size/format variant of one source image (CPU-bound; runs in the thumbnail executor)"""
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width * image.height > THUMBNAIL_MAX_PIXELS:
+            raise ValueError(f"image too large ({image.width}x{image.height})")
+        # JPEGs can be decoded straight at a reduced scale
+        image.draft("RGB", max(THUMBNAIL_SIZES.values()))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            # Flatten transparency onto white; JPEG has no alpha and cards are light
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+    
+    variants = {}
+    for size, (width, height) in THUMBNAIL_SIZES.items():
+        scale = min(1.0, image.width / width, image.height / height)
+        target = (max(1, round(width * scale)), max(1, round(height * scale)))
+        thumbnail = ImageOps.fit(image, target, Image.Resampling.LANCZOS)
+        for ext, (image_format, _, options) in THUMBNAIL_FORMATS.items():
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, format=image_format, **options)
+            variants[f"{size}.{ext}"] = buffer.getvalue()
+    return variants
+
+async def download_image(image_url: str) -> bytes:
+    """Source image bytes, refusing anything over THUMBNAIL_MAX_SOURCE_BYTES or on a non-public host"""
+    session = get_image_session()
+    # Redirects are followed by hand so every hop is checked
+    for _ in range(THUMBNAIL_MAX_REDIRECTS + 1):
+        check_image_url(image_url)
+        async with session.get(image_url, allow_redirects=False) as response:
+            if response.status in (301, 302, 303, 307, 308) and response.headers.get('Location'):
+                image_url = str(response.url.join(URL(response.headers['Location'])))
+                continue
+            return await read_image(response)
+    raise ValueError("too many redirects")
+
+async def read_image(response: aiohttp.ClientResponse) -> bytes:
+    if response.status != 200:
+        raise ValueError(f"unexpected status {response.status}")
+    if (response.content_length or 0) > THUMBNAIL_MAX_SOURCE_BYTES:
+        raise ValueError(f"image too large ({response.content_length} bytes)")
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(FEED_CHUNK_SIZE):
+        size += len(chunk)
+        if size > THUMBNAIL_MAX_SOURCE_BYTES:
+            raise ValueError("image too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def store_thumbnails(data: bytes, key: str) -> Dict[str, bytes]:
+    """Render every variant of a source image and write them to the disk cache (runs in the thumbnail executor)"""
+    variants = render_thumbnails(data)
+    for variant, body in variants.items():
+        thumbnail_cache.put(f"{key}-{variant}", body)
+    return variants
+
+async def generate_thumbnails(image_url: str, key: str) -> Optional[Dict[str, bytes]]:
+    """Fetch an image once and store all its variants; None if it could not be used"""
+    try:
+        data = await download_image(image_url)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(thumbnail_executor, store_thumbnails, data, key)
+    except Exception as e:
+        logger.debug(f"Thumbnail failed for {image_url}: {e!r}")
+        thumbnail_failures[key] = time.time() + THUMBNAIL_FAILURE_TTL
+        thumbnail_failures.move_to_end(key)
+        while len(thumbnail_failures) > 10000:
+            thumbnail_failures.popitem(last=False)
+        return None
+
+async def get_thumbnail(image_url: str, variant: str) -> Optional[bytes]:
+    """A thumbnail's bytes, generating the image's variants on a miss (None on failure)"""
+    key = thumbnail_key(image_url)
+    # Reads go to the default executor so hits don't queue behind renders
+    body = await asyncio.get_running_loop().run_in_executor(None, thumbnail_cache.get, f"{key}-{variant}")
+    if body is not None:
+        THUMBNAILS.inc("hit")
+        return body
+    if thumbnail_failures.get(key, 0) > time.time():
+        THUMBNAILS.inc("failed")
+        return None
+    # Concurrent requests for the same image wait on one download
+    task = thumbnail_inflight.get(key)
+    if task is None:
+        task = spawn_background(generate_thumbnails(image_url, key))
+        thumbnail_inflight[key] = task
+        task.add_done_callback(lambda _: thumbnail_inflight.pop(key, None))
+    variants = await asyncio.shield(task)
+    THUMBNAILS.inc("generated" if variants else "failed")
+    return variants[variant] if variants else None
+
+async def prefetch_thumbnails(image_urls: List[str]):
+    """Generate thumbnails for newly ingested articles before any client asks for them"""
+    async def prefetch(image_url: str):
+        async with thumbnail_prefetch_semaphore:
+            await get_thumbnail(image_url, THUMBNAIL_DEFAULT_VARIANT)
+    await asyncio.gather(*(prefetch(image_url) for image_url in image_urls), return_exceptions=True)
+
+# ============== AI Functions ==============
+LLM_PROVIDER = "openai"
+LLM_MODEL = "gpt-5.2"
+# Single-article prompts; batched requests are cached under keys built from these, so
+# answers cached before batching stay valid (see ai_cache_key)
+SUMMARIZE_SYSTEM_MESSAGE = "أنت ملخص أخبار محترف. لخص الخبر التالي في 2-3 جمل قصيرة بالعربية. ركز على المعلومات الأساسية فقط."
+
+TRANSLATE_ARTICLE_SYSTEM_MESSAGE = (
+    "أنت مترجم محترف. ترجم عنوان الخبر ووصفه إلى اللغة العربية الفصحى. "
+    "أجب فقط بكائن JSON بالشكل {\"title\": \"...\", \"description\": \"...\"} دون أي تعليقات."
+)
+
+# Bounded concurrency and per-call timeout for LLM requests
+LLM_CONCURRENCY = 8
+LLM_CALL_TIMEOUT = 20  # seconds
+llm_semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+
+# Global rate limit and cost cap over a sliding minute. Cost is counted in estimated
+# tokens (input plus output); callers wait when either budget is spent. The defaults are
+# the provider's first usage tier for this model; set them to the account's own limits
+LLM_REQUESTS_PER_MINUTE = int(os.environ.get('LLM_REQUESTS_PER_MINUTE', '500'))
+LLM_TOKENS_PER_MINUTE = int(os.environ.get('LLM_TOKENS_PER_MINUTE', '500000'))
+
+class LlmRateLimiter:
+    """Sliding-window limit on LLM requests and tokens per minute, served in arrival order"""
+    
+    WINDOW = 60.0
+    
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests: deque = deque()  # request times
+        self.usage: deque = deque()  # [time, tokens] per request, settled to actual usage
+        self.tokens = 0
+        self.waiting = 0
+        self.lock = asyncio.Lock()
+    
+    def _prune(self, now: float):
+        while self.requests and self.requests[0] <= now - self.WINDOW:
+            self.requests.popleft()
+        while self.usage and self.usage[0][0] <= now - self.WINDOW:
+            self.tokens -= self.usage.popleft()[1]
+    
+    def _wait_time(self, now: float, tokens: int) -> float:
+        """Seconds until a request of `tokens` may go out (0 if now)"""
+        waits = []
+        if len(self.requests) >= self.requests_per_minute:
+            waits.append(self.requests[0] + self.WINDOW - now)
+        # A request larger than the whole budget still goes out once the window is empty
+        if self.usage and self.tokens + tokens > self.tokens_per_minute:
+            waits.append(self.usage[0][0] + self.WINDOW - now)
+        return max(waits, default=0.0)
+    
+    async def acquire(self, tokens: int) -> list:
+        """Wait until a request of `tokens` fits in the current minute, then count it;
+        return its usage entry for settle()"""
+        self.waiting += 1
+        try:
+            async with self.lock:
+                while True:
+                    now = time.monotonic()
+                    self._prune(now)
+                    wait = self._wait_time(now, tokens)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                entry = [now, tokens]
+                self.requests.append(now)
+                self.usage.append(entry)
+                self.tokens += tokens
+                return entry
+        finally:
+            self.waiting -= 1
+    
+    def settle(self, entry: list, tokens: int):
+        """Replace a request's reserved tokens with its actual usage, while it is still in the window"""
+        if entry[0] > time.monotonic() - self.WINDOW:
+            self.tokens += tokens - entry[1]
+            entry[1] = tokens
+
+llm_rate_limiter = LlmRateLimiter(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE)
+
+# Two-tier cache for AI results: in-memory LRU in front of the ai_cache collection
+AI_CACHE_MEMORY_SIZE = 5000
+AI_CACHE_TTL_SECONDS = 30 * 24 * 3600  # 30 days
+ai_cache_memory: "OrderedDict[str, str]" = OrderedDict()
+
+def ai_cache_key(kind: str, payload: dict) -> str:
+    """Hash of everything that determines one article's summary or translation"""
+    if kind == "summarize":
+        system_message, prompt = SUMMARIZE_SYSTEM_MESSAGE, f"لخص هذا الخبر:\n{payload['text']}"
+    else:
+        lang_name = "الإنجليزية" if payload["lang"] == "en" else "السويدية"
+        fields = json.dumps({"title": payload["title"], "description": payload["description"]}, ensure_ascii=False)
+        system_message, prompt = TRANSLATE_ARTICLE_SYSTEM_MESSAGE, f"ترجم من {lang_name} إلى العربية:\n{fields}"
+    material = f"{LLM_PROVIDER}/{LLM_MODEL}\n{system_message}\n{prompt}"
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+def remember_ai_result(key: str, result: str):
+    """Store a result in the in-memory LRU"""
+    ai_cache_memory[key] = result
+    ai_cache_memory.move_to_end(key)
+    while len(ai_cache_memory) > AI_CACHE_MEMORY_SIZE:
+        ai_cache_memory.popitem(last=False)
+
+async def get_cached_ai_result(key: str) -> Optional[str]:
+    """Look a result up in memory, then in MongoDB"""
+    result = ai_cache_memory.get(key)
+    if result is not None:
+        ai_cache_memory.move_to_end(key)
+        return result
+    try:
+        doc = await db.ai_cache.find_one({"key": key}, {"_id": 0, "result": 1})
     except Exception as e:
-        logger.error(f"Summarization error: {str(e)}")
-        return text[:200] + "..."
+        logger.error(f"AI cache lookup error: {str(e)}")
+        return None
+    if doc:
+        remember_ai_result(key, doc["result"])
+        return doc["result"]
+    return None
+
+async def store_ai_result(key: str, kind: str, result: str):
+    """Store a result in both cache tiers"""
+    remember_ai_result(key, result)
+    try:
+        await db.ai_cache.update_one(
+            {"key": key},
+            {"$set": {"kind": kind, "result": result, "created_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    except Exception as e:
+        logger.error(f"AI cache store error: {str(e)}")
+
+async def send_llm(kind: str, system_message: str, prompt: str, expected_output_tokens: int = 0,
+                   timeout: float = LLM_CALL_TIMEOUT) -> Optional[str]:
+    """Send one prompt in a fresh LLM session, within the rate limit and cost cap (None if unavailable)"""
+    from emergentintegrations.llm.chat import LlmChat, UserMessage
+    
+    api_key = os.environ.get('EMERGENT_LLM_KEY')
+    if not api_key:
+        return None
+    
+    chat = LlmChat(
+        api_key=api_key,
+        session_id=f"{kind}_{uuid.uuid4()}",
+        system_message=system_message
+    ).with_model(LLM_PROVIDER, LLM_MODEL)
+    
+    input_tokens = estimate_tokens(system_message) + estimate_tokens(prompt)
+    usage = await llm_rate_limiter.acquire(input_tokens + expected_output_tokens)
+    async with llm_semaphore:
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(chat.send_message(UserMessage(text=prompt)), timeout)
+        except Exception:
+            LLM_CALL_SECONDS.observe(time.perf_counter() - started, kind, "error")
+            raise
+        LLM_CALL_SECONDS.observe(time.perf_counter() - started, kind, "ok")
+    result = response.strip()
+    output_tokens = estimate_tokens(result)
+    llm_rate_limiter.settle(usage, input_tokens + output_tokens)
+    LLM_TOKENS.inc(kind, "input", amount=input_tokens)
+    LLM_TOKENS.inc(kind, "output", amount=output_tokens)
+    return result
 
 async def process_article_with_ai(article: dict) -> dict:
-    """Process article with translation and summarization"""
+    """Process article with translation and summarization (partial if a call fails or times out)"""
     processed = article.copy()
+    content = f"{article['title']}\n{article['description']}"
     
-    # Translate if not Arabic
+    # Translation and summary are independent, so run them concurrently; each is
+    # batched with other articles' requests of the same kind
+    calls = [llm_batcher.summarize(content)]
     if article.get('source_language') != 'ar':
-        translated_title = await translate_text(article['title'], article['source_language'])
-        translated_desc = await translate_text(article['description'], article['source_language'])
-        processed['translated_title'] = translated_title
-        processed['translated_description'] = translated_desc
-        processed['is_translated'] = True
+        calls.append(llm_batcher.translate_article(article['title'], article['description'], article['source_language']))
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    
+    # A None result means no LLM is configured: leave the field unset so it is tried again later
+    summary = results[0]
+    if isinstance(summary, BaseException):
+        logger.error(f"Summarization error: {summary!r}")
+    elif summary is not None:
+        processed['summary'] = summary
+        processed['is_summarized'] = True
+    
+    if len(results) > 1:
+        translation = results[1]
+        if isinstance(translation, BaseException):
+            logger.error(f"Translation error: {translation!r}")
+        elif translation is not None:
+            processed['translated_title'] = translation["title"]
+            processed['translated_description'] = translation["description"]
+            processed['is_translated'] = True
+    
+    return processed
+
+# ============== LLM Batching ==============
+# Summaries and translations are collected for a short window and sent several
+# articles per request: one system prompt and one session per batch instead of per
+# article. Items are cached individually (see ai_cache_key)
+LLM_BATCH_WINDOW = 0.5  # seconds to wait for more items before sending a batch
+LLM_BATCH_MAX_ITEMS = 10
+LLM_BATCH_TOKEN_BUDGET = 3000  # estimated input tokens per batch
+LLM_BATCH_CALL_TIMEOUT = 60  # seconds; a batch produces several answers
+# Answer tokens per input token, used to reserve a batch's output in the rate limiter.
+# Starts from typical ratios and follows the answers actually received
+LLM_OUTPUT_RATIO = {"summarize": 0.5, "translate_article": 1.2}
+LLM_OUTPUT_RATIO_SMOOTHING = 0.2
+
+BATCH_SUMMARIZE_SYSTEM_MESSAGE = (
+    "أنت ملخص أخبار محترف. ستتلقى مصفوفة JSON من الأخبار، لكل خبر معرف i ونص text. "
+    "لخص كل خبر في 2-3 جمل قصيرة بالعربية وركز على المعلومات الأساسية فقط. "
+    "أجب فقط بمصفوفة JSON بالشكل [{\"i\": 0, \"summary\": \"...\"}] بنفس المعرفات ودون أي تعليقات."
+)
+BATCH_TRANSLATE_SYSTEM_MESSAGE = (
+    "أنت مترجم محترف. ستتلقى مصفوفة JSON من الأخبار، لكل خبر معرف i ولغة lang وعنوان title ووصف description. "
+    "ترجم العنوان والوصف إلى اللغة العربية الفصحى. "
+    "أجب فقط بمصفوفة JSON بالشكل [{\"i\": 0, \"title\": \"...\", \"description\": \"...\"}] بنفس المعرفات ودون أي تعليقات."
+)
+
+LLM_BATCH_ITEMS = Histogram("arabismart_llm_batch_items", "Items per batched LLM request", ("kind",), buckets=(1, 2, 4, 6, 8, 10, 16))
+
+class LlmJob:
+    """One article's request waiting to be batched"""
+    
+    __slots__ = ("payload", "cache_key", "tokens", "future")
+    
+    def __init__(self, payload: dict, cache_key: str, future: asyncio.Future):
+        self.payload = payload
+        self.cache_key = cache_key
+        self.tokens = estimate_tokens(json.dumps(payload, ensure_ascii=False))
+        self.future = future
+
+class LlmBatcher:
+    """Collects jobs per kind and sends them as structured multi-item requests"""
+    
+    # kind -> (batch system message, answer fields)
+    KINDS = {
+        "summarize": (BATCH_SUMMARIZE_SYSTEM_MESSAGE, ("summary",)),
+        "translate_article": (BATCH_TRANSLATE_SYSTEM_MESSAGE, ("title", "description")),
+    }
+    
+    def __init__(self):
+        self.pending: Dict[str, List[LlmJob]] = {kind: [] for kind in self.KINDS}
+        self.pending_tokens: Dict[str, int] = dict.fromkeys(self.KINDS, 0)
+        self.timers: Dict[str, Optional[asyncio.TimerHandle]] = dict.fromkeys(self.KINDS)
+        self.output_ratio: Dict[str, float] = dict(LLM_OUTPUT_RATIO)
+    
+    async def summarize(self, content: str) -> Optional[str]:
+        """Summary of an article's text (None if no LLM is configured)"""
+        result = await self.submit("summarize", {"text": content})
+        return result["summary"] if result is not None else None
+    
+    async def translate_article(self, title: str, description: str, source_lang: str = "en") -> Optional[dict]:
+        """Arabic title and description of an article (None if no LLM is configured)"""
+        payload = {"lang": source_lang, "title": title, "description": description}
+        result = await self.submit("translate_article", payload)
+        if result is None:
+            return None
+        return {"title": result.get("title") or title, "description": result.get("description") or description}
+    
+    async def submit(self, kind: str, payload: dict) -> Optional[dict]:
+        """Answer fields for one item: from the cache, or from the next batch of its kind"""
+        cache_key = ai_cache_key(kind, payload)
+        in_memory = cache_key in ai_cache_memory
+        cached = await get_cached_ai_result(cache_key)
+        if cached is not None:
+            AI_CACHE_LOOKUPS.inc(kind, "memory" if in_memory else "db")
+            return self.decode_cached(kind, cached)
+        AI_CACHE_LOOKUPS.inc(kind, "miss")
+        if not os.environ.get('EMERGENT_LLM_KEY'):
+            return None
         
-        # Summarize the translated content
-        content_to_summarize = f"{translated_title}\n{translated_desc}"
+        job = LlmJob(payload, cache_key, asyncio.get_running_loop().create_future())
+        self.pending[kind].append(job)
+        self.pending_tokens[kind] += job.tokens
+        if len(self.pending[kind]) >= LLM_BATCH_MAX_ITEMS or self.pending_tokens[kind] >= LLM_BATCH_TOKEN_BUDGET:
+            self.flush(kind)
+        elif self.timers[kind] is None:
+            self.timers[kind] = asyncio.get_running_loop().call_later(LLM_BATCH_WINDOW, self.flush, kind)
+        return await job.future
+    
+    def flush(self, kind: str):
+        """Send every pending job of a kind, packed into batches under the token budget"""
+        if self.timers[kind] is not None:
+            self.timers[kind].cancel()
+            self.timers[kind] = None
+        jobs, self.pending[kind], self.pending_tokens[kind] = self.pending[kind], [], 0
+        batch, tokens = [], 0
+        for job in jobs:
+            if batch and (len(batch) >= LLM_BATCH_MAX_ITEMS or tokens + job.tokens > LLM_BATCH_TOKEN_BUDGET):
+                spawn_background(self.send(kind, batch))
+                batch, tokens = [], 0
+            batch.append(job)
+            tokens += job.tokens
+        if batch:
+            spawn_background(self.send(kind, batch))
+    
+    async def send(self, kind: str, jobs: List[LlmJob]):
+        """Send one batch and resolve each job with its own answer"""
+        system_message, fields = self.KINDS[kind]
+        items = [{"i": i, **job.payload} for i, job in enumerate(jobs)]
+        prompt = json.dumps(items, ensure_ascii=False)
+        LLM_BATCH_ITEMS.observe(len(jobs), kind)
+        input_tokens = sum(job.tokens for job in jobs)
+        try:
+            response = await send_llm(f"{kind}_batch", system_message, prompt,
+                                      expected_output_tokens=int(input_tokens * self.output_ratio[kind]),
+                                      timeout=LLM_BATCH_CALL_TIMEOUT)
+            answers = self.parse_answers(response, fields) if response is not None else {}
+        except Exception as e:
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_exception(e)
+            return
+        if response is not None and input_tokens:
+            ratio = estimate_tokens(response) / input_tokens
+            self.output_ratio[kind] += LLM_OUTPUT_RATIO_SMOOTHING * (ratio - self.output_ratio[kind])
+        
+        for i, job in enumerate(jobs):
+            if job.future.done():
+                continue
+            if response is None:
+                job.future.set_result(None)
+                continue
+            answer = answers.get(i)
+            if answer is None:
+                # Left out of the answer: fails this item only; enrichment retries it later
+                job.future.set_exception(ValueError(f"no answer for batch item {i}"))
+                continue
+            job.future.set_result(answer)
+            cached = answer["summary"] if kind == "summarize" else json.dumps(answer, ensure_ascii=False)
+            await store_ai_result(job.cache_key, kind, cached)
+    
+    @staticmethod
+    def parse_answers(response: str, fields: tuple) -> Dict[int, dict]:
+        """Map a batch answer back to item indexes, tolerating code fences or stray text"""
+        match = re.search(r'\[.*\]', response, re.DOTALL)
+        try:
+            data = json.loads(match.group(0) if match else response)
+        except ValueError:
+            logger.error("Unparseable batch answer from the LLM")
+            return {}
+        answers = {}
+        for entry in data if isinstance(data, list) else []:
+            if not isinstance(entry, dict) or not isinstance(entry.get("i"), int):
+                continue
+            values = {field: str(entry.get(field) or "").strip() for field in fields}
+            if all(values.values()):
+                answers[entry["i"]] = values
+        return answers
+    
+    @staticmethod
+    def decode_cached(kind: str, cached: str) -> dict:
+        """Cached single-item result in the batch answer shape"""
+        if kind == "summarize":
+            return {"summary": cached}
+        match = re.search(r'\{.*\}', cached, re.DOTALL)
+        translated = json.loads(match.group(0) if match else cached)
+        return {"title": str(translated.get("title") or ""), "description": str(translated.get("description") or "")}
+
+llm_batcher = LlmBatcher()
+
+# ============== AI Enrichment ==============
+# New articles are translated/summarized in the background so reads never wait on the LLM
+# Enough concurrent articles that summary and translation batches can fill up;
+# the LLM rate limiter, not the worker count, caps the request rate
+ENRICHMENT_WORKERS = 16
+ENRICHMENT_MAX_ATTEMPTS = 3
+ENRICHMENT_MAX_AGE = timedelta(days=2)
+ENRICHMENT_CATEGORY_PRIORITY = {"عاجل": 0, "SE": 1}
+enrichment_queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+enrichment_pending: Dict[str, int] = {}  # article ID -> best queued rank
+enrichment_sequence = 0
+
+def needs_enrichment(article: dict) -> bool:
+    """Whether an article still lacks its summary or translation"""
+    if not article.get('is_summarized'):
+        return True
+    return article.get('source_language') != 'ar' and not article.get('is_translated')
+
+def enqueue_enrichment(article: dict, urgent: bool = False, attempt: int = 1):
+    """Queue an article for enrichment, ordered by category priority then recency"""
+    global enrichment_sequence
+    if not needs_enrichment(article) or not os.environ.get('EMERGENT_LLM_KEY'):
+        return
+    published = article.get('published_date')
+    if not urgent and published is not None and datetime.utcnow() - published > ENRICHMENT_MAX_AGE:
+        return
+    rank = -1 if urgent else ENRICHMENT_CATEGORY_PRIORITY.get(article.get('category'), len(ENRICHMENT_CATEGORY_PRIORITY))
+    # Re-queue an already pending article only to move it ahead
+    if enrichment_pending.get(article['id'], rank + 1) <= rank:
+        return
+    enrichment_sequence += 1
+    priority = (rank, -(published.timestamp() if published else 0), enrichment_sequence)
+    enrichment_pending[article['id']] = rank
+    enrichment_queue.put_nowait((priority, article['id'], attempt))
+
+async def enrich_article(article_id: str, attempt: int):
+    """Run AI processing for one queued article and store the result with it"""
+    article = rss_cache["by_id"].get(article_id)
+    if article is None or not needs_enrichment(article):
+        return
+    if rss_cache["canonical_of"].get(article_id) != article_id:
+        return  # duplicates share their canonical article's enrichment
+    processed = await process_article_with_ai(article)
+    enriched = {k: processed[k] for k in AI_FIELDS if k in processed}
+    
+    # Articles are shared between the snapshot and feed state, so this updates every reader
+    article.update(enriched)
+    rss_cache["version"] += 1
+    hot_window.resize(article_id)
+    if hot_window.over_caps():
+        rebuild_snapshot()
+    if enriched:
+        await db.articles.update_one({"id": article_id}, {"$set": enriched})
+        await db.favorites.update_many(
+            {"article_id": article_id, "article": {"$ne": None}},
+            {"$set": {f"article.{k}": v for k, v in enriched.items()}},
+        )
+    
+    # Partially processed (e.g. timed out): try again later
+    if needs_enrichment(article) and attempt < ENRICHMENT_MAX_ATTEMPTS:
+        enqueue_enrichment(article, attempt=attempt + 1)
+
+async def reset_fallback_enrichment():
+    """Clear summaries and translations that earlier versions stored as copies of the
+    original text when no LLM was available, so those articles are enriched again"""
+    fallback_summary = {"$concat": [{"$substrCP": [{"$concat": ["$title", "\n", "$description"]}, 0, 200]}, "..."]}
+    summaries = await db.articles.update_many(
+        {"is_summarized": True, "$expr": {"$eq": ["$summary", fallback_summary]}},
+        {"$set": {"is_summarized": False}, "$unset": {"summary": ""}},
+    )
+    translations = await db.articles.update_many(
+        {"is_translated": True, "source_language": {"$ne": "ar"},
+         "$expr": {"$and": [{"$eq": ["$translated_title", "$title"]},
+                            {"$eq": ["$translated_description", "$description"]}]}},
+        {"$set": {"is_translated": False}, "$unset": {"translated_title": "", "translated_description": ""}},
+    )
+    if summaries.modified_count or translations.modified_count:
+        logger.info(f"Reset {summaries.modified_count} fallback summaries and {translations.modified_count} fallback translations")
+
+async def enrichment_worker():
+    """Background worker draining the enrichment queue"""
+    while True:
+        _, article_id, attempt = await enrichment_queue.get()
+        enrichment_pending.pop(article_id, None)
+        try:
+            await enrich_article(article_id, attempt)
+        except Exception as e:
+            logger.error(f"Enrichment error for {article_id}: {str(e)}")
+        finally:
+            enrichment_queue.task_done()
+
+# ============== Response Cache ==============
+# Encoded (and compressed) bodies of hot endpoints, valid for one snapshot version
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get('RESPONSE_CACHE_MAX_MB', '32')) * 1024 * 1024
+RESPONSE_COMPRESS_MIN_BYTES = 1024
+response_cache: "OrderedDict[tuple, dict]" = OrderedDict()
+response_cache_version = -1
+response_cache_bytes = 0  # bodies plus their compressed variants
+
+def negotiate_encoding(request: Request) -> Optional[str]:
+    """Pick the best supported Content-Encoding from Accept-Encoding"""
+    accepted = {part.split(';')[0].strip().lower() for part in request.headers.get('accept-encoding', '').split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+def cached_json_response(request: Request, key: tuple, build) -> Response:
+    """Serve build()'s JSON payload from the per-snapshot cache, with ETag/304 and compression.
+    
+    `key` must be built from the endpoint's normalized parameters (limits already
+    clamped), so unknown query params can't multiply entries.
+    """
+    global response_cache_version, response_cache_bytes
+    if response_cache_version != rss_cache["version"]:
+        response_cache.clear()
+        response_cache_version = rss_cache["version"]
+        response_cache_bytes = 0
+    
+    entry = response_cache.get(key)
+    if entry is None:
+        body = json.dumps(jsonable_encoder(build()), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        entry = {"identity": body, "etag": hashlib.sha1(body).hexdigest(), "bytes": len(body)}
+        response_cache[key] = entry
+        response_cache_bytes += len(body)
     else:
-        content_to_summarize = f"{article['title']}\n{article['description']}"
+        response_cache.move_to_end(key)
     
-    # Summarize
-    summary = await summarize_text(content_to_summarize)
-    processed['summary'] = summary
-    processed['is_summarized'] = True
+    body = entry["identity"]
+    encoding = negotiate_encoding(request) if len(body) >= RESPONSE_COMPRESS_MIN_BYTES else None
+    if encoding is not None and encoding not in entry:
+        entry[encoding] = brotli.compress(body) if encoding == 'br' else gzip.compress(body, compresslevel=6)
+        entry["bytes"] += len(entry[encoding])
+        response_cache_bytes += len(entry[encoding])
+    # Least recently used first; an entry larger than the whole budget is served once and dropped
+    while response_cache_bytes > RESPONSE_CACHE_MAX_BYTES and response_cache:
+        _, evicted = response_cache.popitem(last=False)
+        response_cache_bytes -= evicted["bytes"]
     
-    return processed
+    # Each encoded representation gets its own strong ETag
+    etag = f'"{entry["etag"]}-{encoding}"' if encoding else f'"{entry["etag"]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]):
+        return Response(status_code=304, headers=headers)
+    
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+        body = entry[encoding]
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# ============== Live Updates ==============
+STREAM_HEARTBEAT = 20  # seconds between keep-alive comments
+STREAM_QUEUE_SIZE = 200  # events buffered per client before it is asked to resync
+STREAM_BACKLOG_LIMIT = 50
+
+class StreamSubscriber:
+    __slots__ = ("queue", "category")
+    
+    def __init__(self, category: Optional[str]):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.category = category
+
+class NewsHub:
+    """Fans newly ingested articles out to streaming subscribers.
+    
+    Each event is encoded once and shared by every subscriber; an idle
+    subscriber costs one small queue. A subscriber that falls too far
+    behind gets a reset event instead of an unbounded backlog.
+    """
+    
+    RESET = b"event: reset\ndata: {}\n\n"
+    
+    def __init__(self):
+        self.subscribers: set = set()
+    
+    def subscribe(self, category: Optional[str]) -> StreamSubscriber:
+        subscriber = StreamSubscriber(category)
+        self.subscribers.add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber: StreamSubscriber):
+        self.subscribers.discard(subscriber)
+    
+    def publish(self, articles: List[dict]):
+        if not self.subscribers:
+            return
+        events = [(rss_cache["categories_of"].get(a['id'], [a.get('category')]), encode_stream_event(a))
+                  for a in sorted(articles, key=article_sort_key)]
+        for subscriber in list(self.subscribers):
+            for categories, event in events:
+                if subscriber.category and subscriber.category not in categories:
+                    continue
+                try:
+                    subscriber.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # Too slow: drop its backlog and tell it to refetch
+                    while not subscriber.queue.empty():
+                        subscriber.queue.get_nowait()
+                    subscriber.queue.put_nowait(self.RESET)
+                    break
+
+news_hub = NewsHub()
+
+def encode_stream_event(article: dict) -> bytes:
+    """Server-Sent Event carrying one article; its id is the article's cursor"""
+    data = json.dumps(jsonable_encoder(article), ensure_ascii=False, separators=(',', ':'))
+    return f"id: {encode_cursor(article)}\nevent: article\ndata: {data}\n\n".encode('utf-8')
+
+async def stream_news_events(request: Request, subscriber: StreamSubscriber, backlog: List[dict]):
+    """Event stream for one client: backlog first, then live pushes and heartbeats"""
+    try:
+        yield f"retry: {STREAM_HEARTBEAT * 1000}\n\n".encode()
+        for article in backlog:
+            yield encode_stream_event(article)
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield b": keep-alive\n\n"
+                continue
+            yield event
+    finally:
+        news_hub.unsubscribe(subscriber)
+
+# ============== Shared Snapshot ==============
+# With several workers/pods, one elected leader ingests feeds and publishes the per-source
+# articles; every other worker loads them and builds the same snapshot locally.
+# SNAPSHOT_BACKEND: "memory" (single process, always leader) or "mongo" (shared)
+SNAPSHOT_BACKEND = os.environ.get('SNAPSHOT_BACKEND', 'memory')
+SNAPSHOT_SYNC_INTERVAL = 2  # seconds between lease renewals / snapshot publish or poll
+SNAPSHOT_LEASE_SECONDS = 15
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class SnapshotStore(ABC):
+    """Where the leader publishes per-source articles and followers read them"""
+    
+    shared = True
+    
+    @abstractmethod
+    async def acquire_leadership(self, owner: str, lease_seconds: int) -> bool:
+        """Take or renew the leader lease for `lease_seconds`; False if another owner holds it"""
+    
+    async def release_leadership(self, owner: str):
+        pass
+    
+    @abstractmethod
+    async def publish(self, version: float, sources: List[dict]):
+        """Replace the shared snapshot"""
+    
+    @abstractmethod
+    async def load(self, newer_than: float) -> Optional[tuple]:
+        """(version, sources) if a snapshot newer than `newer_than` exists"""
+
+class MemorySnapshotStore(SnapshotStore):
+    """Single-process deployment: this worker always ingests and nothing is shared"""
+    
+    shared = False
+    
+    async def acquire_leadership(self, owner: str, lease_seconds: int) -> bool:
+        return True
+    
+    async def publish(self, version: float, sources: List[dict]):
+        pass
+    
+    async def load(self, newer_than: float) -> Optional[tuple]:
+        return None
+
+class MongoSnapshotStore(SnapshotStore):
+    """Leader lease and versioned snapshot document in MongoDB"""
+    
+    LEASE_ID = "feed-ingester"
+    SNAPSHOT_ID = "current"
+    
+    async def acquire_leadership(self, owner: str, lease_seconds: int) -> bool:
+        now = datetime.utcnow()
+        try:
+            await db.leases.update_one(
+                {"_id": self.LEASE_ID, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=lease_seconds)}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            # Someone else holds an unexpired lease
+            return False
+    
+    async def release_leadership(self, owner: str):
+        await db.leases.delete_one({"_id": self.LEASE_ID, "owner": owner})
+    
+    async def publish(self, version: float, sources: List[dict]):
+        await db.snapshots.replace_one(
+            {"_id": self.SNAPSHOT_ID},
+            {"version": version, "sources": sources, "published_by": WORKER_ID},
+            upsert=True,
+        )
+    
+    async def load(self, newer_than: float) -> Optional[tuple]:
+        doc = await db.snapshots.find_one({"_id": self.SNAPSHOT_ID, "version": {"$gt": newer_than}})
+        if doc is None:
+            return None
+        return doc["version"], doc["sources"]
+
+SNAPSHOT_STORES = {"memory": MemorySnapshotStore, "mongo": MongoSnapshotStore}
+snapshot_store: SnapshotStore = SNAPSHOT_STORES[SNAPSHOT_BACKEND]()
+snapshot_sync = {"leader": False, "lease_expires": 0.0, "published_version": -1, "loaded_version": 0.0}
+ingestion_tasks: List[asyncio.Task] = []
+
+def start_ingestion():
+    """Start the feed scheduler and enrichment workers in this worker"""
+    ingestion_tasks.append(asyncio.create_task(feed_scheduler()))
+    for _ in range(ENRICHMENT_WORKERS):
+        ingestion_tasks.append(asyncio.create_task(enrichment_worker()))
+    logger.info(f"Worker {WORKER_ID} is ingesting feeds")
+
+def stop_ingestion():
+    """Stop ingesting (leadership lost); the snapshot is then followed from the store"""
+    for task in ingestion_tasks + list(refresh_tasks):
+        task.cancel()
+    ingestion_tasks.clear()
+    # Nothing drains the queue until this worker leads again, and the new leader enriches anyway
+    while not enrichment_queue.empty():
+        enrichment_queue.get_nowait()
+        enrichment_queue.task_done()
+    enrichment_pending.clear()
+    for state in feed_state.values():
+        state["refreshing"] = False
+    logger.info(f"Worker {WORKER_ID} stopped ingesting feeds")
+
+async def publish_snapshot():
+    """Publish per-source articles if the local snapshot changed since the last publish"""
+    version = rss_cache["version"]
+    if not snapshot_store.shared or version == snapshot_sync["published_version"]:
+        return
+    sources = [
+        {"name": name, "articles": [{k: v for k, v in a.items() if k not in CLUSTER_FIELDS} for a in state["articles"]]}
+        for name, state in feed_state.items()
+    ]
+    await snapshot_store.publish(time.time(), sources)
+    snapshot_sync["published_version"] = version
+
+async def follow_snapshot():
+    """Load the leader's latest snapshot, if newer, and rebuild the local views from it"""
+    loaded = await snapshot_store.load(snapshot_sync["loaded_version"])
+    if loaded is None:
+        return
+    version, sources = loaded
+    for source in sources:
+        get_feed_state(source)["articles"] = [current_record(article, enriched=True) for article in source["articles"]]
+    rebuild_snapshot()
+    snapshot_sync["loaded_version"] = version
+
+async def snapshot_coordinator():
+    """Ingest while holding the leader lease; otherwise follow the shared snapshot"""
+    while True:
+        started = time.monotonic()
+        try:
+            # A leader must not wait on the renewal past its current lease
+            timeout = snapshot_sync["lease_expires"] - started if snapshot_sync["leader"] else SNAPSHOT_LEASE_SECONDS
+            leader = await asyncio.wait_for(
+                snapshot_store.acquire_leadership(WORKER_ID, SNAPSHOT_LEASE_SECONDS), max(timeout, 0)
+            )
+            if leader:
+                snapshot_sync["lease_expires"] = started + SNAPSHOT_LEASE_SECONDS
+        except Exception as e:
+            logger.error(f"Snapshot lease renewal error: {e!r}")
+            # Keep leading only while the last renewed lease lasts; after that another
+            # worker may have taken over
+            leader = snapshot_sync["leader"] and time.monotonic() < snapshot_sync["lease_expires"]
+        try:
+            if leader and not snapshot_sync["leader"]:
+                start_ingestion()
+            elif not leader and snapshot_sync["leader"]:
+                stop_ingestion()
+            snapshot_sync["leader"] = leader
+            if leader:
+                await publish_snapshot()
+            else:
+                await follow_snapshot()
+        except Exception as e:
+            logger.error(f"Snapshot sync error: {str(e)}")
+        await asyncio.sleep(SNAPSHOT_SYNC_INTERVAL)
 
 # ============== API Routes ==============
 
@@ -364,6 +2736,10 @@ async def health_check():
     return {
         "status": "healthy",
         "cache_articles": len(rss_cache["articles"]),
+        "hot_window_articles": len(hot_window),
+        "hot_window_mb": round(hot_window.bytes / (1024 * 1024), 2),
+        "snapshot_backend": SNAPSHOT_BACKEND,
+        "role": "leader" if snapshot_sync["leader"] else "follower",
         "cache_age": time.time() - rss_cache["last_update"] if rss_cache["last_update"] else None
     }
 
@@ -381,8 +2757,7 @@ async def register(user_data: UserCreate):
         "id": user_id,
         "email": user_data.email,
         "name": user_data.name,
-        "password_hash": hash_password(user_data.password),
-        "favorites": [],
+        "password_hash": await hash_password(user_data.password),
         "created_at": datetime.utcnow()
     }
     await db.users.insert_one(user_doc)
@@ -396,7 +2771,6 @@ async def register(user_data: UserCreate):
             id=user_id,
             email=user_data.email,
             name=user_data.name,
-            favorites=[],
             created_at=user_doc["created_at"]
         )
     )
@@ -404,96 +2778,176 @@ async def register(user_data: UserCreate):
 @api_router.post("/auth/login", response_model=TokenResponse)
 async def login(credentials: UserLogin):
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password_hash"]):
+    if not user or not await verify_password(credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="بيانات الدخول غير صحيحة")
     
     access_token = create_access_token({"sub": credentials.email})
     
     return TokenResponse(
         access_token=access_token,
-        user=UserResponse(
-            id=user["id"],
-            email=user["email"],
-            name=user["name"],
-            favorites=user.get("favorites", []),
-            created_at=user["created_at"]
-        )
+        user=await build_user_response(user)
     )
 
 @api_router.get("/auth/me", response_model=UserResponse)
 async def get_me(user=Depends(get_required_user)):
-    return UserResponse(
-        id=user["id"],
-        email=user["email"],
-        name=user["name"],
-        favorites=user.get("favorites", []),
-        created_at=user["created_at"]
-    )
+    return await build_user_response(user)
 
 # ============== News Routes ==============
 @api_router.get("/news")
 async def get_news(
+    request: Request,
     category: Optional[str] = None,
     source: Optional[str] = None,
-    limit: int = 50
+    limit: int = 50,
+    before: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
 ):
-    """Get all news articles"""
-    articles = await fetch_all_news()
+    """Get all news articles (pass `next_cursor` back as `before` for the next page)
     
-    # Filter by category
-    if category and category != "الكل":
-        articles = [a for a in articles if a.get('category') == category]
+    Copies of the same story from several sources are listed once, under its
+    canonical article, unless `source` is given: a source's listing has all of that
+    source's own articles. since/until (ISO dates) browse a publish-date range;
+    ranges older than the in-memory window are read from the archive.
+    """
+    limit = min(max(limit, 1), NEWS_PAGE_LIMIT)
+    if category == "الكل":
+        category = None
+    since_date, until_date = parse_date_param(since), parse_date_param(until)
+    cursor_key = decode_cursor(before) if before else None
+    if (since_date or until_date) and not hot_window.covers(since_date):
+        return await browse_archive(category, source, limit, cursor_key, since_date, until_date)
     
-    # Filter by source
-    if source:
-        articles = [a for a in articles if a.get('source') == source]
+    def build():
+        # Pick the pre-built view instead of filtering the whole snapshot. A source's
+        # view keeps its own copies of shared stories, with or without a category
+        if source:
+            articles = rss_cache["by_source"].get(source, ())
+            if category:
+                articles = tuple(a for a in articles if a.get('category') == category)
+        elif category:
+            articles = rss_cache["by_category"].get(category, ())
+        else:
+            articles = rss_cache["articles"]
+        
+        # Views are newest first, so a date range is a contiguous slice
+        first = page_before(articles, (until_date, "")) if until_date else 0
+        end = page_before(articles, (since_date, "")) if since_date else len(articles)
+        start = max(first, page_before(articles, cursor_key)) if cursor_key else first
+        page = articles[start:min(start + limit, end)]
+        next_cursor = encode_cursor(page[-1]) if page and start + limit < end else None
+        return {"articles": page, "total": max(end - first, 0), "next_cursor": next_cursor}
     
-    return {"articles": articles[:limit], "total": len(articles)}
+    key = ("news", category, source, limit, cursor_key, since_date, until_date)
+    return cached_json_response(request, key, build)
+
+@api_router.get("/news/stream")
+async def stream_news(request: Request, after: Optional[str] = None, category: Optional[str] = None):
+    """Server-Sent Events stream of new articles newer than the `after` cursor"""
+    if category == "الكل":
+        category = None
+    after = after or request.headers.get('last-event-id')
+    view = rss_cache["by_category"].get(category, ()) if category else rss_cache["articles"]
+    
+    cursor_key = decode_cursor(after) if after else None
+    
+    subscriber = news_hub.subscribe(category)
+    backlog = []
+    if cursor_key:
+        for article in view[:STREAM_BACKLOG_LIMIT]:
+            if article_sort_key(article) <= cursor_key:
+                break
+            backlog.append(article)
+        backlog.reverse()
+    
+    return StreamingResponse(
+        stream_news_events(request, subscriber, backlog),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @api_router.get("/news/{article_id}")
 async def get_article(article_id: str):
     """Get single article by ID"""
-    articles = await fetch_all_news()
-    for article in articles:
-        if article.get('id') == article_id:
-            return article
-    raise HTTPException(status_code=404, detail="الخبر غير موجود")
+    article = rss_cache["by_id"].get(article_id)
+    if article is None:
+        # Fall back to the persistent store for articles no longer in the snapshot
+        article = await db.articles.find_one({"id": article_id}, ARCHIVE_PROJECTION)
+    if article is None:
+        # Expired from the archive, but still kept by someone's favorites
+        saved = await db.favorites.find_one({"article_id": article_id, "article": {"$ne": None}}, {"_id": 0, "article": 1})
+        article = saved["article"] if saved else None
+    if article is None:
+        raise HTTPException(status_code=404, detail="الخبر غير موجود")
+    return article
 
-@api_router.get("/news/search/{query}")
-async def search_news(query: str, limit: int = 30):
-    """Search news articles"""
-    articles = await fetch_all_news()
-    query_lower = query.lower()
-    
-    results = [
-        a for a in articles
-        if query_lower in a.get('title', '').lower() 
-        or query_lower in a.get('description', '').lower()
-    ]
+@api_router.get("/thumbnails/{article_id}/{variant}")
+async def get_article_thumbnail(article_id: str, variant: str, v: Optional[str] = None):
+    """Resized article image, e.g. card.webp or small.jpg; redirects to the original if it can't be made
     
-    return {"articles": results[:limit], "total": len(results), "query": query}
+    `v` tags the source image; only a URL with the current tag may be cached for good.
+    """
+    if variant not in THUMBNAIL_VARIANTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    article = rss_cache["by_id"].get(article_id) or hot_window.get(article_id)
+    if article is None:
+        article = await db.articles.find_one({"id": article_id}, {"_id": 0, "image": 1})
+    image_url = article.get('image') if article is not None else None
+    if not image_url or urlsplit(image_url).scheme not in ("http", "https"):
+        raise HTTPException(status_code=404, detail="Not Found")
+    body = await get_thumbnail(image_url, variant)
+    if body is None:
+        return RedirectResponse(image_url, status_code=307)
+    return Response(
+        content=body,
+        media_type=THUMBNAIL_FORMATS[THUMBNAIL_VARIANTS[variant]][1],
+        headers={"Cache-Control": THUMBNAIL_CACHE_CONTROL if v == thumbnail_version(image_url) else "no-cache"},
+    )
 
-@api_router.get("/breaking-news")
-async def get_breaking_news(limit: int = 10):
-    """Get breaking news with AI translation and summarization"""
-    articles = await fetch_all_news()
+@api_router.get("/news/search/{query}")
+async def search_news(
+    request: Request,
+    query: str,
+    limit: int = 30,
+    offset: int = 0,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+):
+    """Search news articles, optionally within a publish-date range (since/until, ISO dates)"""
+    limit = min(max(limit, 1), SEARCH_PAGE_LIMIT)
+    offset = max(offset, 0)
+    since_date, until_date = parse_date_param(since), parse_date_param(until)
+    if (since_date or until_date) and not hot_window.covers(since_date):
+        return await search_archive(query, limit, offset, since_date, until_date)
     
-    # Get latest articles (mix of sources)
-    latest = articles[:limit]
+    def build():
+        article_ids, total = search_index.search(query, limit=limit, offset=offset,
+                                                 since=since_date, until=until_date)
+        by_id = rss_cache["by_id"]
+        results = [by_id[i] for i in article_ids if i in by_id]
+        return {"articles": results, "total": total, "query": query, "offset": offset}
     
-    # Process with AI
-    processed = []
-    for article in latest:
-        try:
-            processed_article = await process_article_with_ai(article)
-            processed_article['is_breaking'] = True
-            processed.append(processed_article)
-        except Exception as e:
-            logger.error(f"Error processing article: {str(e)}")
-            article['is_breaking'] = True
-            processed.append(article)
+    key = ("search", query, limit, offset, since_date, until_date)
+    return cached_json_response(request, key, build)
+
+@api_router.get("/breaking-news")
+async def get_breaking_news(request: Request, limit: int = 10):
+    """Get breaking news with AI translation and summarization (pre-computed at ingestion)"""
+    limit = min(max(limit, 1), BREAKING_NEWS_LIMIT)
+    def build():
+        # Get latest articles (mix of sources)
+        latest = rss_cache["articles"][:limit]
+        
+        # Serve what the enrichment workers have produced; move anything missing to the front of
+        # the queue (followers run no enrichment workers, so only the leader queues)
+        processed = []
+        for article in latest:
+            if snapshot_sync["leader"]:
+                enqueue_enrichment(article, urgent=True)
+            processed.append({**article, 'is_breaking': True})
+        return {"articles": processed, "total": len(processed)}
     
-    return {"articles": processed, "total": len(processed)}
+    return cached_json_response(request, ("breaking", limit), build)
 
 @api_router.get("/categories")
 async def get_categories():
@@ -518,43 +2972,149 @@ async def get_sources():
     """Get all RSS sources"""
     return {"sources": RSS_SOURCES}
 
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/debug/profile", response_class=PlainTextResponse)
+async def get_profile(seconds: float = 10, interval: float = 0.01):
+    """Sample all threads for a while and return folded stacks for a flame graph (opt-in)"""
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not profiler_lock.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already being captured")
+    try:
+        seconds = min(max(seconds, 0.1), PROFILER_MAX_SECONDS)
+        interval = max(interval, 0.001)
+        loop = asyncio.get_running_loop()
+        stacks = await loop.run_in_executor(None, sample_stacks, seconds, interval)
+    finally:
+        profiler_lock.release()
+    return PlainTextResponse("".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items())))
+
+@api_router.get("/sources/health")
+async def get_sources_health():
+    """Per-source polling health: schedule, circuit breaker state, latency, bytes and errors"""
+    sources = [source_health(source) for source in RSS_SOURCES]
+    return {
+        "role": "leader" if snapshot_sync["leader"] else "follower",
+        "open_circuits": sum(1 for s in sources if s["status"] == "open"),
+        "sources": sources,
+    }
+
 # ============== Favorites Routes ==============
 @api_router.post("/favorites/add")
 async def add_favorite(data: FavoriteAdd, user=Depends(get_required_user)):
-    """Add article to favorites"""
-    await db.users.update_one(
-        {"id": user["id"]},
-        {"$addToSet": {"favorites": data.article_id}}
+    """Add article to favorites, keeping a copy of it so it survives the archive's expiry"""
+    update: Dict[str, Any] = {"$setOnInsert": {"saved_at": datetime.utcnow()}}
+    found = await hydrate_articles([data.article_id])
+    if found:
+        update["$set"] = {"article": saved_article_copy(found[0])}
+    result = await db.favorites.update_one(
+        {"user_id": user["id"], "article_id": data.article_id},
+        update,
+        upsert=True
     )
-    return {"success": True, "message": "تمت الإضافة للمفضلة"}
+    return {"success": True, "message": "تمت الإضافة للمفضلة", "added": result.upserted_id is not None}
 
 @api_router.post("/favorites/remove")
 async def remove_favorite(data: FavoriteAdd, user=Depends(get_required_user)):
     """Remove article from favorites"""
-    await db.users.update_one(
-        {"id": user["id"]},
-        {"$pull": {"favorites": data.article_id}}
-    )
-    return {"success": True, "message": "تمت الإزالة من المفضلة"}
+    result = await db.favorites.delete_one({"user_id": user["id"], "article_id": data.article_id})
+    return {"success": True, "message": "تمت الإزالة من المفضلة", "removed": result.deleted_count > 0}
 
 @api_router.get("/favorites")
-async def get_favorites(user=Depends(get_required_user)):
-    """Get user's favorite articles"""
-    user_data = await db.users.find_one({"id": user["id"]})
-    favorite_ids = user_data.get("favorites", [])
-    
-    if not favorite_ids:
-        return {"articles": [], "total": 0}
-    
-    # Get articles from cache
-    articles = await fetch_all_news()
-    favorites = [a for a in articles if a.get('id') in favorite_ids]
+async def get_favorites(user=Depends(get_required_user), limit: int = 50, before: Optional[str] = None):
+    """Get user's favorite articles, most recently saved first (pass `next_cursor` back as `before`)"""
+    limit = min(max(limit, 1), FAVORITES_PAGE_LIMIT)
+    query: Dict[str, Any] = {"user_id": user["id"]}
+    if before:
+        saved_at, article_id = decode_cursor(before)
+        query["$or"] = [
+            {"saved_at": {"$lt": saved_at}},
+            {"saved_at": saved_at, "article_id": {"$lt": article_id}},
+        ]
+    # One extra row tells whether another page follows
+    saved = await db.favorites.find(query, {"_id": 0}).sort(
+        [("saved_at", -1), ("article_id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+    has_more = len(saved) > limit
+    saved = saved[:limit]
     
-    return {"articles": favorites, "total": len(favorites)}
+    articles = await hydrate_articles(
+        [f["article_id"] for f in saved], {f["article_id"]: f.get("article") for f in saved}
+    )
+    next_cursor = None
+    if has_more:
+        last = saved[-1]
+        next_cursor = f"{last['saved_at'].isoformat()},{last['article_id']}"
+    total = await db.favorites.count_documents({"user_id": user["id"]})
+    return {"articles": articles, "total": total, "next_cursor": next_cursor}
+
+@api_router.get("/favorites/{article_id}")
+async def get_favorite_status(article_id: str, user=Depends(get_required_user)):
+    """Whether an article is in the user's favorites"""
+    saved = await db.favorites.find_one({"user_id": user["id"], "article_id": article_id}, {"_id": 0})
+    return {"article_id": article_id, "is_favorite": saved is not None, "saved_at": saved["saved_at"] if saved else None}
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Scrape-time gauges over the live state
+Gauge("arabismart_snapshot_articles", "Stories in the served snapshot", lambda: len(rss_cache["articles"]))
+Gauge("arabismart_snapshot_age_seconds", "Seconds since the snapshot was rebuilt", lambda: time.time() - rss_cache["last_update"] if rss_cache["last_update"] else 0)
+Gauge("arabismart_enrichment_queue_size", "Articles waiting for AI enrichment", lambda: enrichment_queue.qsize())
+Gauge("arabismart_stream_subscribers", "Connected live-update clients", lambda: len(news_hub.subscribers))
+Gauge("arabismart_hot_window_articles", "Articles held in the in-memory hot window", lambda: len(hot_window))
+Gauge("arabismart_hot_window_bytes", "Measured size of the hot window's records", lambda: hot_window.bytes)
+Gauge("arabismart_llm_batch_pending", "Jobs waiting to be sent in an LLM batch", lambda: sum(len(jobs) for jobs in llm_batcher.pending.values()))
+Gauge("arabismart_llm_rate_limit_waiting", "LLM calls held back by the rate limiter", lambda: llm_rate_limiter.waiting)
+Gauge("arabismart_thumbnail_cache_bytes", "Size of the thumbnail disk cache", lambda: thumbnail_cache.bytes)
+Gauge("arabismart_ai_cache_memory_entries", "Entries in the in-memory AI cache", lambda: len(ai_cache_memory))
+
+class RequestMetricsMiddleware:
+    """Time every request, labelled by route template rather than raw path
+    
+    A plain ASGI middleware: it only watches `send` for the status, so responses are
+    not relayed through an extra task and stream as the app writes them. Latency is
+    taken when the response starts (streams stay open long after).
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        observed = False
+        
+        def observe(status_code: int):
+            nonlocal observed
+            observed = True
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                status_code,
+            )
+        
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start" and not observed:
+                observe(message["status"])
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if not observed:
+                observe(500)
+
+app.add_middleware(RequestMetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -563,14 +3123,99 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ============== Migrations ==============
+# One-off data fixes run once per database, not on every start of every worker: a
+# document in `migrations` claims a fix while one worker runs it and marks it done after
+MIGRATION_CLAIM_SECONDS = 3600  # a claim left by a worker that died mid-run expires
+
+async def run_migration(name: str, migration):
+    """Run `migration()` unless it already ran (or is running) against this database"""
+    now = datetime.utcnow()
+    try:
+        await db.migrations.update_one(
+            {"_id": name, "done": False, "claimed_until": {"$lt": now}},
+            {"$set": {"done": False, "claimed_by": WORKER_ID, "claimed_until": now + timedelta(seconds=MIGRATION_CLAIM_SECONDS)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return  # done, or another worker holds the claim
+    try:
+        await migration()
+    except Exception:
+        # Release the claim so the next start tries again
+        await db.migrations.update_one({"_id": name}, {"$set": {"claimed_until": datetime.min}})
+        raise
+    await db.migrations.update_one({"_id": name}, {"$set": {"done": True, "finished_at": datetime.utcnow()}})
+    logger.info(f"Migration {name} done")
+
 # Create indexes on startup
 @app.on_event("startup")
 async def startup_db_client():
     try:
         await db.users.create_index("email", unique=True)
+        await db.articles.create_index("id", unique=True)
+        await db.articles.create_index("published_date")
+        await db.ai_cache.create_index("key", unique=True)
+        await db.ai_cache.create_index("created_at", expireAfterSeconds=AI_CACHE_TTL_SECONDS)
+        await db.favorites.create_index([("user_id", 1), ("article_id", 1)], unique=True)
+        await db.favorites.create_index([("user_id", 1), ("saved_at", -1), ("article_id", -1)])
+        await db.favorites.create_index("article_id")
+        await db.articles.create_index([("partition", 1), ("published_date", -1), ("id", -1)])
+        await db.articles.create_index([("search_terms", 1), ("published_date", -1)])
+        await db.articles.create_index("expires_at", expireAfterSeconds=0)
         logger.info("Database indexes created")
     except Exception as e:
         logger.error(f"Error creating indexes: {str(e)}")
+    try:
+        await run_migration("embedded_favorites", migrate_embedded_favorites)
+    except Exception as e:
+        logger.error(f"Error migrating favorites: {str(e)}")
+    try:
+        await run_migration("saved_article_copies", backfill_saved_articles)
+    except Exception as e:
+        logger.error(f"Error copying favorited articles: {str(e)}")
+    try:
+        # Runs again whenever the tokenizer (and so SEARCH_TERMS_VERSION) changes
+        await run_migration(f"archive_fields_v{SEARCH_TERMS_VERSION}", backfill_archive_fields)
+    except Exception as e:
+        logger.error(f"Error backfilling archive fields: {str(e)}")
+    try:
+        await run_migration("reset_fallback_enrichment", reset_fallback_enrichment)
+    except Exception as e:
+        logger.error(f"Error resetting fallback enrichment: {str(e)}")
+
+@app.on_event("startup")
+async def start_feed_scheduler():
+    try:
+        await warm_hot_window()
+    except Exception as e:
+        # Without the archive's recent history, date ranges are answered from the archive
+        hot_window.mark_incomplete(datetime.utcnow())
+        logger.error(f"Error warming hot window: {str(e)}")
+    app.state.snapshot_coordinator = asyncio.create_task(snapshot_coordinator())
+    app.state.loop_lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    logger.info(f"Snapshot coordinator started ({SNAPSHOT_BACKEND} backend)")
+
+@app.on_event("shutdown")
+async def stop_feed_scheduler():
+    app.state.snapshot_coordinator.cancel()
+    app.state.loop_lag_monitor.cancel()
+    if snapshot_sync["leader"]:
+        stop_ingestion()
+        try:
+            await snapshot_store.release_leadership(WORKER_ID)
+        except Exception as e:
+            logger.error(f"Error releasing leadership: {str(e)}")
+    for task in list(background_tasks):
+        task.cancel()
+    if http_session is not None:
+        await http_session.close()
+    if image_session is not None:
+        await image_session.close()
+    if parse_executor is not None:
+        parse_executor.shutdown(wait=False, cancel_futures=True)
+    password_executor.shutdown(wait=False, cancel_futures=True)
+    thumbnail_executor.shutdown(wait=False, cancel_futures=True)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
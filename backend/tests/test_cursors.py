@@ -0,0 +1,31 @@
+"""Page cursors and date parameters"""
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+def test_cursor_with_offset_is_naive_utc():
+    assert server.decode_cursor("2026-10-01T12:00:00+02:00,abc") == (datetime(2026, 10, 1, 10, 0), "abc")
+
+
+def test_cursor_without_date_sorts_first():
+    assert server.decode_cursor(",abc") == (datetime.min, "abc")
+
+
+def test_cursor_round_trip():
+    article = {"id": "abc", "published_date": datetime(2026, 10, 1, 8, 30)}
+    assert server.decode_cursor(server.encode_cursor(article)) == (datetime(2026, 10, 1, 8, 30), "abc")
+
+
+@pytest.mark.parametrize("cursor", ["abc", "2026-10-01T12:00:00,", "yesterday,abc"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        server.decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_date_param_with_offset_is_naive_utc():
+    assert server.parse_date_param("2026-10-01T00:30:00+01:00") == datetime(2026, 9, 30, 23, 30)
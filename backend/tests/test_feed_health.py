@@ -0,0 +1,82 @@
+"""Poll statistics, the per-source circuit breaker and adaptive poll intervals"""
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+FIXED = {"name": "fixed", "url": "https://fixed.example/rss", "language": "sv", "category": "SE", "refresh_interval": 900}
+ADAPTIVE = {"name": "adaptive", "url": "https://adaptive.example/rss", "language": "sv", "category": "SE"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(server, "feed_state", {})
+
+
+def poll(source, outcome, articles=None, new_items=0):
+    state = server.get_feed_state(source)
+    state["last_outcome"] = outcome
+    return server.record_poll(state, source, articles, new_items)
+
+
+def articles_every(minutes, count=5):
+    newest = datetime.utcnow()
+    return [{"published_date": newest - timedelta(minutes=minutes * i)} for i in range(count)]
+
+
+def test_fixed_interval_source_reports_its_items():
+    assert poll(FIXED, "ok", articles_every(10), new_items=2) == 900
+    health = server.source_health(FIXED)
+    assert health["items"] == 5 and health["new_items"] == 2
+
+
+def test_circuit_opens_after_repeated_failures():
+    for _ in range(server.FEED_FAILURE_THRESHOLD - 1):
+        assert poll(ADAPTIVE, "error") == server.get_feed_state(ADAPTIVE)["interval"]
+        assert server.source_health(ADAPTIVE)["status"] == "degraded"
+    assert poll(ADAPTIVE, "error") == server.FEED_BACKOFF_BASE
+    assert server.source_health(ADAPTIVE)["status"] == "open"
+
+
+def test_failed_trial_poll_doubles_the_pause_up_to_the_cap():
+    for _ in range(server.FEED_FAILURE_THRESHOLD):
+        poll(ADAPTIVE, "error")
+    delays = [poll(ADAPTIVE, "error") for _ in range(12)]
+    assert delays[:2] == [2 * server.FEED_BACKOFF_BASE, 4 * server.FEED_BACKOFF_BASE]
+    assert max(delays) == delays[-1] == server.FEED_BACKOFF_MAX
+
+
+def test_half_open_circuit_closes_on_success(monkeypatch):
+    for _ in range(server.FEED_FAILURE_THRESHOLD):
+        poll(ADAPTIVE, "error")
+    state = server.get_feed_state(ADAPTIVE)
+    # Once the pause is over the next poll is a trial; the source is no longer reported open
+    later = state["circuit_open_until"] + 1
+    monkeypatch.setattr(server.time, "time", lambda: later)
+    assert server.source_health(ADAPTIVE)["status"] == "degraded"
+    poll(ADAPTIVE, "ok", articles_every(10))
+    assert state["consecutive_failures"] == 0 and state["circuit_open_until"] == 0
+    assert server.source_health(ADAPTIVE)["status"] == "ok"
+
+
+def test_interval_follows_the_publish_rate():
+    state = server.get_feed_state(ADAPTIVE)
+    state["interval"] = 600
+    # Items every 4 minutes: aim for half the gap, smoothed with the previous interval
+    assert server.estimate_poll_interval(state, articles_every(4), 1) == pytest.approx((600 + 120) / 2, abs=1)
+
+
+@pytest.mark.parametrize("minutes, bound", [(0.1, server.FEED_MIN_INTERVAL), (24 * 60, server.FEED_MAX_INTERVAL)])
+def test_interval_is_clamped(minutes, bound):
+    state = server.get_feed_state(ADAPTIVE)
+    for _ in range(20):
+        state["interval"] = server.estimate_poll_interval(state, articles_every(minutes), 1)
+    assert state["interval"] == pytest.approx(bound)
+
+
+def test_not_modified_backs_off_to_the_maximum():
+    state = server.get_feed_state(ADAPTIVE)
+    for _ in range(50):
+        poll(ADAPTIVE, "not_modified")
+    assert state["interval"] == server.FEED_MAX_INTERVAL
@@ -0,0 +1,33 @@
+"""Article identity and dates from parsed feed entries"""
+from feed_parser import parse_feed
+
+SOURCE = {"name": "source", "language": "sv", "category": "SE"}
+
+
+def rss(items: str) -> bytes:
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>{items}</channel></rss>'.encode()
+
+
+def test_entries_without_id_link_or_title_keep_distinct_ids():
+    articles = parse_feed(rss(
+        "<item><description>first</description></item>"
+        "<item><description>second</description></item>"
+        "<item><pubDate>Mon, 05 Oct 2026 10:00:00 GMT</pubDate></item>"
+    ), SOURCE)
+    assert len({a['id'] for a in articles}) == 3
+    # The same entry gets the same ID on the next poll
+    assert parse_feed(rss("<item><description>first</description></item>"), SOURCE)[0]['id'] == articles[0]['id']
+
+
+def test_empty_entries_are_skipped():
+    articles = parse_feed(rss("<item></item><item><title>kept</title></item>"), SOURCE)
+    assert [a['title'] for a in articles] == ["kept"]
+
+
+def test_guid_is_preferred_over_link_and_title():
+    articles = parse_feed(rss(
+        "<item><guid>urn:1</guid><link>https://a.example/1</link><title>t</title></item>"
+        "<item><link>https://a.example/2</link><title>t</title></item>"
+        "<item><title>only a title</title></item>"
+    ), SOURCE)
+    assert [a['guid'] for a in articles] == ["urn:1", "https://a.example/2", "only a title"]
@@ -0,0 +1,153 @@
+"""Streaming feed downloads: byte cap, early stop on a known entry, broken XML"""
+import asyncio
+
+import pytest
+
+import server
+from feed_parser import parse_feed
+
+SOURCE = {"name": "source", "url": "https://feeds.example/rss", "language": "sv", "category": "SE"}
+
+
+def rss(count: int, start: int = 0) -> bytes:
+    items = "".join(
+        f"<item><guid>urn:{i}</guid><title>title {i}</title><link>https://a.example/{i}</link>"
+        f"<description>{'text ' * 40}</description></item>"
+        for i in range(start, start + count)
+    )
+    return f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel><title>t</title>{items}</channel></rss>'.encode()
+
+
+def scan(body: bytes, chunk_size: int = 100, max_entries: int = 50, known_key=None):
+    scanner = server.FeedScanner(max_entries, known_key, None)
+    for start in range(0, len(body), chunk_size):
+        if scanner.feed(body[start:start + chunk_size]):
+            return scanner, start + chunk_size
+    return scanner, len(body)
+
+
+def test_scanner_stops_after_max_entries():
+    body = rss(30)
+    scanner, read = scan(body, max_entries=5)
+    assert scanner.entries == 5 and scanner.first_key == "urn:0"
+    assert read < len(body) // 4
+
+
+def test_scanner_stops_at_the_known_entry():
+    scanner, read = scan(rss(30), known_key="urn:3")
+    assert scanner.reached_known and scanner.entries == 3
+
+
+def test_scanner_reads_whole_feed_without_a_match():
+    body = rss(10)
+    scanner, read = scan(body, known_key="urn:unknown")
+    assert not scanner.reached_known and scanner.entries == 10 and read == len(body)
+
+
+def test_scanner_gives_up_on_malformed_xml():
+    scanner, read = scan(b"<rss><channel><item><title>a & b</title></item>" * 20)
+    assert scanner.failed and read > 0
+    assert not scanner.feed(b"<item/>")
+
+
+def test_scanner_honours_the_declared_encoding():
+    body = '<?xml version="1.0" encoding="iso-8859-1"?><rss><channel><item><guid>åäö</guid></item></channel></rss>'.encode("latin-1")
+    scanner, _ = scan(body, chunk_size=7)
+    assert scanner.first_key == "åäö" and scanner.encoding == "iso8859-1"
+
+
+def test_truncated_feed_yields_the_entries_read():
+    body = rss(5)
+    cut = body[:body.index(b"<item><guid>urn:3")] + b"<item><guid>urn:3</guid><title>half"
+    assert [a['guid'] for a in parse_feed(cut, SOURCE, max_entries=3)] == ["urn:0", "urn:1", "urn:2"]
+
+
+class FakeContent:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.read = 0
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self.body), size):
+            self.read = start + size
+            yield self.body[start:start + size]
+
+
+class FakeResponse:
+    status = 200
+    charset = None
+    headers = {"ETag": '"v2"'}
+
+    def __init__(self, body: bytes):
+        self.content = FakeContent(body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    def __init__(self, body: bytes):
+        self.response = FakeResponse(body)
+
+    def get(self, url, headers=None):
+        return self.response
+
+
+@pytest.fixture
+def fetch(monkeypatch):
+    async def run_parse(content, source, max_entries=server.FEED_MAX_ENTRIES, encoding=None):
+        return parse_feed(content, source, max_entries, encoding)
+
+    monkeypatch.setattr(server, "feed_state", {})
+    monkeypatch.setattr(server, "run_parse", run_parse)
+    monkeypatch.setattr(server, "FEED_CHUNK_SIZE", 256)
+
+    def fetch(body: bytes):
+        session = FakeSession(body)
+        monkeypatch.setattr(server, "get_http_session", lambda: session)
+        articles = asyncio.run(server.fetch_rss_feed(SOURCE))
+        return articles, session.response.content
+
+    return fetch
+
+
+def test_fetch_reads_only_the_new_entries(fetch):
+    old = rss(10)
+    first, _ = fetch(old)
+    state = server.get_feed_state(SOURCE)
+    state["articles"] = first
+    new_items = b"".join(
+        f"<item><guid>urn:new{i}</guid><title>new {i}</title><description>{'text ' * 40}</description></item>".encode()
+        for i in range(3)
+    )
+    body = old.replace(b"<title>t</title>", b"<title>t</title>" + new_items, 1)
+    articles, content = fetch(body)
+    assert [a['guid'] for a in articles[:3]] == ["urn:new0", "urn:new1", "urn:new2"]
+    assert [a['id'] for a in articles[3:]] == [a['id'] for a in first]
+    assert content.read < len(body)
+    assert state["newest_key"] == "urn:new0" and state["last_outcome"] == "ok"
+
+
+def test_feed_cut_at_the_byte_cap_drops_the_partial_entry(fetch, monkeypatch):
+    body = rss(10)
+    monkeypatch.setattr(server, "FEED_MAX_BYTES", body.index(b"<item><guid>urn:4") + 40)
+    articles, content = fetch(body)
+    assert [a['guid'] for a in articles] == ["urn:0", "urn:1", "urn:2", "urn:3"]
+
+
+def test_malformed_feed_stops_at_the_byte_cap(fetch, monkeypatch):
+    monkeypatch.setattr(server, "FEED_MAX_BYTES", 1000)
+    articles, content = fetch(b"<rss><channel>" + b"<item><title>a & b</title></item>" * 500)
+    state = server.get_feed_state(SOURCE)
+    assert state["last_bytes"] == 1000 and content.read <= 1024
+    assert articles is not None and state["last_outcome"] == "ok"
+
+
+def test_malformed_feed_is_read_whole_and_parsed(fetch):
+    body = rss(5).replace(b"title 2", b"title 2 & more")
+    articles, content = fetch(body)
+    assert content.read >= len(body)
+    assert len(articles) == 5
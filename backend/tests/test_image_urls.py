@@ -0,0 +1,118 @@
+"""Feed-supplied image URLs must not reach the server's own network"""
+import asyncio
+import socket
+
+import pytest
+from yarl import URL
+
+import server
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/a.jpg",
+    "http://10.1.2.3/a.jpg",
+    "http://172.16.0.1/a.jpg",
+    "http://192.168.1.1/a.jpg",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://100.64.0.1/a.jpg",
+    "http://0.0.0.0/a.jpg",
+    "http://[::1]/a.jpg",
+    "http://[fe80::1]/a.jpg",
+    "http://[fd00::1]/a.jpg",
+    "http://[::ffff:127.0.0.1]/a.jpg",
+    "http://224.0.0.1/a.jpg",
+])
+def test_non_public_addresses_are_rejected(url):
+    with pytest.raises(ValueError):
+        server.check_image_url(url)
+
+
+@pytest.mark.parametrize("url", [
+    "file:///etc/passwd",
+    "ftp://images.example.com/a.jpg",
+    "gopher://images.example.com/",
+    "data:image/png;base64,AAAA",
+    "//images.example.com/a.jpg",
+    "http:///a.jpg",
+])
+def test_other_schemes_are_refused(url):
+    with pytest.raises(ValueError):
+        server.check_image_url(url)
+
+
+@pytest.mark.parametrize("url", ["https://images.example.com/a.jpg", "http://93.184.215.14/a.jpg", "https://[2606:4700::1]/a.jpg"])
+def test_public_urls_pass(url):
+    server.check_image_url(url)
+
+
+class FakeResolver:
+    def __init__(self, addresses):
+        self.addresses = addresses
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        return [{"hostname": host, "host": a, "port": port, "family": family, "proto": 0, "flags": 0} for a in self.addresses]
+
+
+def resolve(addresses):
+    async def run():
+        resolver = server.PublicResolver()
+        await resolver.close()
+        resolver.resolver = FakeResolver(addresses)
+        return await resolver.resolve("images.example.com", 443)
+    return asyncio.run(run())
+
+
+def test_resolver_drops_private_addresses():
+    hosts = resolve(["10.0.0.5", "93.184.215.14", "::1"])
+    assert [h["host"] for h in hosts] == ["93.184.215.14"]
+
+
+@pytest.mark.parametrize("addresses", [["127.0.0.1"], ["169.254.169.254", "192.168.0.10"], ["::ffff:10.0.0.1"]])
+def test_host_with_only_private_addresses_is_refused(addresses):
+    with pytest.raises(OSError):
+        resolve(addresses)
+
+
+class RedirectResponse:
+    def __init__(self, url, location):
+        self.url = URL(url)
+        self.status = 302
+        self.headers = {"Location": location}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class RedirectingSession:
+    def __init__(self, location):
+        self.location = location
+        self.requested = []
+
+    def get(self, url, allow_redirects=True):
+        assert not allow_redirects
+        self.requested.append(url)
+        return RedirectResponse(url, self.location)
+
+
+@pytest.mark.parametrize("location", [
+    "http://169.254.169.254/latest/meta-data/",
+    "http://127.0.0.1:8001/api/health",
+    "file:///etc/passwd",
+])
+def test_redirect_to_a_non_public_target_is_refused(monkeypatch, location):
+    session = RedirectingSession(location)
+    monkeypatch.setattr(server, "get_image_session", lambda: session)
+    with pytest.raises(ValueError):
+        asyncio.run(server.download_image("https://images.example.com/a.jpg"))
+    assert session.requested == ["https://images.example.com/a.jpg"]
+
+
+def test_redirect_loops_are_cut_off(monkeypatch):
+    session = RedirectingSession("/again.jpg")
+    monkeypatch.setattr(server, "get_image_session", lambda: session)
+    with pytest.raises(ValueError, match="too many redirects"):
+        asyncio.run(server.download_image("https://images.example.com/a.jpg"))
+    assert len(session.requested) == server.THUMBNAIL_MAX_REDIRECTS + 1
@@ -0,0 +1,70 @@
+"""Leader lease handling in the snapshot coordinator"""
+import asyncio
+
+import pytest
+
+import server
+
+
+class Stop(Exception):
+    pass
+
+
+class FlakyStore(server.SnapshotStore):
+    """Grants the lease once, then cannot be reached"""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def acquire_leadership(self, owner, lease_seconds):
+        self.calls += 1
+        if self.calls > 1:
+            raise ConnectionError("lease store unreachable")
+        return True
+
+    async def publish(self, version, sources):
+        pass
+
+    async def load(self, newer_than):
+        return None
+
+
+def test_leader_steps_down_when_the_lease_lapses(monkeypatch):
+    clock = {"now": 100.0, "sleeps": 0}
+    roles = []
+
+    async def sleep(seconds):
+        clock["now"] += seconds
+        clock["sleeps"] += 1
+        if clock["sleeps"] > 12:
+            raise Stop
+
+    async def noop():
+        pass
+
+    monkeypatch.setattr(server, "snapshot_store", FlakyStore())
+    monkeypatch.setattr(server, "snapshot_sync", {"leader": False, "lease_expires": 0.0, "published_version": -1, "loaded_version": 0.0})
+    monkeypatch.setattr(server.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(server.asyncio, "sleep", sleep)
+    monkeypatch.setattr(server, "start_ingestion", lambda: roles.append(("start", clock["now"])))
+    monkeypatch.setattr(server, "stop_ingestion", lambda: roles.append(("stop", clock["now"])))
+    monkeypatch.setattr(server, "publish_snapshot", noop)
+    monkeypatch.setattr(server, "follow_snapshot", noop)
+
+    with pytest.raises(Stop):
+        asyncio.run(server.snapshot_coordinator())
+    start, stop = roles
+    assert start == ("start", 100.0)
+    # Stepped down at the first renewal attempt after the lease ran out
+    assert stop[0] == "stop"
+    assert 100.0 + server.SNAPSHOT_LEASE_SECONDS <= stop[1] < 100.0 + server.SNAPSHOT_LEASE_SECONDS + server.SNAPSHOT_SYNC_INTERVAL
+    assert not server.snapshot_sync["leader"]
+
+
+def test_store_must_implement_the_interface():
+    class Incomplete(server.SnapshotStore):
+        async def acquire_leadership(self, owner, lease_seconds):
+            return True
+
+    with pytest.raises(TypeError):
+        Incomplete()
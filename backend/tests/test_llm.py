@@ -0,0 +1,119 @@
+"""Batched LLM answers and the sliding-window rate limiter"""
+import asyncio
+import json
+
+import pytest
+
+import server
+
+FIELDS = ("title", "description")
+
+
+def test_fenced_answer_is_parsed():
+    response = '```json\n[{"i": 0, "title": "عنوان", "description": "وصف"}]\n```'
+    assert server.LlmBatcher.parse_answers(response, FIELDS) == {0: {"title": "عنوان", "description": "وصف"}}
+
+
+@pytest.mark.parametrize("response", ["not json", "[{\"i\": 0, \"title\": ", "{\"i\": 0}", "[1, 2]", ""])
+def test_malformed_answer_yields_nothing(response):
+    assert server.LlmBatcher.parse_answers(response, FIELDS) == {}
+
+
+def test_incomplete_entries_are_dropped():
+    response = json.dumps([
+        {"i": 0, "title": "أ", "description": "ب"},
+        {"i": 1, "title": "أ"},  # missing a field
+        {"i": "2", "title": "أ", "description": "ب"},  # index is not an int
+        {"title": "أ", "description": "ب"},
+    ])
+    assert list(server.LlmBatcher.parse_answers(response, FIELDS)) == [0]
+
+
+def test_short_answer_fails_only_missing_items(monkeypatch):
+    async def send_llm(kind, system_message, prompt, expected_output_tokens=0, timeout=0):
+        return json.dumps([{"i": 1, "summary": "ملخص"}])
+    async def store_ai_result(key, kind, result):
+        pass
+    monkeypatch.setattr(server, "send_llm", send_llm)
+    monkeypatch.setattr(server, "store_ai_result", store_ai_result)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        jobs = [server.LlmJob({"text": f"خبر {i}"}, f"key-{i}", loop.create_future()) for i in range(3)]
+        await server.LlmBatcher().send("summarize", jobs)
+        return jobs
+
+    jobs = asyncio.run(run())
+    assert jobs[1].future.result() == {"summary": "ملخص"}
+    for job in (jobs[0], jobs[2]):
+        assert isinstance(job.future.exception(), ValueError)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(server.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(server.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def test_requests_wait_for_the_window_to_slide(clock):
+    limiter = server.LlmRateLimiter(requests_per_minute=2, tokens_per_minute=10 ** 6)
+
+    async def run():
+        await limiter.acquire(1)
+        clock.now += 10
+        await limiter.acquire(1)
+        await limiter.acquire(1)  # waits until the first request leaves the window
+
+    asyncio.run(run())
+    assert clock.now == pytest.approx(1060.0)
+    assert len(limiter.requests) == 2
+
+
+def test_tokens_wait_for_the_window_to_slide(clock):
+    limiter = server.LlmRateLimiter(requests_per_minute=100, tokens_per_minute=1000)
+
+    async def run():
+        await limiter.acquire(600)
+        await limiter.acquire(600)
+
+    asyncio.run(run())
+    assert clock.now == pytest.approx(1060.0)
+    assert limiter.tokens == 600
+
+
+def test_oversized_request_goes_out_alone(clock):
+    limiter = server.LlmRateLimiter(requests_per_minute=100, tokens_per_minute=1000)
+    asyncio.run(limiter.acquire(5000))
+    assert clock.now == 1000.0 and limiter.tokens == 5000
+
+
+def test_settled_usage_replaces_the_reservation(clock):
+    limiter = server.LlmRateLimiter(requests_per_minute=100, tokens_per_minute=1000)
+
+    async def run():
+        entry = await limiter.acquire(900)
+        limiter.settle(entry, 300)
+        assert limiter.tokens == 300
+        await limiter.acquire(600)  # fits once the reservation is settled
+        assert clock.now == 1000.0
+        clock.now += 61
+        limiter._prune(clock.now)
+        assert limiter.tokens == 0
+        # Settling a request that already left the window changes nothing
+        limiter.settle(entry, 800)
+        assert limiter.tokens == 0
+
+    asyncio.run(run())
@@ -0,0 +1,62 @@
+"""One-off data migrations run once per database"""
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+
+
+@pytest.fixture(autouse=True)
+def mock_db(monkeypatch):
+    monkeypatch.setattr(server, "db", AsyncMongoMockClient()["test"])
+
+
+def test_migration_runs_once():
+    runs = []
+
+    async def migration():
+        runs.append(1)
+
+    async def run():
+        await server.run_migration("example", migration)
+        await server.run_migration("example", migration)
+        return await server.db.migrations.find_one({"_id": "example"})
+
+    marker = asyncio.run(run())
+    assert runs == [1]
+    assert marker["done"]
+
+
+def test_failed_migration_is_retried():
+    runs = []
+
+    async def migration():
+        runs.append(1)
+        if len(runs) == 1:
+            raise RuntimeError("interrupted")
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await server.run_migration("example", migration)
+        await server.run_migration("example", migration)
+
+    asyncio.run(run())
+    assert len(runs) == 2
+
+
+def test_claimed_migration_is_skipped():
+    runs = []
+
+    async def migration():
+        runs.append(1)
+
+    async def run():
+        await server.db.migrations.insert_one({
+            "_id": "example", "done": False, "claimed_by": "other",
+            "claimed_until": server.datetime.utcnow() + server.timedelta(minutes=5),
+        })
+        await server.run_migration("example", migration)
+
+    asyncio.run(run())
+    assert runs == []
@@ -0,0 +1,45 @@
+"""Per-snapshot response cache"""
+import pytest
+from starlette.requests import Request
+
+import server
+
+
+def make_request(accept_encoding=b"gzip"):
+    return Request({"type": "http", "path": "/", "query_string": b"", "headers": [(b"accept-encoding", accept_encoding)]})
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(server, "RESPONSE_CACHE_MAX_BYTES", 5000)
+    server.response_cache.clear()
+    server.response_cache_bytes = 0
+    yield
+    server.response_cache.clear()
+    server.response_cache_bytes = 0
+
+
+def test_cache_is_capped_by_bytes():
+    for i in range(20):
+        server.cached_json_response(make_request(), ("k", i), lambda: {"x": "a" * 1000})
+    assert server.response_cache_bytes <= server.RESPONSE_CACHE_MAX_BYTES
+    assert server.response_cache_bytes == sum(entry["bytes"] for entry in server.response_cache.values())
+    # Most recently used entries survive
+    assert ("k", 19) in server.response_cache
+
+
+def test_oversized_body_is_served_but_not_kept():
+    response = server.cached_json_response(make_request(), ("big",), lambda: {"x": "a" * 10000})
+    assert response.status_code == 200
+    assert not server.response_cache
+    assert server.response_cache_bytes == 0
+
+
+def test_same_key_builds_once():
+    calls = []
+    def build():
+        calls.append(1)
+        return {"x": 1}
+    server.cached_json_response(make_request(), ("news", None, None, 50), build)
+    server.cached_json_response(make_request(b""), ("news", None, None, 50), build)
+    assert len(calls) == 1
@@ -0,0 +1,78 @@
+"""Search results for inflected Arabic, Swedish and English queries"""
+from datetime import datetime
+
+import pytest
+
+import server
+
+ARTICLES = [
+    ("se1", "Regeringen presenterar budgeten", "Finansministern lade fram regeringens förslag"),
+    ("se2", "Regeringarna i Norden möts", "Statsministrarna samlas i Oslo"),
+    ("se3", "Bilarna stoppades vid gränsen", "Polisen kontrollerade trafiken"),
+    ("en1", "Running the marathon in Stockholm", "Thousands of runners took part"),
+    ("en2", "She runs for parliament", "The candidate played down the polls"),
+    ("en3", "Studies show housing prices falling", "A new study of houses in Malmö"),
+    ("ar1", "الحكومة السويدية تعلن خطة جديدة", "أعلنت الحكومة عن ميزانية"),
+    ("ar2", "وزير الخارجية يزور ستوكهولم", "زيارة رسمية للوزير"),
+]
+
+
+@pytest.fixture
+def index():
+    index = server.SearchIndex()
+    for article_id, title, description in ARTICLES:
+        index.add({"id": article_id, "title": title, "description": description,
+                   "published_date": datetime(2026, 10, 1)})
+    return index
+
+
+def found(index, query):
+    return set(index.search(query)[0])
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("regering", {"se1", "se2"}),
+    ("regeringen", {"se1", "se2"}),
+    ("regeringarna", {"se1", "se2"}),
+    ("regering budget", {"se1"}),
+    ("bil", {"se3"}),
+    ("bilen", {"se3"}),
+    ("run", {"en1", "en2"}),
+    ("runs", {"en1", "en2"}),
+    ("running", {"en1", "en2"}),
+    ("play", {"en2"}),
+    ("study", {"en3"}),
+    ("studies", {"en3"}),
+    ("house", {"en3"}),
+    ("الحكومه", {"ar1"}),
+    ("حكومة", {"ar1"}),
+    ("الوزير", {"ar2"}),
+])
+def test_inflected_forms_match(index, query, expected):
+    assert found(index, query) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("regeri", {"se1", "se2"}),
+    ("runni", {"en1", "en2"}),
+    ("الحكو", {"ar1"}),
+    ("والحكو", {"ar1"}),
+    ("stockh", {"en1"}),
+])
+def test_partial_last_term_expands(index, query, expected):
+    assert found(index, query) == expected
+
+
+@pytest.mark.parametrize("forms", [
+    ("regering", "regeringen", "regeringens", "regeringar", "regeringarna"),
+    ("run", "runs", "running"),
+    ("play", "plays", "played", "playing"),
+    ("study", "studies", "studied"),
+    ("bil", "bilen", "bilar", "bilarna"),
+])
+def test_word_forms_share_a_stem(forms):
+    assert len({server.stem_token(form) for form in forms}) == 1
+
+
+def test_unknown_term_matches_nothing(index):
+    assert found(index, "regering valet") == set()
@@ -0,0 +1,199 @@
+"""Incremental snapshot rebuilds agree with clustering every record from scratch"""
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from starlette.requests import Request
+
+import server
+
+SOURCES = [
+    {"name": f"source-{i}", "url": f"https://feeds{i}.example/rss", "language": "sv", "category": "SE" if i % 2 else "عام"}
+    for i in range(4)
+]
+WORDS = ["regeringen", "budget", "polisen", "stockholm", "val", "skola", "storm", "tåg", "hamn", "vård", "skatt", "elpris"]
+
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    monkeypatch.setattr(server, "RSS_SOURCES", SOURCES)
+    monkeypatch.setattr(server, "feed_state", {})
+    monkeypatch.setattr(server, "hot_window", server.HotWindow(60, 10 ** 9))
+    monkeypatch.setattr(server, "story_index", server.StoryIndex())
+    monkeypatch.setattr(server, "search_index", server.SearchIndex())
+    monkeypatch.setattr(server, "rss_cache", {
+        "articles": (), "by_id": {}, "canonical_of": {}, "categories_of": {}, "cluster_members": {},
+        "by_category": {}, "by_source": {}, "version": 0, "last_update": 0, "cache_duration": 600,
+    })
+    monkeypatch.setattr(server.news_hub, "publish", lambda articles: None)
+    return server
+
+
+def make_article(rng, source, n):
+    story = rng.randrange(25)  # shared stories give cross-source duplicates
+    title = " ".join(random.Random(story).sample(WORDS, 5))
+    return {
+        "id": f"{source['name']}-{n}",
+        "title": title,
+        "description": f"story {story}",
+        "link": f"https://news.example/{story}" if rng.random() < 0.3 else f"https://{source['name']}.example/{n}",
+        "source": source['name'],
+        "source_language": "sv",
+        "category": rng.choice(["SE", "سياسة", "رياضة"]),
+        "published_date": datetime(2026, 10, 1) + timedelta(minutes=rng.randrange(5000)),
+        "guid": f"{source['name']}-{n}",
+    }
+
+
+def expected_views(server):
+    """Clusters and views built from nothing, the way a cold start would"""
+    records = list(server.hot_window.records.values())
+    index = server.StoryIndex()
+    for record in records:
+        index.add(record)
+    by_id = {r['id']: r for r in records}
+    rank = {s['name']: i for i, s in enumerate(server.RSS_SOURCES)}
+    seen, canonicals, categories = set(), [], {}
+    for record in records:
+        if record['id'] in seen:
+            continue
+        component = [record['id']]
+        seen.add(record['id'])
+        for i in component:
+            for j in index.edges[i]:
+                if j not in seen:
+                    seen.add(j)
+                    component.append(j)
+        members = sorted((by_id[i] for i in component), key=lambda a: (a['published_date'], rank[a['source']], a['id']))
+        canonicals.append(members[0]['id'])
+        categories[members[0]['id']] = {m['category'] for m in members}
+    order = sorted(canonicals, key=lambda i: server.article_sort_key(by_id[i]), reverse=True)
+    by_category = {}
+    for i in order:
+        for category in categories[i]:
+            by_category.setdefault(category, []).append(i)
+    by_source = {}
+    for record in sorted(records, key=server.article_sort_key, reverse=True):
+        by_source.setdefault(record['source'], []).append(record['id'])
+    return order, by_category, by_source
+
+
+def test_incremental_rebuilds_match_full_clustering(snapshot):
+    rng = random.Random(7)
+    counter = clustered = 0
+    for step in range(80):
+        source = rng.choice(SOURCES)
+        state = snapshot.get_feed_state(source)
+        kept = [a for a in state["articles"] if rng.random() < 0.6]
+        if kept and rng.random() < 0.2:
+            # A changed article arrives under the same ID
+            changed = dict(kept[0], title=kept[0]['title'] + " uppdaterad")
+            kept[0] = changed
+        fresh = []
+        for _ in range(rng.randrange(1, 6)):
+            counter += 1
+            fresh.append(make_article(rng, source, counter))
+        state["articles"] = [snapshot.current_record(a) for a in fresh + kept]
+        snapshot.rebuild_snapshot()
+        
+        order, by_category, by_source = expected_views(snapshot)
+        cache = snapshot.rss_cache
+        assert [a['id'] for a in cache["articles"]] == order, step
+        assert {k: [a['id'] for a in v] for k, v in cache["by_category"].items()} == by_category, step
+        assert {k: [a['id'] for a in v] for k, v in cache["by_source"].items()} == by_source, step
+        assert set(cache["by_id"]) == set(snapshot.hot_window.records)
+        assert snapshot.hot_window.bytes == sum(r.footprint() for r in snapshot.hot_window.records.values())
+        assert set(snapshot.search_index.doc_terms) == set(order)
+        clustered += len(cache["by_id"]) - len(order)
+        for canonical_id in order:
+            members = cache["cluster_members"][canonical_id]
+            assert cache["by_id"][canonical_id]['cluster_size'] == len(members)
+            assert all(cache["canonical_of"][m] == canonical_id for m in members)
+    # The run must have exercised both duplicates and eviction
+    assert clustered and snapshot.hot_window.evicted
+
+
+def test_numeric_guids_do_not_link_sources(snapshot):
+    for source in SOURCES[:2]:
+        article = {
+            "id": f"{source['name']}-1", "title": f"{source['name']} title", "description": "",
+            "link": f"https://{source['name']}.example/a", "source": source['name'], "source_language": "sv",
+            "category": "SE", "published_date": datetime(2026, 10, 1), "guid": "12345",
+        }
+        snapshot.get_feed_state(source)["articles"] = [snapshot.current_record(article)]
+    snapshot.rebuild_snapshot()
+    assert len(snapshot.rss_cache["articles"]) == 2
+
+
+def test_new_canonical_inherits_enrichment(snapshot):
+    def article(source, published):
+        return {
+            "id": f"{source['name']}-story", "title": "regeringen budget polisen stockholm val", "description": "",
+            "link": "https://news.example/story", "source": source['name'], "source_language": "sv",
+            "category": "SE", "published_date": published, "guid": f"{source['name']}-story",
+        }
+    late = snapshot.current_record(article(SOURCES[0], datetime(2026, 10, 1, 12)))
+    snapshot.get_feed_state(SOURCES[0])["articles"] = [late]
+    snapshot.rebuild_snapshot()
+    late.update(summary="ملخص", is_summarized=True, translated_title="عنوان", translated_description="وصف", is_translated=True)
+    
+    # An earlier-published copy arrives afterwards and becomes the canonical article
+    snapshot.get_feed_state(SOURCES[1])["articles"] = [snapshot.current_record(article(SOURCES[1], datetime(2026, 10, 1, 8)))]
+    snapshot.rebuild_snapshot()
+    canonical = snapshot.rss_cache["articles"][0]
+    assert canonical['id'] == "source-1-story"
+    assert canonical['summary'] == "ملخص" and canonical['translated_title'] == "عنوان"
+    assert not snapshot.needs_enrichment(canonical)
+
+
+def test_window_measures_records_changed_in_place(snapshot):
+    rng = random.Random(3)
+    state = snapshot.get_feed_state(SOURCES[0])
+    state["articles"] = [snapshot.current_record(make_article(rng, SOURCES[0], n)) for n in range(20)]
+    snapshot.rebuild_snapshot()
+    record = state["articles"][0]
+    before = snapshot.hot_window.bytes
+    record.update(summary="ملخص " * 200, is_summarized=True)
+    snapshot.hot_window.resize(record['id'])
+    assert snapshot.hot_window.bytes > before
+    assert snapshot.hot_window.bytes == sum(r.footprint() for r in snapshot.hot_window.records.values())
+
+
+def test_growth_from_clustering_is_evicted(snapshot):
+    rng = random.Random(5)
+    snapshot.hot_window.max_bytes = 10 ** 9
+    # Old articles that are no longer in any feed are evictable
+    state = snapshot.get_feed_state(SOURCES[0])
+    state["articles"] = [snapshot.current_record(make_article(rng, SOURCES[0], n)) for n in range(40)]
+    snapshot.rebuild_snapshot()
+    state["articles"] = state["articles"][:5]
+    snapshot.hot_window.max_bytes = snapshot.hot_window.bytes - 1
+    snapshot.get_feed_state(SOURCES[1])["articles"] = [snapshot.current_record(make_article(rng, SOURCES[1], 100))]
+    snapshot.rebuild_snapshot()
+    assert snapshot.hot_window.bytes <= snapshot.hot_window.max_bytes
+    assert set(snapshot.rss_cache["by_id"]) == set(snapshot.hot_window.records)
+
+
+def test_source_filter_keeps_duplicates_with_or_without_category(snapshot, monkeypatch):
+    monkeypatch.setattr(server, "response_cache", server.OrderedDict())
+    monkeypatch.setattr(server, "response_cache_bytes", 0)
+    for hour, source in enumerate(SOURCES[:2]):
+        article = {
+            "id": f"{source['name']}-story", "title": "regeringen budget polisen stockholm val", "description": "",
+            "link": "https://news.example/story", "source": source['name'], "source_language": "sv",
+            "category": "SE", "published_date": datetime(2026, 10, 1, hour), "guid": f"{source['name']}-story",
+        }
+        snapshot.get_feed_state(source)["articles"] = [snapshot.current_record(article)]
+    snapshot.rebuild_snapshot()
+    
+    def news(**params):
+        request = Request({"type": "http", "path": "/", "query_string": b"", "headers": []})
+        response = asyncio.run(snapshot.get_news(request, limit=50, **params))
+        return [a['id'] for a in json.loads(response.body)["articles"]]
+    
+    # source-1's copy is a duplicate of source-0's earlier one
+    assert news(category="SE") == ["source-0-story"]
+    assert news(source="source-1") == ["source-1-story"]
+    assert news(source="source-1", category="SE") == ["source-1-story"]
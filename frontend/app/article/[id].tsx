@@ -50,10 +50,20 @@ export default function ArticleDetailScreen() {
   }, [id]);
 
   useEffect(() => {
-    if (article && user) {
-      setIsFavorite(user.favorites?.includes(article.id) || false);
+    if (article && user && token) {
+      // The profile only carries recent favorite IDs; ask the server for older ones
+      if (user.favorites?.includes(article.id)) {
+        setIsFavorite(true);
+      } else {
+        axios
+          .get(`${API_URL}/api/favorites/${article.id}`, {
+            headers: { Authorization: `Bearer ${token}` },
+          })
+          .then((response) => setIsFavorite(response.data.is_favorite))
+          .catch(() => setIsFavorite(false));
+      }
     }
-  }, [article, user]);
+  }, [article, user, token]);
 
   const fetchArticle = async () => {
     try {
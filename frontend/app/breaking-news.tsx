@@ -12,7 +12,7 @@ import {
 } from 'react-native';
 import { useRouter } from 'expo-router';
 import { Ionicons } from '@expo/vector-icons';
-import { useArticlesStore, Article } from '../stores/articlesStore';
+import { useArticlesStore, Article, articleImageUrl } from '../stores/articlesStore';
 import { format } from 'date-fns';
 import { ar } from 'date-fns/locale';
 
@@ -58,7 +58,7 @@ export default function BreakingNewsScreen() {
     >
       {item.image && (
         <Image
-          source={{ uri: item.image }}
+          source={{ uri: articleImageUrl(item) }}
           style={styles.articleImage}
           resizeMode="cover"
         />
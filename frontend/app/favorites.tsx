@@ -23,7 +23,8 @@ export default function FavoritesScreen() {
   const colorScheme = useColorScheme();
   const isDark = colorScheme === 'dark';
 
-  const { favorites, fetchFavorites, removeFromFavorites } = useArticlesStore();
+  const { favorites, favoritesTotal, fetchFavorites, fetchMoreFavorites, removeFromFavorites } =
+    useArticlesStore();
   const { token, isAuthenticated } = useAuthStore();
   const [loading, setLoading] = React.useState(true);
 
@@ -140,7 +141,7 @@ export default function FavoritesScreen() {
             الأخبار المفضلة
           </Text>
           <Text style={[styles.headerSubtitle, { color: colors.textSecondary }]}>
-            {favorites.length} خبر محفوظ
+            {favoritesTotal} خبر محفوظ
           </Text>
         </View>
       </View>
@@ -155,6 +156,8 @@ export default function FavoritesScreen() {
           renderItem={renderArticleItem}
           keyExtractor={(item) => item.id}
           contentContainerStyle={styles.listContent}
+          onEndReached={() => token && fetchMoreFavorites(token)}
+          onEndReachedThreshold={0.5}
           ListEmptyComponent={
             <View style={styles.emptyContainer}>
               <Ionicons name="heart-outline" size={48} color={colors.textSecondary} />
@@ -16,7 +16,7 @@ import {
 } from 'react-native';
 import { useRouter } from 'expo-router';
 import { Ionicons } from '@expo/vector-icons';
-import { useArticlesStore, Article } from '../stores/articlesStore';
+import { useArticlesStore, Article, articleImageUrl } from '../stores/articlesStore';
 import { useAuthStore } from '../stores/authStore';
 import { format } from 'date-fns';
 import { ar } from 'date-fns/locale';
@@ -42,8 +42,16 @@ export default function HomeScreen() {
   const isDark = colorScheme === 'dark';
   const [refreshing, setRefreshing] = useState(false);
 
-  const { articles, loading, selectedCategory, fetchArticles, setCategory } =
-    useArticlesStore();
+  const {
+    articles,
+    loading,
+    loadingMore,
+    selectedCategory,
+    fetchArticles,
+    fetchMoreArticles,
+    subscribeToNews,
+    setCategory,
+  } = useArticlesStore();
   const { isAuthenticated, user } = useAuthStore();
 
   const colors = {
@@ -60,6 +68,11 @@ export default function HomeScreen() {
     fetchArticles();
   }, []);
 
+  useEffect(() => {
+    if (loading) return;
+    return subscribeToNews();
+  }, [selectedCategory, loading]);
+
   const onRefresh = useCallback(async () => {
     setRefreshing(true);
     await fetchArticles();
@@ -119,7 +132,7 @@ export default function HomeScreen() {
     >
       {item.image && (
         <Image
-          source={{ uri: item.image }}
+          source={{ uri: articleImageUrl(item) }}
           style={[styles.articleImage, index === 0 && styles.featuredImage]}
           resizeMode="cover"
         />
@@ -228,6 +241,11 @@ export default function HomeScreen() {
           renderItem={renderArticleItem}
           keyExtractor={(item) => item.id}
           contentContainerStyle={styles.articlesList}
+          onEndReached={fetchMoreArticles}
+          onEndReachedThreshold={0.5}
+          ListFooterComponent={
+            loadingMore ? <ActivityIndicator style={styles.loadingMore} color={colors.primary} /> : null
+          }
           refreshControl={
             <RefreshControl
               refreshing={refreshing}
@@ -366,6 +384,9 @@ const styles = StyleSheet.create({
   loadingText: {
     fontSize: 14,
   },
+  loadingMore: {
+    paddingVertical: 16,
+  },
   articlesList: {
     padding: 16,
     paddingBottom: 80,
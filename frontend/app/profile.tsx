@@ -113,7 +113,7 @@ export default function ProfileScreen() {
             </View>
             <View style={styles.menuItemRight}>
               <Text style={[styles.menuBadge, { color: colors.textSecondary }]}>
-                {user?.favorites?.length || 0}
+                {user?.favorites_count ?? user?.favorites?.length ?? 0}
               </Text>
               <Ionicons name="chevron-forward" size={20} color={colors.textSecondary} />
             </View>
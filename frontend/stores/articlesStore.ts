@@ -1,7 +1,11 @@
 import { create } from 'zustand';
 import axios from 'axios';
+import { useAuthStore } from './authStore';
 
 const API_URL = process.env.EXPO_PUBLIC_BACKEND_URL || '';
+// responseText keeps everything a stream has received, so the stream is reopened
+// (resuming from the last event ID) once it has carried this much
+const STREAM_MAX_BYTES = 512 * 1024;
 
 export interface Article {
   id: string;
@@ -12,6 +16,7 @@ export interface Article {
   source_language: string;
   category: string;
   image: string | null;
+  thumbnail?: string | null;
   published_date: string | null;
   guid: string;
   is_translated: boolean;
@@ -22,17 +27,29 @@ export interface Article {
   is_breaking?: boolean;
 }
 
+// Resized card image from the backend, or the publisher's original for older articles
+export const articleImageUrl = (article: Article): string | undefined =>
+  article.thumbnail ? `${API_URL}${article.thumbnail}` : article.image ?? undefined;
+
 interface ArticlesState {
   articles: Article[];
   breakingNews: Article[];
   favorites: Article[];
+  favoritesTotal: number;
+  favoritesCursor: string | null;
+  loadingMoreFavorites: boolean;
   loading: boolean;
+  loadingMore: boolean;
+  nextCursor: string | null;
   breakingLoading: boolean;
   error: string | null;
   selectedCategory: string;
   fetchArticles: (category?: string) => Promise<void>;
+  fetchMoreArticles: () => Promise<void>;
+  subscribeToNews: () => () => void;
   fetchBreakingNews: () => Promise<void>;
   fetchFavorites: (token: string) => Promise<void>;
+  fetchMoreFavorites: (token: string) => Promise<void>;
   searchArticles: (query: string) => Promise<Article[]>;
   setCategory: (category: string) => void;
   addToFavorites: (articleId: string, token: string) => Promise<void>;
@@ -43,7 +60,12 @@ export const useArticlesStore = create<ArticlesState>((set, get) => ({
   articles: [],
   breakingNews: [],
   favorites: [],
+  favoritesTotal: 0,
+  favoritesCursor: null,
+  loadingMoreFavorites: false,
   loading: false,
+  loadingMore: false,
+  nextCursor: null,
   breakingLoading: false,
   error: null,
   selectedCategory: 'الكل',
@@ -54,12 +76,106 @@ export const useArticlesStore = create<ArticlesState>((set, get) => ({
       const cat = category || get().selectedCategory;
       const params = cat !== 'الكل' ? `?category=${encodeURIComponent(cat)}` : '';
       const response = await axios.get(`${API_URL}/api/news${params}`);
-      set({ articles: response.data.articles, loading: false });
+      set({
+        articles: response.data.articles,
+        nextCursor: response.data.next_cursor ?? null,
+        loading: false,
+      });
     } catch (error: any) {
       set({ error: 'فشل تحميل الأخبار', loading: false });
     }
   },
 
+  fetchMoreArticles: async () => {
+    const { nextCursor, loadingMore, selectedCategory } = get();
+    if (!nextCursor || loadingMore) return;
+    set({ loadingMore: true });
+    try {
+      const params = new URLSearchParams({ before: nextCursor });
+      if (selectedCategory !== 'الكل') params.append('category', selectedCategory);
+      const response = await axios.get(`${API_URL}/api/news?${params.toString()}`);
+      set({
+        articles: [...get().articles, ...response.data.articles],
+        nextCursor: response.data.next_cursor ?? null,
+        loadingMore: false,
+      });
+    } catch (error: any) {
+      set({ loadingMore: false });
+    }
+  },
+
+  subscribeToNews: () => {
+    // Server-Sent Events over XMLHttpRequest (React Native has no EventSource):
+    // new articles are pushed as they are ingested instead of re-polling the list
+    let xhr: XMLHttpRequest | null = null;
+    let retryTimer: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
+    let lastEventId: string | null = null;
+
+    const connect = () => {
+      const { articles, selectedCategory } = get();
+      const newest = articles[0];
+      const after =
+        lastEventId ?? (newest ? `${newest.published_date ?? ''},${newest.id}` : null);
+      const params = new URLSearchParams();
+      if (after) params.append('after', after);
+      if (selectedCategory !== 'الكل') params.append('category', selectedCategory);
+
+      let processed = 0;
+      xhr = new XMLHttpRequest();
+      xhr.open('GET', `${API_URL}/api/news/stream?${params.toString()}`);
+      xhr.setRequestHeader('Accept', 'text/event-stream');
+      xhr.onprogress = () => {
+        if (!xhr) return;
+        const text = xhr.responseText;
+        let end = text.indexOf('\n\n', processed);
+        while (end !== -1) {
+          const block = text.slice(processed, end);
+          processed = end + 2;
+          end = text.indexOf('\n\n', processed);
+
+          let event = 'message';
+          let data = '';
+          for (const line of block.split('\n')) {
+            if (line.startsWith('event: ')) event = line.slice(7);
+            else if (line.startsWith('data: ')) data += line.slice(6);
+            else if (line.startsWith('id: ')) lastEventId = line.slice(4);
+          }
+          if (event === 'article' && data) {
+            const article: Article = JSON.parse(data);
+            const current = get().articles;
+            if (!current.some((a) => a.id === article.id)) {
+              set({ articles: [article, ...current] });
+            }
+          } else if (event === 'reset') {
+            lastEventId = null;
+            get().fetchArticles();
+          }
+        }
+        if (processed >= STREAM_MAX_BYTES && !closed) {
+          const previous = xhr;
+          previous.onprogress = previous.onerror = previous.onload = null;
+          previous.abort();
+          connect();
+        }
+      };
+      const reconnect = () => {
+        if (closed) return;
+        retryTimer = setTimeout(connect, 5000);
+      };
+      xhr.onerror = reconnect;
+      xhr.onload = reconnect;
+      xhr.send();
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      if (retryTimer) clearTimeout(retryTimer);
+      xhr?.abort();
+    };
+  },
+
   fetchBreakingNews: async () => {
     set({ breakingLoading: true });
     try {
@@ -75,9 +191,36 @@ export const useArticlesStore = create<ArticlesState>((set, get) => ({
       const response = await axios.get(`${API_URL}/api/favorites`, {
         headers: { Authorization: `Bearer ${token}` },
       });
-      set({ favorites: response.data.articles });
+      set({
+        favorites: response.data.articles,
+        favoritesTotal: response.data.total,
+        favoritesCursor: response.data.next_cursor ?? null,
+      });
+      const { user, updateFavorites } = useAuthStore.getState();
+      if (user) updateFavorites(user.favorites, response.data.total);
+    } catch (error) {
+      console.error('Error fetching favorites:', error);
+    }
+  },
+
+  fetchMoreFavorites: async (token: string) => {
+    const { favoritesCursor, loadingMoreFavorites } = get();
+    if (!favoritesCursor || loadingMoreFavorites) return;
+    set({ loadingMoreFavorites: true });
+    try {
+      const response = await axios.get(`${API_URL}/api/favorites`, {
+        params: { before: favoritesCursor },
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      set({
+        favorites: [...get().favorites, ...response.data.articles],
+        favoritesTotal: response.data.total,
+        favoritesCursor: response.data.next_cursor ?? null,
+        loadingMoreFavorites: false,
+      });
     } catch (error) {
       console.error('Error fetching favorites:', error);
+      set({ loadingMoreFavorites: false });
     }
   },
 
@@ -99,11 +242,19 @@ export const useArticlesStore = create<ArticlesState>((set, get) => ({
 
   addToFavorites: async (articleId: string, token: string) => {
     try {
-      await axios.post(
+      const response = await axios.post(
         `${API_URL}/api/favorites/add`,
         { article_id: articleId },
         { headers: { Authorization: `Bearer ${token}` } }
       );
+      // Saving an article that is already a favorite changes nothing
+      if (response.data.added) {
+        set({ favoritesTotal: get().favoritesTotal + 1 });
+        const { user, updateFavorites } = useAuthStore.getState();
+        if (user) {
+          updateFavorites([articleId, ...user.favorites], (user.favorites_count ?? user.favorites.length) + 1);
+        }
+      }
     } catch (error) {
       console.error('Error adding to favorites:', error);
     }
@@ -111,12 +262,22 @@ export const useArticlesStore = create<ArticlesState>((set, get) => ({
 
   removeFromFavorites: async (articleId: string, token: string) => {
     try {
-      await axios.post(
+      const response = await axios.post(
         `${API_URL}/api/favorites/remove`,
         { article_id: articleId },
         { headers: { Authorization: `Bearer ${token}` } }
       );
       set({ favorites: get().favorites.filter((a) => a.id !== articleId) });
+      if (response.data.removed) {
+        set({ favoritesTotal: Math.max(get().favoritesTotal - 1, 0) });
+        const { user, updateFavorites } = useAuthStore.getState();
+        if (user) {
+          updateFavorites(
+            user.favorites.filter((id) => id !== articleId),
+            Math.max((user.favorites_count ?? user.favorites.length) - 1, 0)
+          );
+        }
+      }
     } catch (error) {
       console.error('Error removing from favorites:', error);
     }
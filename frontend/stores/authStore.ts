@@ -9,6 +9,7 @@ interface User {
   email: string;
   name: string;
   favorites: string[];
+  favorites_count?: number;
   created_at: string;
 }
 
@@ -21,7 +22,7 @@ interface AuthState {
   register: (email: string, password: string, name: string) => Promise<void>;
   logout: () => Promise<void>;
   loadToken: () => Promise<void>;
-  updateFavorites: (favorites: string[]) => void;
+  updateFavorites: (favorites: string[], favoritesCount?: number) => void;
 }
 
 export const useAuthStore = create<AuthState>((set, get) => ({
@@ -82,10 +83,12 @@ export const useAuthStore = create<AuthState>((set, get) => ({
     }
   },
 
-  updateFavorites: (favorites: string[]) => {
+  updateFavorites: (favorites: string[], favoritesCount?: number) => {
     const user = get().user;
     if (user) {
-      set({ user: { ...user, favorites } });
+      const updated = { ...user, favorites, favorites_count: favoritesCount ?? user.favorites_count };
+      set({ user: updated });
+      AsyncStorage.setItem('user', JSON.stringify(updated)).catch(() => {});
     }
   },
 }));